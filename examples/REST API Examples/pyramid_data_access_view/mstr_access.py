@@ -30,7 +30,10 @@ def mstr_data_access(request: Request):
         log.debug(f'mstr_path = {mstr_path}')
         mstr_rest_api_url = request.registry.settings['microstrategy_rest_api_url']
         mstr_rest_api_version = request.registry.settings['microstrategy_rest_api_version']
-        rest_api = MstrRestApiFacade(mstr_rest_api_url, username, password, api_version=mstr_rest_api_version)
+        # share_pool re-uses the keep-alive connections of earlier web requests
+        rest_api = MstrRestApiFacade(
+            mstr_rest_api_url, username, password, api_version=mstr_rest_api_version, share_pool=True,
+        )
         login_resuls = rest_api.login()
         if login_resuls['mstr_auth_token'] is None:
             return f"Error: Login failed: {login_resuls['error_message']}"
@@ -68,7 +71,10 @@ def mstr_data_definition(request: Request):
         log.debug(f'mstr_path = {mstr_path}')
         mstr_rest_api_url = request.registry.settings['microstrategy_rest_api_url']
         mstr_rest_api_version = request.registry.settings['microstrategy_rest_api_version']
-        rest_api = MstrRestApiFacade(mstr_rest_api_url, username, password, api_version=mstr_rest_api_version)
+        # share_pool re-uses the keep-alive connections of earlier web requests
+        rest_api = MstrRestApiFacade(
+            mstr_rest_api_url, username, password, api_version=mstr_rest_api_version, share_pool=True,
+        )
         login_resuls = rest_api.login()
         if login_resuls['mstr_auth_token'] is None:
             return f"Error: Login failed: {login_resuls['error_message']}"
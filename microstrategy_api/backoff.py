@@ -0,0 +1,55 @@
+"""
+Exponential backoff delays shared by the pollers and retry loops of the TaskProc and REST API clients.
+"""
+import random
+
+
+class Backoff(object):
+    """
+    Exponential backoff: the delay before attempt n (0 based) is initial_delay * factor ** n,
+    capped at max_delay.
+
+    Args:
+        initial_delay:
+            Delay (in seconds) before the first attempt.
+        max_delay:
+            Maximum delay (in seconds).
+        factor:
+            Multiplier applied to the delay for each attempt.
+        jitter:
+            Fraction (0 to 1) of each delay that is randomized. With jitter=0.5 delays are between 50% and 100%
+            of the exponential value, so that many clients backing off at once do not retry in lock step.
+    """
+
+    def __init__(self,
+                 initial_delay: float = 1.0,
+                 max_delay: float = 60.0,
+                 factor: float = 2.0,
+                 jitter: float = 0.0,
+                 ):
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1 not {}".format(jitter))
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Returns the delay (in seconds) before attempt number attempt (0 based).
+        """
+        try:
+            delay = self.initial_delay * self.factor ** attempt
+        except OverflowError:
+            delay = self.max_delay
+        delay = min(delay, self.max_delay)
+        if self.jitter:
+            delay -= delay * self.jitter * random.random()
+        return delay
+
+    def delays(self, attempts: int):
+        """
+        Yields the delays for attempts number 0 to attempts - 1.
+        """
+        for attempt in range(attempts):
+            yield self.get_delay(attempt)
@@ -0,0 +1,70 @@
+"""
+Pooled HTTP sessions shared by the TaskProc and REST API clients.
+
+A requests.Session keeps TCP/TLS connections alive between calls and persists cookies,
+so repeated calls against the same web server do not pay a new handshake each time.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+
+_shared_adapters = dict()
+_shared_adapters_lock = threading.Lock()
+
+
+def new_http_adapter(pool_size: int = DEFAULT_POOL_SIZE) -> HTTPAdapter:
+    """
+    Build a connection pooling adapter.
+
+    Arguments
+    ---------
+    pool_size:
+        Maximum number of keep-alive connections kept open per host.
+    """
+    pool_size = max(int(pool_size), 1)
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+
+def get_shared_http_adapter(key: str, pool_size: int = DEFAULT_POOL_SIZE) -> HTTPAdapter:
+    """
+    Get the connection pooling adapter shared by all callers using the same key (for example a base URL).
+    The adapter is created (with pool_size) by the first caller.
+
+    Sessions mounting a shared adapter share the keep-alive connections but each keeps its own cookies.
+
+    Arguments
+    ---------
+    key:
+        Identifies the shared pool.
+    pool_size:
+        Maximum number of keep-alive connections kept open per host, if the adapter is created.
+    """
+    with _shared_adapters_lock:
+        adapter = _shared_adapters.get(key)
+        if adapter is None:
+            adapter = new_http_adapter(pool_size)
+            _shared_adapters[key] = adapter
+        return adapter
+
+
+def new_http_session(pool_size: int = DEFAULT_POOL_SIZE, adapter: HTTPAdapter = None) -> requests.Session:
+    """
+    Build a requests.Session with keep-alive connection pooling and a persistent cookie jar.
+
+    Arguments
+    ---------
+    pool_size:
+        Maximum number of keep-alive connections kept open per host.
+        Ignored if adapter is provided.
+    adapter:
+        Optional. An existing HTTPAdapter to mount (so that several sessions can share one connection pool).
+    """
+    if adapter is None:
+        adapter = new_http_adapter(pool_size)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
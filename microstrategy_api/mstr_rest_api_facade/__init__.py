@@ -2,18 +2,32 @@ import itertools
 import json
 import logging
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from fnmatch import fnmatch
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Callable
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from microstrategy_api.task_proc.object_type import ObjectType
 
 __version__ = '0.1.0'
 
 from microstrategy_api.mstr_rest_api_facade.api_error import APIError
+from microstrategy_api.mstr_rest_api_facade.report_data import (
+    ReportDataMerger, ReportLayout, get_column_names, get_page_by_combinations, get_page_by_filters, page_by_to_rows,
+)
+from microstrategy_api.mstr_rest_api_facade.report_columns import RestReportColumns
+from microstrategy_api.mstr_rest_api_facade.metadata_cache import RestMetadataCache
+from microstrategy_api.mstr_rest_api_facade.json_decoding import fast_json_loads, StreamedReportInstance
 from microstrategy_api.timer import Timer
+from microstrategy_api.backoff import Backoff
+from microstrategy_api.http_session import new_http_session, get_shared_http_adapter, DEFAULT_POOL_SIZE
+
+
+# Delays between polls of the status of a running report instance
+DEFAULT_WAIT_BACKOFF = Backoff(initial_delay=0.1, max_delay=5.0, factor=2.0, jitter=0.25)
 
 
 class MstrRestApiFacade(object):
@@ -25,7 +39,33 @@ class MstrRestApiFacade(object):
                  mstr_username,
                  mstr_password,
                  api_version: int = 2,
+                 http_session: Optional[requests.Session] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: Optional[Union[float, tuple]] = None,
+                 adapter: Optional[HTTPAdapter] = None,
+                 share_pool: bool = False,
+                 wait_backoff: Backoff = DEFAULT_WAIT_BACKOFF,
+                 metadata_cache: Optional[RestMetadataCache] = None,
+                 json_loads: Callable = fast_json_loads,
                  ):
+        """
+        :param mstr_rest_api_base_url:
+        :param mstr_username:
+        :param mstr_password:
+        :param api_version:
+        :param http_session: Optional. The requests.Session to send requests with.
+                             If not provided, a new keep-alive session is created.
+        :param pool_size: Maximum number of pooled keep-alive connections (if the session is created here).
+        :param timeout: Optional. requests timeout (seconds, or a (connect, read) tuple) for each call.
+        :param adapter: Optional. HTTPAdapter (connection pool) to mount on the new session.
+        :param share_pool: If True (and adapter is not provided) the connection pool is shared
+                           with all other facades for the same base URL. Cookies are not shared.
+        :param wait_backoff: Delays between polls of the status of running report instances.
+        :param metadata_cache: Optional. Cache for project ids, folder contents, object paths,
+                               report definitions and report layouts.
+                               Share one between facades (for example per process) to share lookups.
+        :param json_loads: Function decoding the (bytes) response bodies. Defaults to orjson if installed.
+        """
 
         self.log = logging.getLogger("{mod}.{cls}".format(mod=self.__class__.__module__, cls=self.__class__.__name__))
         log_level_name = logging.getLevelName(self.log.getEffectiveLevel())
@@ -37,6 +77,17 @@ class MstrRestApiFacade(object):
         self.cookies = None
         self._server_status = None
         self.api_version = int(api_version)
+        # Only close connection pools created for this facade
+        self._owns_pool = http_session is None and adapter is None and not share_pool
+        if http_session is None:
+            if adapter is None and share_pool:
+                adapter = get_shared_http_adapter(mstr_rest_api_base_url, pool_size)
+            http_session = new_http_session(pool_size=pool_size, adapter=adapter)
+        self.http_session = http_session
+        self.timeout = timeout
+        self.wait_backoff = wait_backoff
+        self.metadata_cache = metadata_cache
+        self.json_loads = json_loads
 
         self.request_headers = {
             'Content-Type': 'application/json',
@@ -44,6 +95,36 @@ class MstrRestApiFacade(object):
             'X-MSTR-AuthToken': None
         }
 
+    def __enter__(self) -> 'MstrRestApiFacade':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Close the pooled HTTP connections, unless the pool was provided or is shared.
+        Does not log out the MicroStrategy session.
+        """
+        if self._owns_pool:
+            self.http_session.close()
+
+    @property
+    def _version(self) -> str:
+        # Note: Requires MSTR 2020 for v2 support
+        if self.api_version >= 2:
+            return 'v2'
+        else:
+            return ''
+
+    @property
+    def _metadata_cache_scope(self) -> tuple:
+        return self.mstr_rest_api_base_url, self.mstr_username
+
+    def _http_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.http_session.request(method, url, **kwargs)
+
     def set_cookies(self, cookies):
         self.cookies = cookies
 
@@ -54,9 +135,9 @@ class MstrRestApiFacade(object):
         self.request_headers = request_headers
 
     @staticmethod
-    def _get_response_object(response):
+    def _get_response_object(response, json_loads: Callable = fast_json_loads):
         try:
-            return response.json()
+            return json_loads(response.content)
         except ValueError:
             # Default to returning None for all values
             return defaultdict(lambda: None)
@@ -72,32 +153,15 @@ class MstrRestApiFacade(object):
         merged_headers = dict(self.request_headers)
         if headers is not None:
             merged_headers.update(headers)
-        if method.lower() == 'get':
-            response = requests.get(
-                rest_api_endpoint,
-                headers=merged_headers,
-                params=query,
-                data=data,
-                cookies=self.cookies,
-            )
-        elif method.lower() == 'post':
-            response = requests.post(
-                rest_api_endpoint,
-                headers=merged_headers,
-                params=query,
-                data=data,
-                cookies=self.cookies,
-            )
-        else:
-            response = requests.request(
-                method=method,
-                url=rest_api_endpoint,
-                headers=merged_headers,
-                params=query,
-                data=data,
-                cookies=self.cookies,
-            )
-        json_object = MstrRestApiFacade._get_response_object(response)
+        response = self._http_request(
+            method.upper(),
+            rest_api_endpoint,
+            headers=merged_headers,
+            params=query,
+            data=data,
+            cookies=self.cookies,
+        )
+        json_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
         return response, json_object
 
     @staticmethod
@@ -177,12 +241,11 @@ class MstrRestApiFacade(object):
             else:
                 return MstrRestApiFacade.error_response(response, json_object)
 
-    def login(self):
-        rest_api_endpoint = self.mstr_rest_api_base_url + '/auth/login'
-
-        request_body = {
-            "username": self.mstr_username,
-            "password": self.mstr_password,
+    @staticmethod
+    def _get_login_body(username: str, password: str) -> dict:
+        return {
+            "username": username,
+            "password": password,
             "loginMode": 1,
             "maxSearch": 1,
             "workingSet": 0,
@@ -197,6 +260,11 @@ class MstrRestApiFacade(object):
             "applicationType": 35
         }
 
+    def login(self):
+        rest_api_endpoint = self.mstr_rest_api_base_url + '/auth/login'
+
+        request_body = MstrRestApiFacade._get_login_body(self.mstr_username, self.mstr_password)
+
         login_result_details = {
             'mstr_auth_token': None,
             'http_status_code': None,
@@ -204,7 +272,7 @@ class MstrRestApiFacade(object):
             'status': None
         }
 
-        response = requests.post(rest_api_endpoint, data=request_body)
+        response = self._http_request('POST', rest_api_endpoint, data=request_body)
 
         if response.ok:
             # self.cookies = dict(response.cookies)
@@ -235,7 +303,7 @@ class MstrRestApiFacade(object):
         }
 
         rest_api_endpoint = self.mstr_rest_api_base_url + '/auth/logout'
-        response = requests.get(rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
+        response = self._http_request('GET', rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
 
         if response.ok:
             self.log.info('MSTR REST API [LOGOUT] Successful. '
@@ -262,9 +330,9 @@ class MstrRestApiFacade(object):
         }
 
         rest_api_endpoint = self.mstr_rest_api_base_url + '/sessions/userInfo'
-        response = requests.get(rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
+        response = self._http_request('GET', rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
 
-        response_object = MstrRestApiFacade._get_response_object(response)
+        response_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
         if response.ok:
             self.log.debug(
                 f'MSTR REST API [/sessions/userInfo] Successful. '
@@ -299,8 +367,8 @@ class MstrRestApiFacade(object):
         }
 
         rest_api_endpoint = self.mstr_rest_api_base_url + '/users/' + mstr_user_id
-        response = requests.get(rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
-        response_object = MstrRestApiFacade._get_response_object(response)
+        response = self._http_request('GET', rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
+        response_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
 
         if response.ok:
             self.log.debug('MSTR REST API [/sessions/userInfo] Successful. The mstr user: ' + mstr_user_id)
@@ -329,8 +397,8 @@ class MstrRestApiFacade(object):
         }
 
         rest_api_endpoint = self.mstr_rest_api_base_url + '/users/' + mstr_user_id
-        response = requests.get(rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
-        response_object = MstrRestApiFacade._get_response_object(response)
+        response = self._http_request('GET', rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
+        response_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
 
         if response.ok:
             self.log.debug(
@@ -359,8 +427,8 @@ class MstrRestApiFacade(object):
         }
 
         rest_api_endpoint = self.mstr_rest_api_base_url + '/usergroups/' + mstr_group_id + '/members/'
-        response = requests.get(rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
-        response_object = MstrRestApiFacade._get_response_object(response)
+        response = self._http_request('GET', rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
+        response_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
 
         if response.ok:
             self.log.debug(
@@ -401,13 +469,14 @@ class MstrRestApiFacade(object):
         request_as_json = json.dumps(request_body)
 
         rest_api_endpoint = self.mstr_rest_api_base_url + '/users/' + mstr_id
-        response = requests.patch(
+        response = self._http_request(
+            'PATCH',
             rest_api_endpoint,
             headers=self.request_headers,
             cookies=self.cookies,
             data=request_as_json
         )
-        response_object = MstrRestApiFacade._get_response_object(response)
+        response_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
 
         if response.ok:
             self.log.debug(
@@ -429,8 +498,8 @@ class MstrRestApiFacade(object):
 
     def is_user_in_group(self, mstr_user_id, user_group_name):
         rest_api_endpoint = self.mstr_rest_api_base_url + '/users/' + mstr_user_id
-        response = requests.get(rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
-        response_object = MstrRestApiFacade._get_response_object(response)
+        response = self._http_request('GET', rest_api_endpoint, headers=self.request_headers, cookies=self.cookies)
+        response_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
 
         if response.ok:
             self.log.debug(
@@ -456,7 +525,7 @@ class MstrRestApiFacade(object):
 
     # If this method returns 'None' (null) then the validate_session did not succeed
     @staticmethod
-    def validate_session(mstr_rest_api_url, cookies):
+    def validate_session(mstr_rest_api_url, cookies, http_session: Optional[requests.Session] = None):
         # current_session_details = {
         #     'http_status_code': None,
         #     'status': None,
@@ -488,8 +557,13 @@ class MstrRestApiFacade(object):
             'X-MSTR-AuthToken': cookies['mstrAuthToken']
         }
 
+        # Share the connection pool between validations (usually one per web request)
+        mstr_rest_facade_object = MstrRestApiFacade(
+            mstr_rest_api_url, None, None, http_session=http_session, share_pool=True,
+        )
+
         rest_api_endpoint = mstr_rest_api_url + '/sessions'
-        response = requests.get(rest_api_endpoint, headers=headers, cookies=cookies)
+        response = mstr_rest_facade_object._http_request('GET', rest_api_endpoint, headers=headers, cookies=cookies)
 
         if response.ok:
             log.debug('MSTR REST API [VALIDATE SESSION] Successful. mstr_auth_token: ' + cookies[
@@ -500,7 +574,6 @@ class MstrRestApiFacade(object):
             # current_session_details['mstr_user_initials'] = json.loads(response.text)["initials"]
 
             # TODO Make sure we are seeing the id, fullName, and initials in the response before creating this object
-            mstr_rest_facade_object = MstrRestApiFacade(mstr_rest_api_url, None, None)
             mstr_rest_facade_object.set_cookies(cookies)
             mstr_rest_facade_object.set_mstr_auth_token(cookies['mstrAuthToken'])
             mstr_rest_facade_object.set_request_headers(headers)
@@ -509,6 +582,8 @@ class MstrRestApiFacade(object):
         else:
             log.info('MSTR REST API [VALIDATE SESSION] Failed. mstr_auth_token: ' + cookies[
                 'mstrAuthToken'] + ' DOES NOT correspond to a live session')
+            if http_session is None:
+                mstr_rest_facade_object.close()
             return None
 
     def get_folder_contents(self, project_id, folder_id: str = None, raise_exceptions: bool = False) -> List[dict]:
@@ -523,13 +598,22 @@ class MstrRestApiFacade(object):
 
         log_message = f'project_id = {project_id} folder_id = {folder_id}'
 
-        return self.make_request_and_handle(
+        if self.metadata_cache is not None:
+            folder_contents = self.metadata_cache.get_folder_contents(self._metadata_cache_scope, project_id, folder_id)
+            if folder_contents is not None:
+                return folder_contents
+
+        folder_contents = self.make_request_and_handle(
             'get_folder_contents',
             rest_api_endpoint,
             headers=headers,
             log_message=log_message,
             raise_exceptions=raise_exceptions,
         )
+        # Errors are returned as a dict
+        if self.metadata_cache is not None and isinstance(folder_contents, list):
+            self.metadata_cache.set_folder_contents(self._metadata_cache_scope, project_id, folder_id, folder_contents)
+        return folder_contents
 
     def get_predefined_folder_contents(
             self,
@@ -616,34 +700,28 @@ class MstrRestApiFacade(object):
         if project_id is None:
             if project_name is None:
                 raise ValueError('method requires either project_id or project_name')
+            if self.metadata_cache is not None:
+                project_id = self.metadata_cache.get_project_id(self._metadata_cache_scope, project_name)
+                if project_id is not None:
+                    return project_id
             project_info = self.get_project_by_name(
                 project_name=project_name,
                 raise_exceptions=raise_exceptions,
                 disable_error_log=True,
             )
             project_id = project_info['id']
+            if self.metadata_cache is not None and project_id is not None:
+                self.metadata_cache.set_project_id(self._metadata_cache_scope, project_name, project_id)
         return project_id
 
-    def get_objects_by_path(
-            self,
-            object_path: Union[str, List[str]],
-            project_id: str = None,
-            project_name: str = None,
+    @staticmethod
+    def _filter_objects(
+            folder_contents: List[dict],
             type_restriction: Optional[set] = None,
             subtype_restriction: Optional[set] = None,
             name_patterns_to_include: Optional[List[str]] = None,
             name_patterns_to_exclude: Optional[List[str]] = None,
-            raise_exceptions: bool = False,
-    ) -> list:
-
-        project_id = self.get_project_id(project_id, project_name)
-
-        if isinstance(object_path, str):
-            name_parts = MstrRestApiFacade.path_parts(object_path)
-        else:
-            # Blindly assume it's an iterable type
-            name_parts = object_path
-
+    ) -> List[dict]:
         if isinstance(type_restriction, str):
             type_restriction = set(type_restriction.split(','))
         if isinstance(subtype_restriction, str):
@@ -653,6 +731,40 @@ class MstrRestApiFacade(object):
         if isinstance(name_patterns_to_exclude, str):
             name_patterns_to_exclude = [name_patterns_to_exclude]
 
+        if type_restriction is not None:
+            folder_contents = [folder for folder in folder_contents if folder['type'] in type_restriction]
+        if subtype_restriction is not None:
+            folder_contents = [folder for folder in folder_contents if folder['subtype'] in subtype_restriction]
+        if name_patterns_to_include is not None:
+            matched_folders = list()
+            for folder in folder_contents:
+                for include_pattern in name_patterns_to_include:
+                    if fnmatch(folder['name'].lower(), include_pattern.lower()):
+                        matched_folders.append(folder)
+                        break
+            folder_contents = matched_folders
+        if name_patterns_to_exclude is not None:
+            matched_folders = list()
+            for folder in folder_contents:
+                for exclude_pattern in name_patterns_to_exclude:
+                    if not fnmatch(folder['name'].lower(), exclude_pattern.lower()):
+                        matched_folders.append(folder)
+                        break
+            folder_contents = matched_folders
+
+        return folder_contents
+
+    def _walk_object_path(
+            self,
+            project_id: str,
+            name_parts: List[str],
+            object_path: Union[str, List[str]],
+            raise_exceptions: bool = False,
+            visited_folder_ids: Optional[list] = None,
+    ) -> list:
+        if visited_folder_ids is None:
+            visited_folder_ids = list()
+        visited_folder_ids.append(None)
         folder_contents = self.get_folder_contents(project_id=project_id, raise_exceptions=raise_exceptions)
 
         path_so_far = list()
@@ -666,6 +778,7 @@ class MstrRestApiFacade(object):
                     if sub_folder['name'] == folder_name:
                         found = True
                         if sub_folder['type'] == ObjectType.Folder.value:
+                            visited_folder_ids.append(sub_folder['id'])
                             new_folder_contents = self.get_folder_contents(
                                 project_id=project_id,
                                 folder_id=sub_folder['id'],
@@ -681,29 +794,55 @@ class MstrRestApiFacade(object):
                 folder_contents = new_folder_contents
                 path_so_far.append(folder_name)
 
-        if type_restriction is not None:
-            folder_contents = [folder for folder in folder_contents if folder['type'] in type_restriction]
-        if subtype_restriction is not None:
-            folder_contents = [folder for folder in folder_contents if folder['subtype'] in subtype_restriction]
-        if name_patterns_to_include is not None:
-            matched_folders = list()
-            for folder in folder_contents:
-                for include_pattern in name_patterns_to_include:
-                    if fnmatch(folder['name'].lower(), include_pattern.lower()):
-                        matched_folders.append(folder)
-                        break
-            folder_contents = matched_folders
-        if name_patterns_to_exclude is not None:
-            matched_folders = list()
-            for folder in folder_contents:
-                for exclude_pattern in name_patterns_to_exclude:
-                    if not fnmatch(folder['name'].lower(), exclude_pattern.lower()):
-                        matched_folders.append(folder)
-                        break
-            folder_contents = matched_folders
-
         return folder_contents
 
+    def get_objects_by_path(
+            self,
+            object_path: Union[str, List[str]],
+            project_id: str = None,
+            project_name: str = None,
+            type_restriction: Optional[set] = None,
+            subtype_restriction: Optional[set] = None,
+            name_patterns_to_include: Optional[List[str]] = None,
+            name_patterns_to_exclude: Optional[List[str]] = None,
+            raise_exceptions: bool = False,
+    ) -> list:
+
+        project_id = self.get_project_id(project_id, project_name)
+
+        if isinstance(object_path, str):
+            name_parts = MstrRestApiFacade.path_parts(object_path)
+        else:
+            # Blindly assume it's an iterable type
+            name_parts = object_path
+
+        folder_contents = None
+        if self.metadata_cache is not None:
+            folder_contents = self.metadata_cache.get_path_objects(self._metadata_cache_scope, project_id, name_parts)
+        if folder_contents is None:
+            visited_folder_ids = list()
+            try:
+                folder_contents = self._walk_object_path(
+                    project_id, name_parts, object_path, raise_exceptions, visited_folder_ids,
+                )
+            except FileNotFoundError:
+                if self.metadata_cache is None:
+                    raise
+                # The cached folder contents could be out of date, so walk the path again without them
+                for folder_id in visited_folder_ids:
+                    self.metadata_cache.invalidate_folder(folder_id, project_id)
+                folder_contents = self._walk_object_path(project_id, name_parts, object_path, raise_exceptions)
+            if self.metadata_cache is not None and isinstance(folder_contents, list):
+                self.metadata_cache.set_path_objects(self._metadata_cache_scope, project_id, name_parts, folder_contents)
+
+        return MstrRestApiFacade._filter_objects(
+            folder_contents,
+            type_restriction=type_restriction,
+            subtype_restriction=subtype_restriction,
+            name_patterns_to_include=name_patterns_to_include,
+            name_patterns_to_exclude=name_patterns_to_exclude,
+        )
+
     def get_report_definition(
             self,
             project_id: str = None,
@@ -804,7 +943,14 @@ class MstrRestApiFacade(object):
 
         log_message = f'project_id = {project_id} report_id = {report_id} report_path={report_path}'
 
-        return self.make_request_and_handle(
+        if self.metadata_cache is not None:
+            report_definition = self.metadata_cache.get_report_definition(
+                self._metadata_cache_scope, project_id, report_id,
+            )
+            if report_definition is not None:
+                return report_definition
+
+        report_definition = self.make_request_and_handle(
             'get_report_definition',
             rest_api_endpoint,
             headers=headers,
@@ -812,6 +958,12 @@ class MstrRestApiFacade(object):
             raise_exceptions=raise_exceptions,
             disable_error_log=disable_error_log,
         )
+        # Errors are returned without a definition
+        if self.metadata_cache is not None and 'definition' in report_definition:
+            self.metadata_cache.set_report_definition(
+                self._metadata_cache_scope, project_id, report_id, report_definition,
+            )
+        return report_definition
 
     def create_report_instance(
             self,
@@ -934,6 +1086,58 @@ class MstrRestApiFacade(object):
             log_pre_call=True,
         )
 
+    def stream_report_instance_data(
+            self,
+            project_id: str,
+            report_id: str,
+            instance_id: str,
+            offset: int = 0,
+            limit: int = None,
+            get_formatted: bool = False,
+    ) -> StreamedReportInstance:
+        """
+        Like get_report_instance_data, but the response is parsed incrementally (requires ijson),
+        so that large instances are never fully in memory.
+
+        :param project_id:
+        :param report_id:
+        :param instance_id:
+        :param offset:
+        :param limit:
+        :param get_formatted: Decode the formatted metric values instead of the raw ones.
+        :return:
+
+        A StreamedReportInstance to iterate over for (row header element numbers, metric values) tuples.
+        The response is read while iterating, so iterate over it before making other calls.
+
+        Raises APIError if the call fails.
+        """
+        if limit is None:
+            limit = 10**9
+        rest_api_endpoint = (f'{self.mstr_rest_api_base_url}/{self._version}'
+                             f'/reports/{report_id}/instances/{instance_id}')
+        merged_headers = dict(self.request_headers)
+        merged_headers['X-MSTR-ProjectID'] = project_id
+        response = self._http_request(
+            'GET',
+            rest_api_endpoint,
+            headers=merged_headers,
+            params={'offset': offset, 'limit': limit},
+            cookies=self.cookies,
+            stream=True,
+        )
+        if not response.ok:
+            json_object = MstrRestApiFacade._get_response_object(response, self.json_loads)
+            raise APIError(f'MSTR REST API  [stream_report_instance_data] Failed. '
+                           f'Endpoint: {rest_api_endpoint} {json_object.get("message")} {response}')
+        # Un-compress gzip encoded responses
+        response.raw.decode_content = True
+        if get_formatted:
+            values_type = 'formatted'
+        else:
+            values_type = 'raw'
+        return StreamedReportInstance(response.raw, values_type=values_type)
+
     def run_report_raw(
             self,
             project_id: str = None,
@@ -945,7 +1149,8 @@ class MstrRestApiFacade(object):
             offset: int = None,
             time_limit_seconds: int = 600,
             raise_exceptions: bool = False,
-            disable_error_log: bool = False
+            disable_error_log: bool = False,
+            wait_backoff: Optional[Backoff] = None,
     ) -> dict:
         """
 
@@ -953,6 +1158,7 @@ class MstrRestApiFacade(object):
         :param offset:
         :param limit:
         :param time_limit_seconds:
+        :param wait_backoff: Optional. Delays between polls of the instance status. Defaults to the facade's.
         :param project_id:
         :param project_name:
         :param report_path:
@@ -1018,28 +1224,41 @@ class MstrRestApiFacade(object):
         instance_id = instance_results['instanceId']
         report_id = instance_results['id']
 
-        if instance_results['status'] == '2':
-            # TODO: Supply if we have prompt answers
-            # /api/reports/{reportId}/instances/{instanceId}/prompts/answers
-            # TODO: It would be nice to cancel report if no answers available, but API doesn't seem to include that yet
-            raise ValueError('Report needs prompt answers')
-
-        time_waited = 0
-        sleep_interval = 2
+        if wait_backoff is None:
+            wait_backoff = self.wait_backoff
+        start_time = time.monotonic()
+        attempt = 0
         # Wait for the report to finish, if it has not
         while not instance_results['status'] == 1:
+            if instance_results['status'] == 2:
+                # TODO: Supply if we have prompt answers
+                # /api/reports/{reportId}/instances/{instanceId}/prompts/answers
+                # TODO: It would be nice to cancel report if no answers available, but API doesn't seem to include that yet
+                raise ValueError('Report needs prompt answers')
+            time_waited = time.monotonic() - start_time
             if time_waited > time_limit_seconds:
-                raise TimeoutError(f"Timeout after {time_waited} seconds")
+                raise TimeoutError(f"Timeout after {time_waited:.1f} seconds")
+            time.sleep(min(wait_backoff.get_delay(attempt), time_limit_seconds - time_waited))
+            attempt += 1
+            # Poll the status only (one row) and fetch the requested rows once ready
             instance_results = self.get_report_instance_data(
                     project_id=project_id,
                     report_id=report_id,
                     instance_id=instance_id,
-                    limit=limit,
-                    offset=offset,
+                    limit=1,
+                    offset=0,
                     raise_exceptions=raise_exceptions,
                 )
-            time.sleep(sleep_interval)
-            time_waited += sleep_interval
+        if attempt > 0:
+            instance_results = self.get_report_instance_data(
+                project_id=project_id,
+                report_id=report_id,
+                instance_id=instance_id,
+                limit=limit,
+                offset=offset,
+                raise_exceptions=raise_exceptions,
+            )
+            instance_results['project_id'] = project_id
         return instance_results
 
     def run_report_raw_all_data(
@@ -1053,6 +1272,7 @@ class MstrRestApiFacade(object):
             time_limit_seconds: int = 600,
             raise_exceptions: bool = False,
             disable_error_log: bool = False,
+            max_workers: int = 4,
     ) -> dict:
         """
 
@@ -1130,139 +1350,288 @@ class MstrRestApiFacade(object):
                     }
                   }
                 }
-        :param chuck_size:
+        :param chuck_size: Maximum rows to fetch per request.
+                           If the report has more rows, the remaining chunks are fetched concurrently
+                           and merged into one result (see ReportDataMerger).
         :param time_limit_seconds:
         :param disable_error_log:
+        :param max_workers: Maximum number of chunks fetched at once.
         :return:
         """
-        offset = 0
-
         project_id = self.get_project_id(
             project_id=project_id,
             project_name=project_name,
             raise_exceptions=raise_exceptions,
         )
 
-        main_results_instance = self.run_report_raw(
+        first_page = self.run_report_raw(
             project_id=project_id,
             report_path=report_path,
             report_id=report_id,
             filters=filters,
             limit=chuck_size,
-            offset=offset,
+            offset=0,
             time_limit_seconds=time_limit_seconds,
             raise_exceptions=raise_exceptions,
             disable_error_log=disable_error_log,
         )
-        report_id = main_results_instance['id']
+        # The server can return fewer rows than requested, so later pages use the size of the first one
+        return self._merge_pages(self._iter_instance_pages(
+            project_id=project_id,
+            first_page=first_page,
+            chuck_size=chuck_size,
+            page_size=first_page['data']['paging']['current'],
+            disable_error_log=disable_error_log,
+            max_workers=max_workers,
+        ))
 
-        total_rows = main_results_instance['data']['paging']['total']
-        total_rows_downloaded = main_results_instance['data']['paging']['current']
+    @staticmethod
+    def _iter_map(function: Callable, items, max_workers: int):
+        """
+        Like ThreadPoolExecutor.map (results in the order of items), but only runs up to max_workers items
+        ahead of the consumer, so that the results are not all held in memory at once.
+        """
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            futures = deque(
+                executor.submit(function, item) for item in itertools.islice(items, max(max_workers, 1))
+            )
+            while futures:
+                result = futures.popleft().result()
+                for item in itertools.islice(items, 1):
+                    futures.append(executor.submit(function, item))
+                yield result
 
-        del main_results_instance['data']['paging']['current']
+    @staticmethod
+    def _merge_pages(pages) -> dict:
+        pages = iter(pages)
+        merger = ReportDataMerger(next(pages))
+        for page in pages:
+            merger.add_page(page)
+        return merger.get_result()
+
+    def _iter_instance_pages(
+            self,
+            project_id: str,
+            first_page: dict,
+            chuck_size: int,
+            page_size: Optional[int],
+            disable_error_log: bool = False,
+            max_workers: int = 4,
+    ):
+        """
+        Yields first_page (offset 0 of a report instance) and then the remaining pages of the instance
+        in offset order, fetched concurrently up to max_workers pages ahead.
+
+        :param page_size: Number of rows of each remaining page. None to use the size of the second page,
+                          fetched with chuck_size rows (for a first_page fetched with a smaller limit).
+        """
+        yield first_page
+        report_id = first_page['id']
+        instance_id = first_page['instanceId']
+        total_rows = first_page['data']['paging']['total']
+        offset = first_page['data']['paging']['current']
+        if offset >= total_rows:
+            return
+        if offset == 0:
+            raise APIError(f'The report contains {total_rows} rows but the first chunk returned none.')
+
+        def get_page(page_offset: int, limit: int) -> dict:
+            return self.get_report_instance_data(
+                project_id=project_id,
+                report_id=report_id,
+                instance_id=instance_id,
+                limit=limit,
+                offset=page_offset,
+                raise_exceptions=True,
+                disable_error_log=disable_error_log,
+            )
+
+        if page_size is None:
+            page = get_page(offset, chuck_size)
+            yield page
+            page_size = page['data']['paging']['current']
+            offset += page_size
+            if offset >= total_rows:
+                return
+            if page_size == 0:
+                raise APIError(f'The report contains {total_rows} rows but the chunk at {offset} returned none.')
+
+        offsets = range(offset, total_rows, page_size)
+        self.log.debug(f'Fetching {len(offsets)} more chunks of {page_size} rows for instance {instance_id}')
+        yield from self._iter_map(lambda page_offset: get_page(page_offset, page_size), offsets, max_workers)
+
+    def iter_report_raw_pages(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            chuck_size: int = 10**9,
+            time_limit_seconds: int = 600,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False,
+            max_workers: int = 4,
+            max_page_by_workers: int = 4,
+    ):
+        """
+        Runs the report and yields its data one page (of up to chuck_size rows) at a time, in order,
+        as it is fetched. Pages are in the format of run_report_raw, but the element numbers of each page are
+        only valid in that page (see ReportDataMerger to merge them).
+
+        For reports with page-by objects, the data of every page-by slice is returned (instead of only the
+        current page). Each slice is run as its own instance (filtered to the slice's page-by elements) and
+        the page-by objects are moved to the start of the row headers, so their values are the first columns
+        of the output (for example of run_report_csv). The page-by elements are read from a first instance
+        fetched with only one row. Only attributes are supported as page-by objects.
+
+        :param project_id:
+        :param project_name:
+        :param report_path:
+        :param report_id:
+        :param filters: See run_report_raw_all_data
+        :param chuck_size: Maximum rows to fetch per request.
+        :param time_limit_seconds:
+        :param raise_exceptions:
+        :param disable_error_log:
+        :param max_workers: Maximum number of chunks of each instance fetched ahead.
+        :param max_page_by_workers: Maximum number of page-by slices run ahead.
+        :return:
 
-        if total_rows_downloaded != len(main_results_instance['data']['headers']['rows']):
-            raise ValueError(f"REST API Error.  "
-                             f"Got {len(main_results_instance['data']['headers']['rows'])} row header records "
-                             f"but expected {total_rows_downloaded} in this pass")
+        iterator of report instance pages
+        """
+        project_id = self.get_project_id(
+            project_id=project_id,
+            project_name=project_name,
+            raise_exceptions=raise_exceptions,
+        )
+        first_page = self.run_report_raw(
+            project_id=project_id,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            limit=1,
+            offset=0,
+            time_limit_seconds=time_limit_seconds,
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+        )
+        combinations = get_page_by_combinations(first_page)
+        if not combinations:
+            # Continue with the same instance
+            yield from self._iter_instance_pages(
+                project_id=project_id,
+                first_page=first_page,
+                chuck_size=chuck_size,
+                page_size=None,
+                disable_error_log=disable_error_log,
+                max_workers=max_workers,
+            )
+            return
 
-        if total_rows_downloaded != len(main_results_instance['data']['headers']['rows']):
-            raise ValueError(f"REST API Error.  "
-                             f"Got {len(main_results_instance['data']['metricValues']['raw'])} metric value records "
-                             f"but expected {total_rows_downloaded} in this pass")
+        report_id = first_page['id']
+        page_by_objects = first_page['definition']['grid']['pageBy']
+        try:
+            slice_filters = [get_page_by_filters(page_by_objects, combination, filters)
+                             for combination in combinations]
+        except ValueError as e:
+            raise APIError(str(e))
 
-        if total_rows_downloaded != len(main_results_instance['data']['headers']['rows']):
-            raise ValueError(f"REST API Error.  "
-                             f"Got {len(main_results_instance['data']['metricValues']['formatted'])} "
-                             f"metric formatted value records "
-                             f"but expected {total_rows_downloaded} in this pass")
+        def run_slice(page_filters: dict) -> dict:
+            return self.run_report_raw(
+                project_id=project_id,
+                report_id=report_id,
+                filters=page_filters,
+                limit=chuck_size,
+                offset=0,
+                time_limit_seconds=time_limit_seconds,
+                raise_exceptions=True,
+                disable_error_log=disable_error_log,
+            )
 
-        while total_rows_downloaded < total_rows:
-            raise APIError(
-                f'The report contains {total_rows} rows '
-                f'and {chuck_size} is the maximum this API can process.'
+        self.log.debug(f'Running {len(combinations)} page-by slices of report {report_id}')
+        slices = self._iter_map(run_slice, slice_filters, max_page_by_workers)
+        for combination, slice_first_page in zip(combinations, slices):
+            pages = self._iter_instance_pages(
+                project_id=project_id,
+                first_page=slice_first_page,
+                chuck_size=chuck_size,
+                page_size=slice_first_page['data']['paging']['current'],
+                disable_error_log=disable_error_log,
+                max_workers=max_workers,
             )
+            for page in pages:
+                yield page_by_to_rows(page, page_by_objects, combination)
 
-            # TODO: The main_results_instance['definition']['grid']['rows'] and
-            #           next_results_instance['definition']['grid']['rows'] do not have to match
-            #       So in order to properly process the next chunk we need to turn element numbers
-            #       into actual lists of form values for each chunk independently before appending new rows.
-            #       The same is true of results_instance['definition']['grid']['colmns']
-            #       and results_instance['data']['headers']['columns']
-            #       Which also means that if any attributes are in columns, the total report may have more
-            #       columns than any given chunk.
-
-            # offset += chuck_size
-            # next_results_instance = self.get_report_instance_data(
-            #         project_id=project_id,
-            #         report_id=report_id,
-            #         instance_id=main_results_instance['instanceId'],
-            #         raise_exceptions=raise_exceptions,
-            #         limit=chuck_size,
-            #         offset=offset,
-            #     )
-            # total_rows_downloaded += next_results_instance['data']['paging']['current']
-            #
-            # for row_header_num, main_row_header_defn in enumerate(main_results_instance['definition']['grid']['rows']):
-            #     next_row_header_defn = next_results_instance['definition']['grid']['rows'][row_header_num]
-            #     if main_row_header_defn['name'] != next_row_header_defn['name']:
-            #         raise ValueError(f"Initial chunk row header {row_header_num} "
-            #                          f"was '{main_row_header_defn['name']}' vs "
-            #                          f"next chunk with '{main_row_header_defn['name']}'"
-            #                          )
-            #     main_element_set = set(tuple([tuple(element['formValues']) for element in main_row_header_defn['elements']]))
-            #     next_element_set = set(tuple([tuple(element['formValues']) for element in next_row_header_defn['elements']]))
-            #     diff_1 = main_element_set - next_element_set
-            #     diff_2 = next_element_set - main_element_set
-            #     if len(diff_1) > 0 or len(diff_2) > 0:
-            #         raise ValueError(f"Initial chunk row header {row_header_num} "
-            #                          f"was {len(main_element_set)} elements vs "
-            #                          f"next chunk with {len(next_element_set)} elements"
-            #                          f"first A-B diffs = {list(diff_1)[0:10]}"
-            #                          f"first B-A diffs = {list(diff_2)[0:10]}"
-            #                          )
-            #
-            # main_results_instance['data']['headers']['rows'].extend(
-            #     next_results_instance['data']['headers']['rows'])
-            # main_results_instance['data']['metricValues']['raw'].extend(
-            #     next_results_instance['data']['metricValues']['raw'])
-            # main_results_instance['data']['metricValues']['formatted'].extend(
-            #     next_results_instance['data']['metricValues']['formatted'])
-
-        return main_results_instance
+    def run_report_raw_all_page_by(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            chuck_size: int = 10**9,
+            time_limit_seconds: int = 600,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False,
+            max_workers: int = 4,
+            max_page_by_workers: int = 4,
+    ) -> dict:
+        """
+        Like run_report_raw_all_data, but for reports with page-by objects the data of every page-by slice
+        is returned (instead of only the current page). The pages of iter_report_raw_pages merged into one result.
+
+        :param project_id:
+        :param project_name:
+        :param report_path:
+        :param report_id:
+        :param filters: See run_report_raw_all_data
+        :param chuck_size: Maximum rows to fetch per request.
+        :param time_limit_seconds:
+        :param raise_exceptions:
+        :param disable_error_log:
+        :param max_workers: Maximum number of chunks of each instance fetched ahead.
+        :param max_page_by_workers: Maximum number of page-by slices run ahead.
+        :return:
+        """
+        return self._merge_pages(self.iter_report_raw_pages(
+            project_id=project_id,
+            project_name=project_name,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            chuck_size=chuck_size,
+            time_limit_seconds=time_limit_seconds,
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+            max_workers=max_workers,
+            max_page_by_workers=max_page_by_workers,
+        ))
 
     @staticmethod
     def _get_column_names(pivot_entry: dict) -> list:
-        if pivot_entry['type'] == 'attribute':
-            return [f"{pivot_entry['name']} {form['name']}" for form in pivot_entry['forms']]
-        else:
-            return [pivot_entry['name']]
+        return get_column_names(pivot_entry)
 
     @staticmethod
     def _get_column_headers(results_instance: dict) -> list:
-        header_cols = []
-        for row_header in results_instance['definition']['grid']['rows']:
-            header_cols.extend(MstrRestApiFacade._get_column_names(row_header))
-
-        # Process values pivoted to columns
-        column_list = []
-        # Note the zip function takes the multiple lists of values and pivots them into 1 row per column
-        for col_element_values in zip(*results_instance['data']['headers']['columns']):
-            column_name_parts = []
-            for col_object_num, col_element_value in enumerate(col_element_values):
-                col_object_defn = results_instance['definition']['grid']['columns'][col_object_num]
-                if col_object_defn['type'] == 'attribute':
-                    # Note: We use [0] meaning we use the first form only of any attributes
-                    # print(col_object_defn['name'], col_object_defn['elements'][col_element_value]['formValues'][0])
-                    column_name_parts.append(col_object_defn['elements'][col_element_value]['formValues'][0])
-                else:
-                    # print(col_object_defn['name'], col_object_defn['elements'][col_element_value]['name'])
-                    column_name_parts.append(col_object_defn['elements'][col_element_value]['name'])
-            # Join together the parts of the name using spaces
-            column_list.append(' '.join(column_name_parts))
-        header_cols.extend(column_list)
+        return ReportLayout(results_instance['definition']['grid']).get_headers(results_instance)
 
-        return header_cols
+    def get_report_layout(self, results_instance: dict) -> ReportLayout:
+        """
+        Returns the compiled ReportLayout for the results of run_report_raw(_all_data).
+        With a metadata_cache, the layout is re-used for later instances of the same report
+        (as long as it has the same grid objects).
+        """
+        grid = results_instance['definition']['grid']
+        layout = None
+        if self.metadata_cache is not None:
+            layout = self.metadata_cache.get_report_layout(self._metadata_cache_scope, results_instance['id'])
+        if layout is None or not layout.matches(grid):
+            layout = ReportLayout(grid)
+            if self.metadata_cache is not None:
+                self.metadata_cache.set_report_layout(self._metadata_cache_scope, results_instance['id'], layout)
+        return layout
 
     @staticmethod
     def _csv_quote(entry: str, escape: bool) -> str:
@@ -1279,6 +1648,238 @@ class MstrRestApiFacade(object):
     def _csv_quote_list(entries: list, escape: bool) -> list:
         return [MstrRestApiFacade._csv_quote(e, escape) for e in entries]
 
+    @staticmethod
+    def _iter_csv_lines(
+            results_instance: dict,
+            delimiter: str = ',',
+            get_formatted: bool = False,
+            escape: bool = True,
+            layout: Optional[ReportLayout] = None,
+    ):
+        """
+        Yields the lines (without line ends) of the CSV for the results of run_report_raw_all_(data|page_by).
+        """
+        csv_quote = MstrRestApiFacade._csv_quote
+        if layout is None:
+            layout = ReportLayout(results_instance['definition']['grid'])
+
+        # Header row
+        header_cols = layout.get_headers(results_instance)
+        yield delimiter.join(MstrRestApiFacade._csv_quote_list(header_cols, escape))
+
+        data = results_instance['data']
+        header_row_cnt = len(data['headers']['rows'])
+        metric_values_cnt = len(data['metricValues']['raw'])
+        if header_row_cnt != metric_values_cnt:
+            raise ValueError(f'Error from REST API. '
+                             f'We got {header_row_cnt} header rows and {metric_values_cnt} metric value rows')
+
+        # Lookup tables of the quoted values of each element of each row header, so that each
+        # element is only quoted once
+        row_header_values = [
+            [MstrRestApiFacade._csv_quote_list(values, escape) for values in element_values]
+            for element_values in layout.get_row_header_values(results_instance)
+        ]
+
+        # Page-by values are only output if they were moved to the row headers (see run_report_raw_all_page_by)
+
+        metric_rows = layout.get_metric_rows(results_instance, get_formatted)
+
+        # Data rows
+        for data_row, metric_row in zip(data['headers']['rows'], metric_rows):
+            row_value_list = []
+            for element_values, row_header_element_num in zip(row_header_values, data_row):
+                row_value_list.extend(element_values[row_header_element_num])
+            row_value_list.extend([csv_quote(value, escape) for value in metric_row])
+            yield delimiter.join(row_value_list)
+
+    def _iter_report_csv_lines(
+            self,
+            pages,
+            delimiter: str = ',',
+            get_formatted: bool = False,
+            escape: bool = True,
+    ):
+        """
+        Yields the CSV lines of the pages of iter_report_raw_pages, one page at a time as the pages are fetched.
+
+        When the columns hold only metrics every page has the same columns. Attributes on the columns can add
+        columns in later pages (which the header row would not have), so those reports are merged first.
+        """
+        pages = iter(pages)
+        first_page = next(pages)
+        if any(column['type'] == 'attribute' for column in first_page['definition']['grid']['columns']):
+            first_page = self._merge_pages(itertools.chain([first_page], pages))
+        layout = self.get_report_layout(first_page)
+        yield from MstrRestApiFacade._iter_csv_lines(
+            first_page,
+            delimiter=delimiter,
+            get_formatted=get_formatted,
+            escape=escape,
+            layout=layout,
+        )
+        column_names = layout.get_column_names(first_page)
+        for page in pages:
+            if layout.get_column_names(page) != column_names:
+                raise APIError(f"The columns of report {page['id']} changed between pages")
+            lines = MstrRestApiFacade._iter_csv_lines(
+                page,
+                delimiter=delimiter,
+                get_formatted=get_formatted,
+                escape=escape,
+                layout=layout,
+            )
+            # Skip the header row
+            next(lines)
+            yield from lines
+
+    @staticmethod
+    def _iter_csv_chunks(
+            lines,
+            encoding: Optional[str] = 'utf-8',
+            chunk_rows: int = 1000,
+    ):
+        lines = iter(lines)
+        line_end = ''
+        while True:
+            chunk_lines = list(itertools.islice(lines, chunk_rows))
+            if not chunk_lines:
+                break
+            # Lines are separated (not terminated) by new lines, as in run_report_csv
+            chunk = line_end + '\n'.join(chunk_lines)
+            line_end = '\n'
+            if encoding is not None:
+                chunk = chunk.encode(encoding)
+            yield chunk
+
+    def iter_report_csv(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            delimiter: str = ',',
+            get_formatted: bool = False,
+            escape: bool = True,
+            time_limit_seconds: int = 600,
+            disable_error_log: bool = False,
+            encoding: Optional[str] = 'utf-8',
+            chunk_rows: int = 1000,
+    ):
+        """
+        Runs the report and returns an iterator of the CSV results in chunks of chunk_rows lines,
+        for example for a streaming HTTP response. The CSV is the same as run_report_csv.
+
+        The report is run (and its first page fetched) before this returns, so that errors running it are
+        raised here. The rest of the data is fetched while iterating (see iter_report_raw_pages), so the session
+        must stay logged in until the iterator is exhausted. Reports with attributes on the columns are fetched
+        completely before the first chunk, since their later pages can add columns.
+
+        :param filters:
+        :param get_formatted:
+        :param escape:
+        :param delimiter:
+        :param time_limit_seconds:
+        :param project_id:
+        :param project_name:
+        :param report_path:
+        :param report_id:
+        :param disable_error_log:
+        :param encoding: Encoding of the chunks. Use None to get str chunks.
+        :param chunk_rows: Number of CSV lines in each chunk.
+        :return:
+
+        iterator of bytes (or str) chunks
+
+        Raises APIError if the REST API calls fail.
+        """
+        timer = Timer('REST api calls')
+        pages = self.iter_report_raw_pages(
+            project_id=project_id,
+            project_name=project_name,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            time_limit_seconds=time_limit_seconds,
+            disable_error_log=disable_error_log,
+            raise_exceptions=True,
+        )
+        lines = self._iter_report_csv_lines(
+            pages,
+            delimiter=delimiter,
+            get_formatted=get_formatted,
+            escape=escape,
+        )
+        # Run the report now so that its errors are raised by this call
+        header_lines = list(itertools.islice(lines, 1))
+        self.log.info(timer.message())
+        return MstrRestApiFacade._iter_csv_chunks(
+            itertools.chain(header_lines, lines),
+            encoding=encoding,
+            chunk_rows=chunk_rows,
+        )
+
+    def write_report_csv(
+            self,
+            file_obj,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            delimiter: str = ',',
+            get_formatted: bool = False,
+            escape: bool = True,
+            time_limit_seconds: int = 600,
+            disable_error_log: bool = False,
+            encoding: Optional[str] = None,
+            chunk_rows: int = 1000,
+    ) -> int:
+        """
+        Runs the report and writes the CSV results (the same as run_report_csv) to file_obj.
+
+        :param file_obj: File like object with a write method. Text mode unless encoding is given.
+        :param filters:
+        :param get_formatted:
+        :param escape:
+        :param delimiter:
+        :param time_limit_seconds:
+        :param project_id:
+        :param project_name:
+        :param report_path:
+        :param report_id:
+        :param disable_error_log:
+        :param encoding: Encoding to use for a binary file_obj. None for a text file_obj.
+        :param chunk_rows: Number of CSV lines in each write.
+        :return:
+
+        The number of chunks written
+
+        Raises APIError if the REST API calls fail.
+        """
+        chunks = self.iter_report_csv(
+            project_id=project_id,
+            project_name=project_name,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            delimiter=delimiter,
+            get_formatted=get_formatted,
+            escape=escape,
+            time_limit_seconds=time_limit_seconds,
+            disable_error_log=disable_error_log,
+            encoding=encoding,
+            chunk_rows=chunk_rows,
+        )
+        timer = Timer('CSV fetching and formatting calls')
+        chunk_count = 0
+        for chunk in chunks:
+            file_obj.write(chunk)
+            chunk_count += 1
+        self.log.info(timer.message())
+        return chunk_count
+
     def run_report_csv(
             self,
             project_id: str = None,
@@ -1307,12 +1908,14 @@ class MstrRestApiFacade(object):
         :return:
 
         csv results
+
+        See iter_report_csv or write_report_csv to avoid building the whole CSV in memory.
         """
 
-        timer = Timer('REST api calls')
+        timer = Timer('REST api calls and CSV formatting')
 
         try:
-            results_instance = self.run_report_raw_all_data(
+            pages = self.iter_report_raw_pages(
                 project_id=project_id,
                 project_name=project_name,
                 report_path=report_path,
@@ -1322,53 +1925,134 @@ class MstrRestApiFacade(object):
                 disable_error_log=disable_error_log,
                 raise_exceptions=True,
             )
-            self.log.info(timer.message())
-
-            timer = Timer('CSV formatting calls')
-
-            result_lines = []
-
-            # Header row
-            header_cols = MstrRestApiFacade._get_column_headers(results_instance)
-            header_cols = MstrRestApiFacade._csv_quote_list(header_cols, escape)
-            result_lines.append(delimiter.join(header_cols))
-
-            header_row_cnt = len(results_instance['data']['headers']['rows'])
-            metric_values_cnt = len(results_instance['data']['metricValues']['raw'])
-            if header_row_cnt != metric_values_cnt:
-                raise ValueError(f'Error from REST API. '
-                                 f'We got {header_row_cnt} header rows and {metric_values_cnt} metric value rows')
-
-            # Data rows
-            for row_number, data_row in enumerate(results_instance['data']['headers']['rows']):
-                row_value_list = []
-
-                # TODO: Handle Page By. We could at least pre-pend the intial page values to each row
-                #       For now it's best to use datasets with no page by attributes
-                # rslt_all['data']['currentPageBy']
-                # rslt_all['definition']['grid']['pageBy'][0]['elements'][44]['formValues']
-
-                for row_header_num, row_header_element_num in enumerate(data_row):
-                    row_header_defn = results_instance['definition']['grid']['rows'][row_header_num]
-                    row_header_entry = row_header_defn['elements'][row_header_element_num]
-                    if 'formValues' in row_header_entry:
-                        values = row_header_entry['formValues']
-                    else:
-                        values = [row_header_entry['name']]
-                    row_value_list.extend(values)
-                if get_formatted:
-                    row_value_list.extend(results_instance['data']['metricValues']['formatted'][row_number])
-                else:
-                    row_value_list.extend(results_instance['data']['metricValues']['raw'][row_number])
-                row_value_list = MstrRestApiFacade._csv_quote_list(row_value_list, escape)
-                result_lines.append(delimiter.join(row_value_list))
+            result = '\n'.join(self._iter_report_csv_lines(
+                pages,
+                delimiter=delimiter,
+                get_formatted=get_formatted,
+                escape=escape,
+            ))
 
             self.log.info(timer.message())
 
-            return '\n'.join(result_lines)
+            return result
         except APIError as e:
             return f'Error: {e}'
 
+    def get_report_columns(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            get_formatted: bool = False,
+            time_limit_seconds: int = 600,
+            disable_error_log: bool = False
+    ) -> RestReportColumns:
+        """
+        :param filters:
+        :param get_formatted:
+        :param time_limit_seconds:
+        :param project_id:
+        :param project_name:
+        :param report_path:
+        :param report_id:
+
+        :param disable_error_log:
+        :return:
+
+        The report data as RestReportColumns (numpy arrays). Raises APIError if the report fails.
+        """
+        timer = Timer('REST api calls')
+        results_instance = self.run_report_raw_all_page_by(
+            project_id=project_id,
+            project_name=project_name,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            time_limit_seconds=time_limit_seconds,
+            disable_error_log=disable_error_log,
+            raise_exceptions=True,
+        )
+        self.log.info(timer.message())
+
+        timer = Timer('Column building')
+        columns = RestReportColumns(
+            results_instance,
+            get_formatted=get_formatted,
+            layout=self.get_report_layout(results_instance),
+        )
+        self.log.info(timer.message())
+        return columns
+
+    def run_report_arrow(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            time_limit_seconds: int = 600,
+            disable_error_log: bool = False
+    ):
+        """
+        :param filters:
+        :param time_limit_seconds:
+        :param project_id:
+        :param project_name:
+        :param report_path:
+        :param report_id:
+
+        :param disable_error_log:
+        :return:
+
+        pyarrow Table of the raw report data (requires numpy and pyarrow).
+        Attribute forms are dictionary arrays built from the element numbers, metrics are float64.
+        """
+        return self.get_report_columns(
+            project_id=project_id,
+            project_name=project_name,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            time_limit_seconds=time_limit_seconds,
+            disable_error_log=disable_error_log,
+        ).to_arrow()
+
+    def run_report_frame(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            time_limit_seconds: int = 600,
+            disable_error_log: bool = False
+    ):
+        """
+        :param filters:
+        :param time_limit_seconds:
+        :param project_id:
+        :param project_name:
+        :param report_path:
+        :param report_id:
+
+        :param disable_error_log:
+        :return:
+
+        pandas DataFrame of the raw report data (requires numpy and pandas).
+        Attribute forms are Categoricals built from the element numbers, metrics are float64.
+        """
+        return self.get_report_columns(
+            project_id=project_id,
+            project_name=project_name,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            time_limit_seconds=time_limit_seconds,
+            disable_error_log=disable_error_log,
+        ).to_pandas()
+
     def get_report_definition_csv(
             self,
             project_id: str = None,
@@ -0,0 +1,830 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import List, Union, Optional, Iterable
+
+from microstrategy_api.backoff import Backoff
+from microstrategy_api.mstr_rest_api_facade import MstrRestApiFacade, DEFAULT_WAIT_BACKOFF
+from microstrategy_api.mstr_rest_api_facade.api_error import APIError
+from microstrategy_api.mstr_rest_api_facade.json_decoding import fast_json_loads
+from microstrategy_api.mstr_rest_api_facade.metadata_cache import RestMetadataCache
+from microstrategy_api.mstr_rest_api_facade.report_data import ReportDataMerger
+from microstrategy_api.http_session import DEFAULT_POOL_SIZE
+from microstrategy_api.task_proc.object_type import ObjectType
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncMstrRestApiFacade(object):
+    """
+    asyncio counterpart of MstrRestApiFacade built on aiohttp (which must be installed).
+
+    Methods return the same results (and raise the same errors) as the MstrRestApiFacade methods of the same name.
+    gather_user_groups and run_reports run many calls concurrently, at most max_concurrent at a time.
+
+    Use it as an async context manager, which logs in (unless already logged in) and on exit
+    logs out that session and closes the connections::
+
+        async with AsyncMstrRestApiFacade(base_url, username, password) as facade:
+            groups_by_user = await facade.gather_user_groups(user_ids)
+
+    Arguments
+    ----------
+    mstr_rest_api_base_url (str):
+        base url of form https://hostname/MicroStrategyLibrary/api
+    mstr_username (str):
+        username
+    mstr_password (str):
+        password
+    api_version (int):
+        REST API version (2 requires MicroStrategy 2020)
+    http_session (aiohttp.ClientSession):
+        Optional. The aiohttp session to send requests with. It is not closed by close().
+        If not provided, one is created (on the first request) with a connection pool of pool_size.
+    pool_size (int):
+        Maximum number of pooled connections.
+    timeout (float):
+        Optional. Total timeout (in seconds) of each call.
+    max_concurrent (int):
+        Maximum number of calls run at once by gather_user_groups and run_reports.
+    wait_backoff (Backoff):
+        Delays between polls of the status of running report instances.
+    metadata_cache (RestMetadataCache):
+        Optional. Cache for project ids, folder contents and report definitions. Can be shared with other (sync or async) facades.
+    """
+
+    def __init__(self,
+                 mstr_rest_api_base_url,
+                 mstr_username,
+                 mstr_password,
+                 api_version: int = 2,
+                 http_session: Optional['aiohttp.ClientSession'] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: Optional[float] = None,
+                 max_concurrent: int = DEFAULT_POOL_SIZE,
+                 wait_backoff: Backoff = DEFAULT_WAIT_BACKOFF,
+                 metadata_cache: Optional[RestMetadataCache] = None,
+                 ):
+        if aiohttp is None:
+            raise ImportError("AsyncMstrRestApiFacade requires the aiohttp package")
+        self.log = logging.getLogger("{mod}.{cls}".format(mod=self.__class__.__module__, cls=self.__class__.__name__))
+        self.mstr_rest_api_base_url = mstr_rest_api_base_url
+        self.mstr_username = mstr_username
+        self.mstr_password = mstr_password
+        self.mstr_auth_token = None
+        self.api_version = int(api_version)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_concurrent = max_concurrent
+        self.wait_backoff = wait_backoff
+        self.metadata_cache = metadata_cache
+        self._http_session = http_session
+        self._owns_http_session = http_session is None
+        self._owns_login = False
+
+        self.request_headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'X-MSTR-AuthToken': None
+        }
+
+    async def __aenter__(self) -> 'AsyncMstrRestApiFacade':
+        if self.mstr_auth_token is None:
+            login_result_details = await self.login()
+            if login_result_details['mstr_auth_token'] is None:
+                raise APIError(f"Login failed: {login_result_details['error_message']}")
+            self._owns_login = True
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._owns_login:
+            await self.logout()
+            self._owns_login = False
+        await self.close()
+
+    @property
+    def http_session(self) -> 'aiohttp.ClientSession':
+        if self._http_session is None:
+            # Created on first use so that it is bound to the running event loop
+            if self.timeout is None:
+                timeout = aiohttp.ClientTimeout()
+            else:
+                timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                # unsafe allows the session cookies of servers addressed by IP
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                timeout=timeout,
+            )
+        return self._http_session
+
+    async def close(self):
+        """
+        Close the pooled HTTP connections (if the session was created by this facade).
+        Does not log out the MicroStrategy session.
+        """
+        if self._owns_http_session and self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+    @property
+    def _metadata_cache_scope(self) -> tuple:
+        return self.mstr_rest_api_base_url, self.mstr_username
+
+    @property
+    def _version(self) -> str:
+        # Note: Requires MSTR 2020 for v2 support
+        if self.api_version >= 2:
+            return 'v2'
+        else:
+            return ''
+
+    @staticmethod
+    async def _get_response_object(response):
+        try:
+            return await response.json(loads=fast_json_loads, content_type=None)
+        except ValueError:
+            # Default to returning None for all values
+            return defaultdict(lambda: None)
+
+    @staticmethod
+    def error_response(status: int, json_object):
+        return {
+            'error_code': json_object["code"],
+            'error_message': json_object["message"],
+            'http_status_code': status,
+        }
+
+    async def make_request(
+            self,
+            rest_api_endpoint,
+            headers: dict = None,
+            query: dict = None,
+            data: dict = None,
+            method: str = 'get',
+            use_request_headers: bool = True,
+    ):
+        """
+        Returns:
+            A tuple of the HTTP status, the response headers and the response json object
+        """
+        if use_request_headers:
+            merged_headers = dict(self.request_headers)
+        else:
+            merged_headers = dict()
+        if headers is not None:
+            merged_headers.update(headers)
+        # None values can not be sent by aiohttp (requests drops them)
+        merged_headers = {key: value for key, value in merged_headers.items() if value is not None}
+        if query is not None:
+            query = {key: value for key, value in query.items() if value is not None}
+        async with self.http_session.request(
+                method.upper(),
+                rest_api_endpoint,
+                headers=merged_headers,
+                params=query,
+                data=data,
+        ) as response:
+            json_object = await AsyncMstrRestApiFacade._get_response_object(response)
+            return response.status, response.headers, json_object
+
+    async def make_request_and_handle(
+            self,
+            log_name: str,
+            rest_api_endpoint: str,
+            headers: dict = None,
+            query: dict = None,
+            data: dict = None,
+            method: str = 'get',
+            log_message: str = None,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False,
+            log_pre_call: bool = False,
+    ):
+        """
+        See MstrRestApiFacade.make_request_and_handle
+        """
+        if log_message is None:
+            log_message = ''
+        if log_pre_call:
+            self.log.debug(
+                f'MSTR REST API [{log_name}] Starting. '
+                f'Endpoint: {rest_api_endpoint} {log_message}'
+            )
+        status, _, json_object = await self.make_request(
+            rest_api_endpoint,
+            headers=headers,
+            query=query,
+            data=data,
+            method=method,
+        )
+        if status < 400:
+            self.log.debug(
+                f'MSTR REST API [{log_name}] Successful. '
+                f'Endpoint: {rest_api_endpoint} {log_message}'
+            )
+            return json_object
+        else:
+            if 'message' in json_object:
+                mstr_msg = json_object['message']
+            else:
+                mstr_msg = str(json_object)
+            msg = (f'MSTR REST API  [{log_name}] Failed. '
+                   f'Endpoint: {rest_api_endpoint} {log_message} {mstr_msg}')
+            if not disable_error_log:
+                self.log.warning(msg)
+            if raise_exceptions:
+                raise APIError(f'{msg} {status} {mstr_msg}')
+            else:
+                return AsyncMstrRestApiFacade.error_response(status, json_object)
+
+    async def get_status(self) -> dict:
+        return await self.make_request_and_handle(
+            'get_status',
+            f'{self.mstr_rest_api_base_url}/status',
+            raise_exceptions=True,
+        )
+
+    async def login(self) -> dict:
+        """
+        See MstrRestApiFacade.login
+        """
+        rest_api_endpoint = self.mstr_rest_api_base_url + '/auth/login'
+        login_result_details = {
+            'mstr_auth_token': None,
+            'http_status_code': None,
+            'error_message': None,
+            'status': None
+        }
+
+        status, response_headers, response_object = await self.make_request(
+            rest_api_endpoint,
+            data=MstrRestApiFacade._get_login_body(self.mstr_username, self.mstr_password),
+            method='post',
+            use_request_headers=False,
+        )
+        if status < 400:
+            self.log.debug('MSTR REST API [LOGIN] Successful. Endpoint: ' + rest_api_endpoint)
+            self.mstr_auth_token = response_headers['x-mstr-authtoken']
+            self.request_headers['X-MSTR-AuthToken'] = self.mstr_auth_token
+            login_result_details['mstr_auth_token'] = self.mstr_auth_token
+            login_result_details['status'] = 1
+        else:
+            self.log.info(f"'MSTR REST API [LOGIN] Failed. "
+                          f'Endpoint: {rest_api_endpoint}  and Username: {self.mstr_username}. '
+                          f"Http Response Code: {status} {response_object}")
+            login_result_details['error_message'] = response_object["message"]
+            login_result_details['status'] = 0
+
+        login_result_details['http_status_code'] = status
+        return login_result_details
+
+    async def logout(self) -> dict:
+        """
+        See MstrRestApiFacade.logout
+        """
+        logout_result_details = {
+            'http_status_code': None,
+            'error_message': None,
+            'status': None
+        }
+        rest_api_endpoint = self.mstr_rest_api_base_url + '/auth/logout'
+        status, _, _ = await self.make_request(rest_api_endpoint)
+        if status < 400:
+            self.log.info('MSTR REST API [LOGOUT] Successful. '
+                          f'Endpoint: {rest_api_endpoint} mstr_auth_token: {self.mstr_auth_token}')
+            logout_result_details['status'] = 1
+        else:
+            self.log.info('MSTR REST API [LOGOUT] Failed. '
+                          f'Endpoint: {rest_api_endpoint} mstr_auth_token: {self.mstr_auth_token}')
+            logout_result_details['status'] = 0
+        self.mstr_auth_token = None
+        self.request_headers['X-MSTR-AuthToken'] = None
+        logout_result_details['http_status_code'] = status
+        return logout_result_details
+
+    async def get_user_info_for_current_session(self) -> dict:
+        """
+        See MstrRestApiFacade.get_user_info_for_current_session
+        """
+        mstr_user_info = {
+            'mstr_user_id': None,
+            'mstr_user_full_name': None,
+            'mstr_user_initials': None,
+            'http_status_code': None,
+            'error_code': None,
+            'error_message': None
+        }
+        status, _, response_object = await self.make_request(self.mstr_rest_api_base_url + '/sessions/userInfo')
+        if status < 400:
+            mstr_user_info['mstr_user_id'] = response_object["id"]
+            mstr_user_info['mstr_user_full_name'] = response_object["fullName"]
+            mstr_user_info['mstr_user_initials'] = response_object["initials"]
+        else:
+            self.log.info(
+                'MSTR REST API [/sessions/userInfo] Failed. '
+                f'mstr_user_id cannot be retrieved for mstr_auth_token: {self.mstr_auth_token}'
+            )
+            mstr_user_info['error_code'] = response_object["code"]
+            mstr_user_info['error_message'] = response_object["message"]
+        mstr_user_info['http_status_code'] = status
+        return mstr_user_info
+
+    async def get_user_groups(self, mstr_user_id) -> dict:
+        """
+        See MstrRestApiFacade.get_user_groups
+        """
+        mstr_user_groups_info = {
+            'mstr_user_groups': [],
+            'http_status_code': None,
+            'error_code': None,
+            'error_message': None
+        }
+        rest_api_endpoint = self.mstr_rest_api_base_url + '/users/' + mstr_user_id
+        status, _, response_object = await self.make_request(rest_api_endpoint)
+        if status < 400:
+            self.log.debug(
+                'MSTR REST API [GET USER GROUPS] Successful. '
+                f'Endpoint: {rest_api_endpoint} mstr_user_id: {mstr_user_id}'
+            )
+            mstr_user_groups_info['mstr_user_groups'] = response_object["memberships"]
+        else:
+            self.log.info(
+                'MSTR REST API [GET USER GROUPS] Failed. '
+                f'Endpoint: {rest_api_endpoint} mstr_user_id: {mstr_user_id}'
+            )
+            mstr_user_groups_info['error_code'] = response_object["code"]
+            mstr_user_groups_info['error_message'] = response_object["message"]
+        mstr_user_groups_info['http_status_code'] = status
+        return mstr_user_groups_info
+
+    async def get_users_in_group(self, mstr_group_id) -> dict:
+        """
+        See MstrRestApiFacade.get_users_in_group
+        """
+        mstr_users_in_group_info = {
+            'mstr_users': [],
+            'http_status_code': None,
+            'error_code': None,
+            'error_message': None
+        }
+        rest_api_endpoint = self.mstr_rest_api_base_url + '/usergroups/' + mstr_group_id + '/members/'
+        status, _, response_object = await self.make_request(rest_api_endpoint)
+        if status < 400:
+            mstr_users_in_group_info['mstr_users'] = response_object
+        else:
+            self.log.info(
+                'MSTR REST API [GET USERS IN GROUP] Failed. '
+                f'Endpoint: {rest_api_endpoint} mstr_group_id: {mstr_group_id}'
+            )
+            mstr_users_in_group_info['error_code'] = response_object["code"]
+            mstr_users_in_group_info['error_message'] = response_object["message"]
+        mstr_users_in_group_info['http_status_code'] = status
+        return mstr_users_in_group_info
+
+    async def is_user_in_group(self, mstr_user_id, user_group_name) -> bool:
+        """
+        See MstrRestApiFacade.is_user_in_group
+        """
+        mstr_user_groups_info = await self.get_user_groups(mstr_user_id)
+        for user_group in mstr_user_groups_info['mstr_user_groups']:
+            if user_group.get("name") == user_group_name:
+                return True
+        return False
+
+    async def _gather(self, coroutines: Iterable, max_concurrent: Optional[int] = None) -> list:
+        if max_concurrent is None:
+            max_concurrent = self.max_concurrent
+        semaphore = asyncio.Semaphore(max(int(max_concurrent), 1))
+
+        async def run(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*[run(coroutine) for coroutine in coroutines])
+
+    async def gather_user_groups(self, mstr_user_ids: Iterable[str], max_concurrent: Optional[int] = None) -> dict:
+        """
+        Get the groups of many users, running at most max_concurrent calls at a time.
+
+        Arguments
+        ---------
+        mstr_user_ids:
+            The user IDs
+        max_concurrent:
+            Optional. Defaults to the max_concurrent of the facade.
+
+        Returns:
+            A dict of user ID to the get_user_groups result for that user.
+        """
+        mstr_user_ids = list(mstr_user_ids)
+        results = await self._gather(
+            [self.get_user_groups(mstr_user_id) for mstr_user_id in mstr_user_ids],
+            max_concurrent=max_concurrent,
+        )
+        return dict(zip(mstr_user_ids, results))
+
+    async def get_folder_contents(self, project_id, folder_id: str = None, raise_exceptions: bool = False) -> List[dict]:
+        if folder_id is not None:
+            rest_api_endpoint = f'{self.mstr_rest_api_base_url}/folders/{folder_id}'
+        else:
+            rest_api_endpoint = f'{self.mstr_rest_api_base_url}/folders'
+        if self.metadata_cache is not None:
+            folder_contents = self.metadata_cache.get_folder_contents(self._metadata_cache_scope, project_id, folder_id)
+            if folder_contents is not None:
+                return folder_contents
+        folder_contents = await self.make_request_and_handle(
+            'get_folder_contents',
+            rest_api_endpoint,
+            headers={'X-MSTR-ProjectID': project_id},
+            log_message=f'project_id = {project_id} folder_id = {folder_id}',
+            raise_exceptions=raise_exceptions,
+        )
+        # Errors are returned as a dict
+        if self.metadata_cache is not None and isinstance(folder_contents, list):
+            self.metadata_cache.set_folder_contents(self._metadata_cache_scope, project_id, folder_id, folder_contents)
+        return folder_contents
+
+    async def list_projects(self, raise_exceptions: bool = False) -> List[dict]:
+        return await self.make_request_and_handle(
+            'List Projects',
+            f'{self.mstr_rest_api_base_url}/projects',
+            raise_exceptions=raise_exceptions,
+        )
+
+    async def get_project_by_name(
+            self,
+            project_name,
+            raise_exceptions: bool = True,
+            disable_error_log: bool = False
+    ) -> dict:
+        return await self.make_request_and_handle(
+            'get_project_by_name',
+            f'{self.mstr_rest_api_base_url}/projects/{project_name}',
+            log_message=f'project_name = {project_name}',
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+        )
+
+    async def get_project_id(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            raise_exceptions: bool = True,
+    ):
+        if project_id is None:
+            if project_name is None:
+                raise ValueError('method requires either project_id or project_name')
+            if self.metadata_cache is not None:
+                project_id = self.metadata_cache.get_project_id(self._metadata_cache_scope, project_name)
+                if project_id is not None:
+                    return project_id
+            project_info = await self.get_project_by_name(
+                project_name=project_name,
+                raise_exceptions=raise_exceptions,
+                disable_error_log=True,
+            )
+            project_id = project_info['id']
+            if self.metadata_cache is not None and project_id is not None:
+                self.metadata_cache.set_project_id(self._metadata_cache_scope, project_name, project_id)
+        return project_id
+
+    async def get_objects_by_path(
+            self,
+            object_path: Union[str, List[str]],
+            project_id: str = None,
+            project_name: str = None,
+            type_restriction: Optional[set] = None,
+            subtype_restriction: Optional[set] = None,
+            name_patterns_to_include: Optional[List[str]] = None,
+            name_patterns_to_exclude: Optional[List[str]] = None,
+            raise_exceptions: bool = False,
+    ) -> list:
+        """
+        See MstrRestApiFacade.get_objects_by_path
+        """
+        project_id = await self.get_project_id(project_id, project_name)
+
+        if isinstance(object_path, str):
+            name_parts = MstrRestApiFacade.path_parts(object_path)
+        else:
+            name_parts = object_path
+
+        folder_contents = await self.get_folder_contents(project_id=project_id, raise_exceptions=raise_exceptions)
+
+        path_so_far = list()
+        for folder_name in name_parts:
+            if folder_name == '':
+                continue
+            matches = [sub_folder for sub_folder in folder_contents if sub_folder['name'] == folder_name]
+            if not matches:
+                name_list = [folder['name'] for folder in folder_contents]
+                raise FileNotFoundError(f"{folder_name} not found when processing path {object_path}. "
+                                        f"At /{'/'.join(path_so_far)}. "
+                                        f"objects are: {name_list}")
+            # As in MstrRestApiFacade, the last object with the name is used
+            sub_folder = matches[-1]
+            if sub_folder['type'] == ObjectType.Folder.value:
+                folder_contents = await self.get_folder_contents(
+                    project_id=project_id,
+                    folder_id=sub_folder['id'],
+                    raise_exceptions=raise_exceptions,
+                )
+            else:
+                folder_contents = [sub_folder]
+            path_so_far.append(folder_name)
+
+        return MstrRestApiFacade._filter_objects(
+            folder_contents,
+            type_restriction=type_restriction,
+            subtype_restriction=subtype_restriction,
+            name_patterns_to_include=name_patterns_to_include,
+            name_patterns_to_exclude=name_patterns_to_exclude,
+        )
+
+    async def _get_report_id(self, project_id: str, report_path: Optional[str], report_id: Optional[str]) -> str:
+        if report_id is None:
+            if report_path is None:
+                raise ValueError('method requires either report_id or report_path')
+            object_list = await self.get_objects_by_path(project_id=project_id, object_path=report_path)
+            if len(object_list) != 1:
+                raise ValueError(f'get_report_definition found {len(object_list)} objects at {report_path}')
+            report_id = object_list[0]['id']
+        return report_id
+
+    async def get_report_definition(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False
+    ) -> dict:
+        """
+        See MstrRestApiFacade.get_report_definition
+        """
+        project_id = await self.get_project_id(project_id, project_name)
+        report_id = await self._get_report_id(project_id, report_path, report_id)
+        if self.metadata_cache is not None:
+            report_definition = self.metadata_cache.get_report_definition(
+                self._metadata_cache_scope, project_id, report_id,
+            )
+            if report_definition is not None:
+                return report_definition
+        report_definition = await self.make_request_and_handle(
+            'get_report_definition',
+            f'{self.mstr_rest_api_base_url}/{self._version}/reports/{report_id}',
+            headers={'X-MSTR-ProjectID': project_id},
+            log_message=f'project_id = {project_id} report_id = {report_id} report_path={report_path}',
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+        )
+        # Errors are returned without a definition
+        if self.metadata_cache is not None and 'definition' in report_definition:
+            self.metadata_cache.set_report_definition(
+                self._metadata_cache_scope, project_id, report_id, report_definition,
+            )
+        return report_definition
+
+    async def create_report_instance(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            offset: int = 0,
+            limit: int = None,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False
+    ) -> dict:
+        """
+        See MstrRestApiFacade.create_report_instance
+        """
+        project_id = await self.get_project_id(project_id, project_name)
+        report_id = await self._get_report_id(project_id, report_path, report_id)
+        if limit is None:
+            limit = 5000
+        return await self.make_request_and_handle(
+            'create_report_instance',
+            f'{self.mstr_rest_api_base_url}/{self._version}/reports/{report_id}/instances',
+            method='post',
+            headers={'X-MSTR-ProjectID': project_id},
+            query={'offset': offset, 'limit': limit},
+            data=filters,
+            log_message=f'project_id = {project_id} report_id = {report_id} report_path={report_path}',
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+            log_pre_call=True,
+        )
+
+    async def get_report_instance_data(
+            self,
+            project_id: str,
+            report_id: str,
+            instance_id: str,
+            filters: dict = None,
+            offset: int = 0,
+            limit: int = None,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False
+    ) -> dict:
+        """
+        See MstrRestApiFacade.get_report_instance_data
+        """
+        if limit is None:
+            limit = 10**9
+        return await self.make_request_and_handle(
+            'get_report_instance_data',
+            f'{self.mstr_rest_api_base_url}/{self._version}/reports/{report_id}/instances/{instance_id}',
+            query={'offset': offset, 'limit': limit},
+            headers={'X-MSTR-ProjectID': project_id},
+            data=filters,
+            log_message=f'project_id = {project_id} instance_id = {instance_id} offset={offset} limit={limit}',
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+            log_pre_call=True,
+        )
+
+    async def run_report_raw(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            limit: int = 1000,
+            offset: int = None,
+            time_limit_seconds: int = 600,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False,
+            wait_backoff: Optional[Backoff] = None,
+    ) -> dict:
+        """
+        See MstrRestApiFacade.run_report_raw
+        """
+        project_id = await self.get_project_id(project_id=project_id, project_name=project_name)
+        instance_results = await self.create_report_instance(
+            project_id=project_id,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+        )
+        instance_results['project_id'] = project_id
+        instance_id = instance_results['instanceId']
+        report_id = instance_results['id']
+
+        if wait_backoff is None:
+            wait_backoff = self.wait_backoff
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        attempt = 0
+        while not instance_results['status'] == 1:
+            if instance_results['status'] == 2:
+                raise ValueError('Report needs prompt answers')
+            time_waited = loop.time() - start_time
+            if time_waited > time_limit_seconds:
+                raise TimeoutError(f"Timeout after {time_waited:.1f} seconds")
+            await asyncio.sleep(min(wait_backoff.get_delay(attempt), time_limit_seconds - time_waited))
+            attempt += 1
+            # Poll the status only (one row) and fetch the requested rows once ready
+            instance_results = await self.get_report_instance_data(
+                project_id=project_id,
+                report_id=report_id,
+                instance_id=instance_id,
+                limit=1,
+                offset=0,
+                raise_exceptions=raise_exceptions,
+            )
+        if attempt > 0:
+            instance_results = await self.get_report_instance_data(
+                project_id=project_id,
+                report_id=report_id,
+                instance_id=instance_id,
+                limit=limit,
+                offset=offset,
+                raise_exceptions=raise_exceptions,
+            )
+            instance_results['project_id'] = project_id
+        return instance_results
+
+    async def run_report_raw_all_data(
+            self,
+            project_id: str = None,
+            project_name: str = None,
+            report_path: str = None,
+            report_id: str = None,
+            filters: dict = None,
+            chuck_size: int = 10**9,
+            time_limit_seconds: int = 600,
+            raise_exceptions: bool = False,
+            disable_error_log: bool = False,
+            max_concurrent: Optional[int] = None,
+    ) -> dict:
+        """
+        See MstrRestApiFacade.run_report_raw_all_data
+        """
+        project_id = await self.get_project_id(project_id=project_id, project_name=project_name)
+        main_results_instance = await self.run_report_raw(
+            project_id=project_id,
+            report_path=report_path,
+            report_id=report_id,
+            filters=filters,
+            limit=chuck_size,
+            offset=0,
+            time_limit_seconds=time_limit_seconds,
+            raise_exceptions=raise_exceptions,
+            disable_error_log=disable_error_log,
+        )
+        report_id = main_results_instance['id']
+        instance_id = main_results_instance['instanceId']
+        total_rows = main_results_instance['data']['paging']['total']
+        page_size = main_results_instance['data']['paging']['current']
+
+        merger = ReportDataMerger(main_results_instance)
+        if page_size >= total_rows:
+            return merger.get_result()
+        if page_size == 0:
+            raise APIError(f'The report contains {total_rows} rows but the first chunk returned none.')
+
+        pages = await self._gather(
+            [
+                self.get_report_instance_data(
+                    project_id=project_id,
+                    report_id=report_id,
+                    instance_id=instance_id,
+                    limit=page_size,
+                    offset=page_offset,
+                    raise_exceptions=True,
+                    disable_error_log=disable_error_log,
+                )
+                for page_offset in range(page_size, total_rows, page_size)
+            ],
+            max_concurrent=max_concurrent,
+        )
+        for page in pages:
+            merger.add_page(page)
+        return merger.get_result()
+
+    async def run_reports(
+            self,
+            report_ids: Iterable[str],
+            project_id: str = None,
+            project_name: str = None,
+            filters: dict = None,
+            time_limit_seconds: int = 600,
+            max_concurrent: Optional[int] = None,
+            return_exceptions: bool = False,
+    ) -> dict:
+        """
+        Run many reports (with run_report_raw_all_data), running at most max_concurrent at a time.
+
+        Arguments
+        ---------
+        report_ids:
+            The report IDs
+        project_id:
+            The project ID (or give project_name)
+        project_name:
+            The project name
+        filters:
+            Optional. Filters for all the reports. See MstrRestApiFacade.run_report_raw_all_data
+        time_limit_seconds:
+            Time limit for each report
+        max_concurrent:
+            Optional. Defaults to the max_concurrent of the facade.
+        return_exceptions:
+            If True, the exception raised by a report is returned as its result instead of being raised.
+
+        Returns:
+            A dict of report ID to the run_report_raw_all_data result of that report.
+        """
+        report_ids = list(report_ids)
+        project_id = await self.get_project_id(project_id=project_id, project_name=project_name)
+
+        async def run_report(report_id: str):
+            try:
+                return await self.run_report_raw_all_data(
+                    project_id=project_id,
+                    report_id=report_id,
+                    filters=filters,
+                    time_limit_seconds=time_limit_seconds,
+                    raise_exceptions=True,
+                    # Pages of one report are fetched one at a time since reports already run concurrently
+                    max_concurrent=1,
+                )
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        results = await self._gather([run_report(report_id) for report_id in report_ids], max_concurrent)
+        return dict(zip(report_ids, results))
@@ -0,0 +1,122 @@
+"""
+JSON decoding of REST API responses.
+
+fast_json_loads uses orjson when it is installed (and the standard json module otherwise).
+StreamedReportInstance uses ijson (which must be installed) to parse a report instance incrementally.
+"""
+import json
+from typing import Union, Iterator, Tuple, BinaryIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def fast_json_loads(content: Union[bytes, str]):
+    """
+    Decode a JSON document with orjson if installed, else with json.loads.
+    Raises ValueError for invalid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+_SCALAR_EVENTS = frozenset({'null', 'boolean', 'integer', 'double', 'number', 'string'})
+_ROWS_PREFIX = 'data.headers.rows'
+_METRIC_VALUES_PREFIX = 'data.metricValues.'
+
+
+class StreamedReportInstance(object):
+    """
+    A report instance (see MstrRestApiFacade.get_report_instance_data) parsed incrementally from a stream
+    with ijson, so that the metric values are never all in memory at once.
+
+    Iterate over it to get a (row header element numbers, metric values) tuple for each row.
+    Only the metric values of values_type are decoded, the other metric value arrays are skipped.
+    Everything else in the response (definition, paging, column headers ...) is in instance,
+    which is complete once the rows start (MicroStrategy sends the definition and headers
+    before the metric values) and always after the iteration ends.
+    The row header element numbers are kept in instance['data']['headers']['rows'].
+
+    Args:
+        stream:
+            A binary file like object (for example a streamed requests response.raw)
+        values_type:
+            'raw' or 'formatted'
+    """
+
+    def __init__(self, stream: BinaryIO, values_type: str = 'raw'):
+        if ijson is None:
+            raise ImportError("StreamedReportInstance requires the ijson package")
+        self.stream = stream
+        self.values_type = values_type
+        self.rows = list()
+        self._builder = ijson.ObjectBuilder()
+        self._values_prefix = _METRIC_VALUES_PREFIX + values_type
+
+    @property
+    def instance(self) -> dict:
+        instance = getattr(self._builder, 'value', None)
+        if instance is None:
+            return dict()
+        data = instance.get('data')
+        if data is not None and 'headers' in data:
+            data['headers']['rows'] = self.rows
+        return instance
+
+    def _is_ready(self, rows_done: bool) -> bool:
+        return rows_done and 'definition' in self.instance
+
+    def __iter__(self) -> Iterator[Tuple[list, list]]:
+        item_builder = None
+        item_prefix = None
+        rows_done = False
+        pending_values = list()
+        row_number = 0
+        for prefix, event, value in ijson.parse(self.stream, use_float=True):
+            if item_prefix is None:
+                if prefix == _ROWS_PREFIX + '.item':
+                    item_prefix = prefix
+                elif prefix.startswith(_METRIC_VALUES_PREFIX) and prefix.endswith('.item') and prefix.count('.') == 3:
+                    item_prefix = prefix
+                else:
+                    self._builder.event(event, value)
+                    if prefix == _ROWS_PREFIX and event == 'end_array':
+                        rows_done = True
+                    continue
+                item_builder = ijson.ObjectBuilder()
+
+            item_builder.event(event, value)
+            if prefix != item_prefix or event in ('start_map', 'start_array', 'map_key'):
+                continue
+            if event not in _SCALAR_EVENTS and event not in ('end_map', 'end_array'):
+                continue
+
+            # An array item is complete
+            item = item_builder.value
+            completed_prefix = item_prefix
+            item_builder = None
+            item_prefix = None
+            if completed_prefix == _ROWS_PREFIX + '.item':
+                self.rows.append(item)
+            elif completed_prefix == self._values_prefix + '.item':
+                if not self._is_ready(rows_done):
+                    pending_values.append(item)
+                    continue
+                for pending_item in pending_values:
+                    yield self.rows[row_number], pending_item
+                    row_number += 1
+                pending_values = list()
+                yield self.rows[row_number], item
+                row_number += 1
+
+        for pending_item in pending_values:
+            yield self.rows[row_number], pending_item
+            row_number += 1
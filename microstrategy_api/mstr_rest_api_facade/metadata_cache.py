@@ -0,0 +1,121 @@
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+from microstrategy_api.mstr_rest_api_facade.report_data import ReportLayout
+from microstrategy_api.ttl_cache import TTLCache
+
+
+class RestMetadataCache(object):
+    """
+    Cache of REST API metadata lookups made by MstrRestApiFacade:
+     - project name -> project id
+     - folder id -> folder contents
+     - object path -> the objects at that path (before any type or name filtering)
+     - report id -> report definition (get_report_definition result) and compiled ReportLayout
+
+    One RestMetadataCache can be shared by several facades (and threads), for example one per process.
+    Entries are scoped by the REST API base url and user name so that users with different
+    permissions do not see each other's results.
+
+    Args:
+        ttl_seconds:
+            How long entries are kept. None to keep entries until they are evicted or invalidated.
+        max_entries:
+            Maximum number of entries kept in memory (least recently used entries are evicted first).
+        path:
+            Optional. File name of a shelve database to persist the cache in, so a warm cache
+            survives process restarts. Call close() to make sure everything is written out.
+    """
+
+    def __init__(self,
+                 ttl_seconds: Optional[float] = 600,
+                 max_entries: Optional[int] = 10000,
+                 path: Optional[str] = None,
+                 ):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds, path=path)
+
+    @staticmethod
+    def _path_key(path_parts: Iterable[str]) -> Tuple[str, ...]:
+        return tuple(part for part in path_parts if part != '')
+
+    def get_project_id(self, scope: Hashable, project_name: str) -> Optional[str]:
+        return self._cache.get(('project', scope, project_name))
+
+    def set_project_id(self, scope: Hashable, project_name: str, project_id: str):
+        self._cache.set(('project', scope, project_name), project_id)
+
+    def get_folder_contents(self, scope: Hashable, project_id: str, folder_id: Optional[str]) -> Optional[List[dict]]:
+        return self._cache.get(('folder', scope, project_id, folder_id))
+
+    def set_folder_contents(self, scope: Hashable, project_id: str, folder_id: Optional[str], contents: List[dict]):
+        self._cache.set(('folder', scope, project_id, folder_id), contents)
+
+    def get_path_objects(self, scope: Hashable, project_id: str, path_parts: List[str]) -> Optional[List[dict]]:
+        return self._cache.get(('path', scope, project_id, self._path_key(path_parts)))
+
+    def set_path_objects(self, scope: Hashable, project_id: str, path_parts: List[str], objects: List[dict]):
+        self._cache.set(('path', scope, project_id, self._path_key(path_parts)), objects)
+
+    def get_report_definition(self, scope: Hashable, project_id: str, report_id: str) -> Optional[dict]:
+        return self._cache.get(('report', scope, project_id, report_id))
+
+    def set_report_definition(self, scope: Hashable, project_id: str, report_id: str, definition: dict):
+        self._cache.set(('report', scope, project_id, report_id), definition)
+
+    def get_report_layout(self, scope: Hashable, report_id: str) -> Optional[ReportLayout]:
+        return self._cache.get(('layout', scope, report_id))
+
+    def set_report_layout(self, scope: Hashable, report_id: str, layout: ReportLayout):
+        self._cache.set(('layout', scope, report_id), layout)
+
+    def invalidate_report(self, report_id: str) -> int:
+        """
+        Forget the definition and layout of a report (in all scopes).
+        """
+        def predicate(key):
+            return key[0] in ('report', 'layout') and key[-1] == report_id
+
+        return self._cache.delete_where(predicate)
+
+    def invalidate_project(self, project_name: str) -> int:
+        """
+        Forget the id of a project (in all scopes).
+        """
+        def predicate(key):
+            return key[0] == 'project' and key[2] == project_name
+
+        return self._cache.delete_where(predicate)
+
+    def invalidate_path(self, project_id: str, path_parts: List[str]) -> int:
+        """
+        Forget the objects at path (and at all paths below it) in a project (in all scopes).
+        """
+        path_key = self._path_key(path_parts)
+
+        def predicate(key):
+            return key[0] == 'path' and key[2] == project_id and key[3][:len(path_key)] == path_key
+
+        return self._cache.delete_where(predicate)
+
+    def invalidate_folder(self, folder_id: Optional[str], project_id: Optional[str] = None) -> int:
+        """
+        Forget the contents of a folder (in all scopes). Use folder_id None (and a project_id) for the root folder.
+        Cached paths are not affected, see invalidate_path.
+        """
+        def predicate(key):
+            return (
+                key[0] == 'folder'
+                and key[3] == folder_id
+                and (project_id is None or key[2] == project_id)
+            )
+
+        return self._cache.delete_where(predicate)
+
+    def clear(self):
+        self._cache.clear()
+
+    def close(self):
+        self._cache.close()
+
+    @property
+    def statistics(self) -> dict:
+        return self._cache.statistics
@@ -0,0 +1,130 @@
+from typing import Optional, List
+
+from microstrategy_api.mstr_rest_api_facade.report_data import ReportLayout, get_column_names
+
+
+class RestReportColumns(object):
+    """
+    Columnar (numpy based) form of a REST API report instance (see MstrRestApiFacade.run_report_raw_all_data).
+
+    The REST API already returns the row headers dictionary encoded: each row holds element numbers into the
+    element lists of the definition. Each attribute form column keeps those element numbers (as an int32
+    code array) with the distinct form values as its dictionary, without expanding the values of each row.
+    Metric columns are float64 arrays (NaN for empty cells), or object arrays if a value is not numeric.
+
+    Requires numpy. to_pandas requires pandas and to_arrow requires pyarrow.
+
+    Args:
+        results_instance:
+            The report instance
+        get_formatted:
+            Use the formatted metric values instead of the raw ones (metric columns will be object arrays).
+        layout:
+            Optional. The compiled ReportLayout of the report.
+    """
+
+    def __init__(self,
+                 results_instance: dict,
+                 get_formatted: bool = False,
+                 layout: Optional[ReportLayout] = None,
+                 ):
+        import numpy as np
+
+        if layout is None:
+            layout = ReportLayout(results_instance['definition']['grid'])
+        self.names = layout.get_headers(results_instance)
+
+        grid_rows = results_instance['definition']['grid']['rows']
+        header_rows = results_instance['data']['headers']['rows']
+        row_count = len(header_rows)
+        element_numbers = np.asarray(header_rows, dtype=np.int32).reshape(row_count, len(grid_rows))
+
+        # List of (codes, dictionary values)
+        self.dictionary_columns = list()
+        row_header_values = ReportLayout.get_row_header_values(results_instance)
+        for object_number, (row_object, element_values) in enumerate(zip(grid_rows, row_header_values)):
+            for form_number in range(len(get_column_names(row_object))):
+                values = list()
+                value_codes = dict()
+                element_codes = np.empty(len(element_values), dtype=np.int32)
+                for element_number, form_values in enumerate(element_values):
+                    if form_number < len(form_values) and form_values[form_number] is not None:
+                        value = form_values[form_number]
+                        code = value_codes.get(value)
+                        if code is None:
+                            code = len(values)
+                            values.append(value)
+                            value_codes[value] = code
+                    else:
+                        code = -1
+                    element_codes[element_number] = code
+                # Map the element numbers of each row to codes of distinct values
+                codes = element_codes[element_numbers[:, object_number]]
+                self.dictionary_columns.append((codes, values))
+
+        metric_rows = ReportLayout.get_metric_rows(results_instance, get_formatted)
+        metric_count = len(self.names) - len(self.dictionary_columns)
+        self.metric_columns = list()
+        if row_count == 0:
+            self.metric_columns = [np.empty(0, dtype=np.float64) for _ in range(metric_count)]
+        else:
+            try:
+                matrix = np.array(metric_rows, dtype=np.float64).reshape(row_count, metric_count)
+                self.metric_columns = [matrix[:, column_number] for column_number in range(metric_count)]
+            except (ValueError, TypeError):
+                matrix = np.array(metric_rows, dtype=object).reshape(row_count, metric_count)
+                for column_number in range(metric_count):
+                    column = matrix[:, column_number]
+                    try:
+                        column = column.astype(np.float64)
+                    except (ValueError, TypeError):
+                        pass
+                    self.metric_columns.append(column)
+
+    def __len__(self):
+        if self.dictionary_columns:
+            return len(self.dictionary_columns[0][0])
+        elif self.metric_columns:
+            return len(self.metric_columns[0])
+        return 0
+
+    def column_names(self) -> List[str]:
+        return list(self.names)
+
+    def to_numpy(self) -> dict:
+        """
+        Returns a dict of column name to numpy array (attribute form columns are object arrays).
+        """
+        import numpy as np
+        arrays = list()
+        for codes, values in self.dictionary_columns:
+            # The extra None entry at the end is selected by code -1
+            arrays.append(np.array(values + [None], dtype=object)[codes])
+        arrays.extend(self.metric_columns)
+        return dict(zip(self.names, arrays))
+
+    def to_pandas(self):
+        """
+        Returns a pandas DataFrame. Attribute form columns are pandas Categoricals.
+        """
+        import pandas as pd
+        arrays = [pd.Categorical.from_codes(codes, categories=values) for codes, values in self.dictionary_columns]
+        arrays.extend(self.metric_columns)
+        # Build from a list of columns since column names are not always unique
+        frame = pd.concat([pd.Series(array, copy=False) for array in arrays], axis=1, ignore_index=True)
+        frame.columns = self.names
+        return frame
+
+    def to_arrow(self):
+        """
+        Returns a pyarrow Table. Attribute form columns are dictionary arrays.
+        """
+        import pyarrow as pa
+        arrays = list()
+        for codes, values in self.dictionary_columns:
+            indices = pa.array(codes, mask=codes < 0)
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(values)))
+        for column in self.metric_columns:
+            # from_pandas treats NaN as null
+            arrays.append(pa.array(column, from_pandas=True))
+        return pa.Table.from_arrays(arrays, names=self.names)
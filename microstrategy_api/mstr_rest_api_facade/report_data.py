@@ -0,0 +1,362 @@
+"""
+Helpers for the report instance data returned by the REST API (see MstrRestApiFacade.run_report_raw).
+"""
+import itertools
+from typing import List, Optional
+
+# Value used for cells of columns that were not present in a page
+METRIC_FILL_VALUES = {
+    'raw': None,
+    'formatted': '',
+}
+
+
+def check_page(page: dict):
+    """
+    Check that the row headers and metric values of a page of report instance data match paging.current.
+    """
+    data = page['data']
+    expected = data['paging']['current']
+    actual = len(data['headers']['rows'])
+    if actual != expected:
+        raise ValueError(f"REST API Error.  "
+                         f"Got {actual} row header records "
+                         f"but expected {expected} in this pass")
+    for values_type in ['raw', 'formatted']:
+        values = data['metricValues'].get(values_type)
+        if values is not None and len(values) != expected:
+            raise ValueError(f"REST API Error.  "
+                             f"Got {len(values)} metric {values_type} value records "
+                             f"but expected {expected} in this pass")
+
+
+class ElementIndex(object):
+    """
+    The global list of elements of one grid object (an attribute or the metrics) built from many pages.
+
+    Each page of a report instance only lists the elements used in that page, so the element numbers
+    used by the page's headers are only valid within that page.
+    """
+
+    def __init__(self, grid_object: dict):
+        self.grid_object = dict(grid_object)
+        self.grid_object['elements'] = list()
+        self._index = dict()
+
+    @property
+    def name(self) -> str:
+        return self.grid_object.get('name')
+
+    @staticmethod
+    def element_key(element: dict):
+        if 'id' in element:
+            return element['id']
+        elif 'formValues' in element:
+            return tuple(element['formValues'])
+        else:
+            return element.get('name')
+
+    def add(self, element: dict) -> int:
+        """
+        Returns the global element number of element, adding it if new.
+        """
+        key = self.element_key(element)
+        number = self._index.get(key)
+        if number is None:
+            number = len(self.grid_object['elements'])
+            self._index[key] = number
+            self.grid_object['elements'].append(element)
+        return number
+
+    def get_page_map(self, page_grid_object: dict) -> List[int]:
+        """
+        Returns a list mapping the element numbers of a page to global element numbers.
+        """
+        if page_grid_object.get('name') != self.name:
+            raise ValueError(f"Initial page grid object was '{self.name}' "
+                             f"vs next page with '{page_grid_object.get('name')}'")
+        return [self.add(element) for element in page_grid_object['elements']]
+
+
+class ReportDataMerger(object):
+    """
+    Merges pages of the data of one report instance (fetched with different offsets) into one result.
+
+    Row and column header element numbers of each page are re-mapped to global element lists
+    (stored in definition.grid), and since attributes on the columns can make the columns of pages differ,
+    metric values are re-mapped to the global list of columns. Cells of columns not present in a page
+    are filled with METRIC_FILL_VALUES.
+
+    Pages must be added in offset order.
+
+    Args:
+        first_page:
+            The first page (offset 0) of the report instance.
+    """
+
+    def __init__(self, first_page: dict):
+        self.first_page = first_page
+        grid = first_page['definition']['grid']
+        self.row_indexes = [ElementIndex(grid_object) for grid_object in grid['rows']]
+        self.column_indexes = [ElementIndex(grid_object) for grid_object in grid['columns']]
+        # Global column key (tuple of global element numbers) -> global column number
+        self.column_numbers = dict()
+        self.rows = list()
+        self.metric_values = {values_type: list() for values_type in first_page['data']['metricValues']}
+        self.add_page(first_page)
+
+    @property
+    def column_count(self) -> int:
+        return len(self.column_numbers)
+
+    @staticmethod
+    def _get_page_grid(page: dict, grid_part: str, indexes: List[ElementIndex]) -> List[List[int]]:
+        page_grid_objects = page['definition']['grid'][grid_part]
+        if len(page_grid_objects) != len(indexes):
+            raise ValueError(f"Initial page had {len(indexes)} {grid_part} grid objects "
+                             f"vs next page with {len(page_grid_objects)}")
+        return [index.get_page_map(grid_object) for index, grid_object in zip(indexes, page_grid_objects)]
+
+    def _get_page_columns(self, page: dict) -> Optional[List[int]]:
+        """
+        Returns the global column number of each column of the page,
+        or None if the page columns are the global columns.
+        """
+        column_maps = self._get_page_grid(page, 'columns', self.column_indexes)
+        page_columns = list()
+        for column_elements in zip(*page['data']['headers']['columns']):
+            key = tuple(
+                column_map[element_number]
+                for column_map, element_number in zip(column_maps, column_elements)
+            )
+            column_number = self.column_numbers.get(key)
+            if column_number is None:
+                column_number = len(self.column_numbers)
+                self.column_numbers[key] = column_number
+            page_columns.append(column_number)
+        if page_columns == list(range(len(page_columns))):
+            return None
+        return page_columns
+
+    def add_page(self, page: dict):
+        """
+        Add the next page of data.
+        """
+        check_page(page)
+        data = page['data']
+        row_maps = self._get_page_grid(page, 'rows', self.row_indexes)
+        page_columns = self._get_page_columns(page)
+
+        for row in data['headers']['rows']:
+            self.rows.append([row_map[element_number] for row_map, element_number in zip(row_maps, row)])
+
+        for values_type, merged_values in self.metric_values.items():
+            page_values = data['metricValues'].get(values_type, [])
+            if page_columns is None:
+                merged_values.extend(page_values)
+            else:
+                fill_value = METRIC_FILL_VALUES.get(values_type)
+                for row_values in page_values:
+                    merged_row = [fill_value] * (max(page_columns) + 1)
+                    for column_number, value in zip(page_columns, row_values):
+                        merged_row[column_number] = value
+                    merged_values.append(merged_row)
+
+    def get_result(self) -> dict:
+        """
+        Returns the merged report instance (in the same format as a single page).
+        """
+        result = dict(self.first_page)
+        result['definition'] = dict(self.first_page['definition'])
+        grid = dict(result['definition']['grid'])
+        grid['rows'] = [index.grid_object for index in self.row_indexes]
+        grid['columns'] = [index.grid_object for index in self.column_indexes]
+        result['definition']['grid'] = grid
+
+        data = dict(self.first_page['data'])
+        data['paging'] = dict(data['paging'])
+        data['paging']['current'] = len(self.rows)
+        headers = dict(data['headers'])
+        headers['rows'] = self.rows
+        headers['columns'] = [list(elements) for elements in zip(*self.column_numbers)]
+        if not headers['columns']:
+            headers['columns'] = [list() for _ in self.column_indexes]
+        data['headers'] = headers
+
+        column_count = self.column_count
+        metric_values = dict(data['metricValues'])
+        for values_type, merged_values in self.metric_values.items():
+            fill_value = METRIC_FILL_VALUES.get(values_type)
+            metric_values[values_type] = [
+                row_values + [fill_value] * (column_count - len(row_values))
+                if len(row_values) < column_count else row_values
+                for row_values in merged_values
+            ]
+        data['metricValues'] = metric_values
+        result['data'] = data
+        return result
+
+
+def get_page_by_combinations(results_instance: dict) -> List[tuple]:
+    """
+    Returns all the combinations of page-by element numbers of an instance
+    (one element number per definition.grid.pageBy object). Empty if the report has no page-by.
+    """
+    page_by_objects = results_instance['definition']['grid'].get('pageBy') or []
+    if not page_by_objects:
+        return list()
+    return list(itertools.product(*[range(len(page_by['elements'])) for page_by in page_by_objects]))
+
+
+def get_page_by_filters(page_by_objects: List[dict], combination: tuple, filters: Optional[dict] = None) -> dict:
+    """
+    Returns a copy of the report instance filters (see MstrRestApiFacade.run_report_raw_all_data) with
+    a view filter selecting one page-by slice (the element combination of the page-by objects).
+    """
+    operands = list()
+    for page_by, element_number in zip(page_by_objects, combination):
+        if page_by['type'] != 'attribute':
+            raise ValueError(f"Page-by on {page_by['type']} '{page_by.get('name')}' is not supported. "
+                             f"Only attributes can be used to select page-by slices.")
+        element = page_by['elements'][element_number]
+        operands.append({
+            'operator': 'In',
+            'operands': [
+                {'type': 'attribute', 'id': page_by['id'], 'name': page_by.get('name')},
+                {'type': 'elements', 'elements': [{'id': element['id']}]},
+            ],
+        })
+    page_filters = dict(filters or {})
+    if page_filters.get('viewFilter'):
+        operands.insert(0, page_filters['viewFilter'])
+    page_filters['viewFilter'] = {'operator': 'And', 'operands': operands}
+    return page_filters
+
+
+def page_by_to_rows(results_instance: dict, page_by_objects: List[dict], combination: tuple) -> dict:
+    """
+    Returns a copy of the data of one page-by slice with the page-by objects moved in front of the row headers
+    (each with only the element of the slice), so that slices can be merged with ReportDataMerger
+    and output with the page-by values as the first columns.
+    """
+    result = dict(results_instance)
+    result['definition'] = dict(results_instance['definition'])
+    grid = dict(result['definition']['grid'])
+    page_by_rows = [
+        dict(page_by, elements=[page_by['elements'][element_number]])
+        for page_by, element_number in zip(page_by_objects, combination)
+    ]
+    grid['rows'] = page_by_rows + list(grid['rows'])
+    grid['pageBy'] = []
+    result['definition']['grid'] = grid
+
+    data = dict(results_instance['data'])
+    headers = dict(data['headers'])
+    page_by_elements = [0] * len(page_by_rows)
+    headers['rows'] = [page_by_elements + list(row) for row in headers['rows']]
+    data['headers'] = headers
+    result['data'] = data
+    return result
+
+
+def get_column_names(pivot_entry: dict) -> list:
+    """
+    Returns the output column names of a grid object: one per form for attributes, else the object name.
+    """
+    if pivot_entry['type'] == 'attribute':
+        return [f"{pivot_entry['name']} {form['name']}" for form in pivot_entry['forms']]
+    else:
+        return [pivot_entry['name']]
+
+
+class ReportLayout(object):
+    """
+    The layout of a report grid compiled once, so that repeated runs of the same report
+    only need to process the data arrays of each instance:
+     - the output names of the row header columns (one per attribute form)
+     - the output names of the pivoted columns, cached by the elements making up each column
+
+    Use matches() to check that a new instance still has the same grid objects.
+
+    Args:
+        grid:
+            The definition.grid of a report (or report instance)
+    """
+
+    def __init__(self, grid: dict):
+        self.grid_key = ReportLayout.get_grid_key(grid)
+        self.row_header_names = list()
+        for row_header in grid['rows']:
+            self.row_header_names.extend(get_column_names(row_header))
+        # Only attributes on the columns are named by their form value, other objects (metrics) by their name
+        self.column_uses_form_value = [column['type'] == 'attribute' for column in grid['columns']]
+        # Tuple of the element keys of a pivoted column -> column name
+        self._column_names = dict()
+
+    @staticmethod
+    def get_grid_key(grid: dict) -> tuple:
+        return tuple(
+            tuple((grid_object.get('id'), grid_object.get('name')) for grid_object in grid[grid_part])
+            for grid_part in ['rows', 'columns']
+        )
+
+    def matches(self, grid: dict) -> bool:
+        return ReportLayout.get_grid_key(grid) == self.grid_key
+
+    def get_column_names(self, results_instance: dict) -> list:
+        """
+        Returns the names of the pivoted (metric value) columns of an instance.
+        """
+        column_objects = results_instance['definition']['grid']['columns']
+        column_names = list()
+        # Note the zip function takes the multiple lists of values and pivots them into 1 row per column
+        for col_element_values in zip(*results_instance['data']['headers']['columns']):
+            elements = [
+                column_objects[col_object_num]['elements'][col_element_value]
+                for col_object_num, col_element_value in enumerate(col_element_values)
+            ]
+            key = tuple(ElementIndex.element_key(element) for element in elements)
+            column_name = self._column_names.get(key)
+            if column_name is None:
+                column_name_parts = []
+                for uses_form_value, element in zip(self.column_uses_form_value, elements):
+                    if uses_form_value:
+                        # Note: We use [0] meaning we use the first form only of any attributes
+                        column_name_parts.append(element['formValues'][0])
+                    else:
+                        column_name_parts.append(element['name'])
+                # Join together the parts of the name using spaces
+                column_name = ' '.join(column_name_parts)
+                self._column_names[key] = column_name
+            column_names.append(column_name)
+        return column_names
+
+    def get_headers(self, results_instance: dict) -> list:
+        """
+        Returns all the output column names of an instance (row headers and then pivoted columns).
+        """
+        return self.row_header_names + self.get_column_names(results_instance)
+
+    @staticmethod
+    def get_row_header_values(results_instance: dict) -> List[List[list]]:
+        """
+        Returns lookup tables of the output values of each element of each row header object of an instance:
+        result[row header number][element number] is the list of form values.
+        """
+        tables = list()
+        for row_header_defn in results_instance['definition']['grid']['rows']:
+            element_values = list()
+            for row_header_entry in row_header_defn['elements']:
+                if 'formValues' in row_header_entry:
+                    element_values.append(row_header_entry['formValues'])
+                else:
+                    element_values.append([row_header_entry['name']])
+            tables.append(element_values)
+        return tables
+
+    @staticmethod
+    def get_metric_rows(results_instance: dict, get_formatted: bool = False) -> list:
+        if get_formatted:
+            return results_instance['data']['metricValues']['formatted']
+        else:
+            return results_instance['data']['metricValues']['raw']
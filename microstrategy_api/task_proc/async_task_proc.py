@@ -0,0 +1,610 @@
+import asyncio
+import time
+from typing import Optional, List, Union
+
+from bs4 import BeautifulSoup
+
+from microstrategy_api.task_proc.concurrency_limiter import AdaptiveConcurrencyLimiter
+from microstrategy_api.task_proc.document import Document
+from microstrategy_api.task_proc.exceptions import MstrClientException, MstrReportException
+from microstrategy_api.task_proc.executable_base import ExecutableBase
+from microstrategy_api.task_proc.message import Message
+from microstrategy_api.task_proc.object_type import ObjectType, ObjectSubType
+from microstrategy_api.task_proc.report import Report
+from microstrategy_api.task_proc.request_metrics import RequestMetrics
+from microstrategy_api.task_proc.response_cache import ResponseCache
+from microstrategy_api.task_proc.status import Status
+from microstrategy_api.task_proc.task_proc import TaskProc, TaskProcBase, FORM_HEADERS, DEFAULT_MAX_GET_URL_LENGTH
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Responses at least this long (in characters) are parsed in the event loop's default executor
+DEFAULT_EXECUTOR_PARSE_LENGTH = 100000
+# How often a request waiting for a limiter slot checks it again (the limiter is shared with threads)
+LIMITER_POLL_SECONDS = 0.05
+
+
+class AsyncTaskProc(TaskProcBase):
+    """
+    asyncio counterpart of TaskProc built on aiohttp (which must be installed).
+
+    Requests are encoded, checked and retried exactly like TaskProc requests, but are sent without blocking
+    the event loop, and retries wait with asyncio.sleep.
+
+    Use it as an async context manager, which logs in (unless session_state is provided) and on exit
+    logs out that session and closes the connections::
+
+        async with AsyncTaskProc(base_url, server=server, project_name=project, username=user, password=pw) as client:
+            report = Report(client, guid=report_guid)
+            await client.execute_report(report)
+
+    Reports and documents are the same Report and Document objects used with TaskProc, but are executed
+    through the client methods (execute_report, execute_document, execute_async, get_prompts) instead of
+    their own (blocking) methods.
+
+    Arguments
+    ----------
+    base_url (str):
+        base url of form http://hostname/MicroStrategy/asp/TaskProc.aspx
+    username (str):
+        username for project
+    password (str):
+        password for project
+    server (str):
+        The machine name (or IP) of the MicroStrategy Intelligence Server to connect to.
+    project_name (str):
+        The name of the MicroStrategy project to connect to.
+    session_state (str):
+        Optional. An existing session state to use instead of logging in.
+    http_session (aiohttp.ClientSession):
+        Optional. The aiohttp session to send requests with. It is not closed by close().
+        If not provided, one is created (on the first request) with a connection pool of pool_size.
+    pool_size (int):
+        Optional. Maximum number of pooled connections. Defaults to concurrent_max.
+    response_cache (ResponseCache):
+        Optional. Cache for the responses of read only tasks (see TaskProc.request).
+        Can be shared with TaskProc instances.
+    limiter (AdaptiveConcurrencyLimiter):
+        Optional. Limit on the report/document execution requests in flight (see TaskProc).
+        Can be shared with TaskProc instances.
+    max_get_url_length (int):
+        Optional. Requests with a longer url are sent as POST requests (see TaskProc). None to always use GET.
+    metrics (RequestMetrics):
+        Optional. Records the requests (see TaskProc). Can be shared with TaskProc instances.
+    executor_parse_length (int):
+        Optional. Responses at least this long are parsed in the event loop's default executor, so that parsing
+        large responses does not block the event loop. None to always parse in the event loop.
+    """
+
+    def __init__(self,
+                 base_url,
+                 username=None,
+                 password=None,
+                 server=None,
+                 project_name=None,
+                 session_state=None,
+                 concurrent_max=5,
+                 max_retries=3,
+                 retry_delay=2,
+                 http_session: Optional['aiohttp.ClientSession'] = None,
+                 pool_size: Optional[int] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 max_get_url_length: Optional[int] = DEFAULT_MAX_GET_URL_LENGTH,
+                 metrics: Optional[RequestMetrics] = None,
+                 executor_parse_length: Optional[int] = DEFAULT_EXECUTOR_PARSE_LENGTH,
+                 ):
+        if aiohttp is None:
+            raise ImportError("AsyncTaskProc requires the aiohttp package")
+        super().__init__(
+            base_url=base_url,
+            username=username,
+            password=password,
+            server=server,
+            project_name=project_name,
+            concurrent_max=concurrent_max,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            limiter=limiter,
+            max_get_url_length=max_get_url_length,
+            metrics=metrics,
+        )
+        self.response_cache = response_cache
+        self.executor_parse_length = executor_parse_length
+        if pool_size is None:
+            pool_size = concurrent_max
+        self.pool_size = pool_size
+        self._http_session = http_session
+        self._owns_http_session = http_session is None
+        self._owns_session = False
+        self._session = session_state
+        # Serializes logging back in (created on first use so that it is bound to the running event loop)
+        self._login_lock = None
+
+    def __str__(self):
+        return 'AsyncMstrClient session: {}'.format(self._session)
+
+    async def __aenter__(self) -> 'AsyncTaskProc':
+        if self._session is None:
+            if self.username is not None:
+                await self.login()
+            else:
+                await self.login_guest()
+            self._owns_session = True
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._owns_session:
+            await self.logout()
+            self._owns_session = False
+        await self.close()
+
+    @property
+    def http_session(self) -> 'aiohttp.ClientSession':
+        if self._http_session is None:
+            # Created on first use so that it is bound to the running event loop
+            self._http_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self._http_session
+
+    async def close(self):
+        """
+        Close the pooled HTTP connections (if the session was created by this client).
+        Does not log out the MicroStrategy session.
+        """
+        if self._owns_http_session and self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+    async def login(self,
+                    server: str = None,
+                    project_name: str = None,
+                    username: str = None,
+                    password: str = None,
+                    ):
+        """
+        Login to taskproc API. See TaskProc.login
+        """
+        arguments = self._get_login_arguments(
+            server=server,
+            project_name=project_name,
+            username=username,
+            password=password,
+        )
+        self.log.debug("logging in.")
+        response = await self.request(arguments)
+        self._set_session_from_login(response)
+
+    async def login_guest(self,
+                          server: str = None,
+                          project_name: str = None,
+                          ):
+        """
+        Login to taskproc API as guest. See TaskProc.login_guest
+        """
+        arguments = self._get_guest_login_arguments(server=server, project_name=project_name)
+        self.log.debug("logging in as guest")
+        response = await self.request(arguments)
+        self._set_session_from_login(response)
+
+    async def logout(self):
+        arguments = self._get_logout_arguments()
+        try:
+            result = await self.request(arguments, max_retries=0)
+        except Exception as e:
+            result = str(e)
+        self._session = None
+        if self.trace:
+            self.log.debug("logging out returned %s" % result)
+
+    async def _parse(self, text_length: int, function, *args):
+        """
+        Returns function(*args), run in the default executor if the text parsed is at least
+        executor_parse_length long.
+        """
+        if self.executor_parse_length is not None and text_length >= self.executor_parse_length:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, function, *args)
+        return function(*args)
+
+    async def _acquire_limiter(self):
+        # The limiter can be shared with threads, so poll it rather than block the event loop
+        while not self.limiter.acquire(timeout=0):
+            await asyncio.sleep(LIMITER_POLL_SECONDS)
+
+    async def _login_again(self, arguments: dict, task_id: Optional[str] = None):
+        """
+        Replace the session that the server logged out, and update the sessionState of arguments.
+        See TaskProc._login_again
+        """
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        failed_session = arguments.get('sessionState')
+        async with self._login_lock:
+            if failed_session is None or failed_session == self._session:
+                try:
+                    await self.logout()
+                except MstrClientException:
+                    pass
+                await self.login()
+                if self.metrics is not None:
+                    self.metrics.record_relogin(task_id)
+            if 'sessionState' in arguments:
+                arguments['sessionState'] = self._session
+
+    async def request(self, arguments: dict, max_retries: int = None, use_cache: bool = True) -> BeautifulSoup:
+        """
+        Assembles the url and performs a get request (or a post request if the url is too long, see
+        max_get_url_length) to the MicroStrategy Task Service API
+
+        Arguments
+        ---------
+        arguments:
+            Maps get key parameters to values
+        max_retries:
+            Optional. Number of retries to allow.
+        use_cache:
+            Optional. False to bypass the response_cache (the response is still cached).
+
+        Returns:
+            The xml response as a BeautifulSoup 4 object.
+        """
+        if max_retries is None:
+            max_retries = self.max_retries
+
+        request = self._encode_arguments(arguments)
+        cache_response = self.response_cache is not None and self.response_cache.is_cached_task(arguments)
+        if cache_response and use_cache:
+            response_text = self.response_cache.get(self._metadata_cache_scope, arguments)
+            if response_text is not None:
+                return await self._parse(len(response_text), BeautifulSoup, response_text, 'xml')
+
+        task_id = self._get_task_id(arguments)
+        limited = self._is_limited_task(arguments)
+        metrics = self.metrics
+        tries = 0
+        while True:
+            connection_error = False
+            if limited:
+                await self._acquire_limiter()
+            try:
+                if metrics is not None:
+                    start_time = time.perf_counter()
+                if self._use_post(request):
+                    url, body = self._get_post_url_and_body(request)
+                    request_context = self.http_session.post(url, data=body, headers=FORM_HEADERS)
+                else:
+                    request_context = self.http_session.get(request)
+                async with request_context as response:
+                    content = await response.read()
+                    text = await response.text()
+                    status = response.status
+                if metrics is not None:
+                    response_time = time.perf_counter()
+                result_bs4, exception = await self._parse(len(text), self._parse_response, status, text, request)
+                if metrics is not None:
+                    metrics.record_request(
+                        task_id,
+                        network_seconds=response_time - start_time,
+                        parse_seconds=time.perf_counter() - response_time,
+                        response_bytes=len(content),
+                    )
+            except aiohttp.ClientConnectionError as e:
+                connection_error = True
+                exception = e
+            finally:
+                if limited:
+                    self.limiter.release()
+
+            if exception is None:
+                if limited:
+                    self.limiter.on_success()
+                break
+            if limited and self._is_governor_error(str(exception)):
+                self.limiter.on_overload()
+            tries, login_again = self._get_recorded_retry(exception, tries, max_retries, task_id, connection_error)
+            await asyncio.sleep(self._get_retry_wait(tries))
+            if login_again:
+                await self._login_again(arguments, task_id)
+                request = self._encode_arguments(arguments)
+
+        if cache_response:
+            self.response_cache.set(self._metadata_cache_scope, arguments, text)
+        return result_bs4
+
+    async def get_folder_contents_by_guid(self,
+                                          folder_guid: str = None,
+                                          system_folder: Optional[TaskProc.SystemFolders] = None,
+                                          type_restriction: Optional[set] = None,
+                                          sort_key: Optional[TaskProc.FolderSortOrder] = None,
+                                          sort_ascending: Optional[bool] = True,
+                                          name_patterns_to_include: Optional[List[str]] = None,
+                                          name_patterns_to_exclude: Optional[List[str]] = None,
+                                          ) -> List[TaskProc.FolderObject]:
+        """
+        Returns the list of FolderObject in a folder. See TaskProc.get_folder_contents_by_guid
+        """
+        if isinstance(name_patterns_to_include, str):
+            name_patterns_to_include = [name_patterns_to_include]
+        if isinstance(name_patterns_to_exclude, str):
+            name_patterns_to_exclude = [name_patterns_to_exclude]
+
+        arguments = self._get_folder_browse_arguments(
+            self._session,
+            folder_guid=folder_guid,
+            system_folder=system_folder,
+            type_restriction=type_restriction,
+            sort_key=sort_key,
+            sort_ascending=sort_ascending,
+        )
+        try:
+            response = await self.request(arguments)
+        except MstrClientException as e:
+            if TaskProc._is_folder_not_found(e):
+                raise FileNotFoundError("Folder ID {} not found".format(folder_guid))
+            else:
+                raise e
+        return TaskProc._get_folder_objects(
+            TaskProc._parse_folder_entries_bs4(response),
+            name_patterns_to_include,
+            name_patterns_to_exclude,
+        )
+
+    async def get_folder_contents_by_name(self,
+                                          name: Union[str, List[str]],
+                                          type_restriction: Optional[set] = None,
+                                          sort_key: Optional[TaskProc.FolderSortOrder] = None,
+                                          sort_ascending: Optional[bool] = True,
+                                          name_patterns_to_include: Optional[List[str]] = None,
+                                          name_patterns_to_exclude: Optional[List[str]] = None,
+                                          ) -> Union[List[TaskProc.FolderObject], TaskProc.FolderObject]:
+        """
+        Returns the list of FolderObject in a folder given its path. See TaskProc.get_folder_contents_by_name
+        If the path ends with an object that is not a folder, that FolderObject is returned instead (as TaskProc does).
+        """
+        if isinstance(name, str):
+            name_parts = TaskProc.path_parts(name)
+        else:
+            name_parts = list(name)
+        folder_names = [folder_name for folder_name in name_parts if folder_name != '']
+        if len(folder_names) == 0:
+            return []
+        if folder_names[0] != 'Public Objects':
+            raise FileNotFoundError(f'"{folder_names[0]}" not found when processing path {name}')
+
+        if isinstance(type_restriction, str):
+            type_restriction = set(type_restriction.split(','))
+        intermediatefolder_type_restriction = {'2048'}
+        last_part_number = len(folder_names) - 1
+        folder_guid = None
+        for part_number, folder_name in enumerate(folder_names[1:], start=1):
+            if part_number < last_part_number:
+                browse_type_restriction = intermediatefolder_type_restriction
+            elif type_restriction is None:
+                # The last part can be a folder or an object (of the default types, which include folders)
+                browse_type_restriction = None
+            else:
+                # The last part can be a folder or an object of the requested types
+                browse_type_restriction = set(type_restriction) | intermediatefolder_type_restriction
+            folder_contents = await self.get_folder_contents_by_guid(
+                folder_guid=folder_guid,
+                system_folder=TaskProc.SystemFolders.PublicObjects if folder_guid is None else None,
+                type_restriction=browse_type_restriction,
+                sort_key=sort_key,
+                sort_ascending=sort_ascending,
+            )
+            folder_guid = None
+            found_object = None
+            for sub_folder in folder_contents:
+                if sub_folder.name == folder_name:
+                    if sub_folder.object_type == ObjectType.Folder:
+                        folder_guid = sub_folder.guid
+                    else:
+                        found_object = sub_folder
+            if folder_guid is None:
+                if found_object is not None and part_number == last_part_number:
+                    return found_object
+                raise FileNotFoundError(f'"{folder_name}" not found when processing path {name}')
+
+        return await self.get_folder_contents_by_guid(
+            folder_guid=folder_guid,
+            system_folder=TaskProc.SystemFolders.PublicObjects if folder_guid is None else None,
+            type_restriction=type_restriction,
+            sort_key=sort_key,
+            sort_ascending=sort_ascending,
+            name_patterns_to_include=name_patterns_to_include,
+            name_patterns_to_exclude=name_patterns_to_exclude,
+        )
+
+    async def get_folder_contents(self,
+                                  name: Union[str, List[str]],
+                                  type_restriction: Optional[set] = None,
+                                  sort_key: Optional[TaskProc.FolderSortOrder] = None,
+                                  sort_ascending: Optional[bool] = True,
+                                  recursive: Optional[bool] = True,
+                                  name_patterns_to_include: Optional[List[str]] = None,
+                                  name_patterns_to_exclude: Optional[List[str]] = None,
+                                  max_workers: Optional[int] = None,
+                                  ) -> List[TaskProc.FolderObject]:
+        """
+        Get the contents of a folder (by path or guid), optionally including all sub folders.
+        The result is flattened into one list. See TaskProc.get_folder_contents
+
+        Sub folders are browsed breadth first with up to max_workers folderBrowse requests running concurrently.
+        """
+        if type_restriction is not None:
+            sub_type_restriction = set(type_restriction)
+            if recursive:
+                sub_type_restriction.add(ObjectSubType.Folder)
+        else:
+            sub_type_restriction = None
+        browse_arguments = dict(
+            type_restriction=sub_type_restriction,
+            sort_key=sort_key,
+            sort_ascending=sort_ascending,
+            name_patterns_to_include=name_patterns_to_include,
+            name_patterns_to_exclude=name_patterns_to_exclude,
+        )
+
+        if isinstance(name, str) and len(name) == 32 and '/' not in name and '\\' not in name:
+            folder_contents = await self.get_folder_contents_by_guid(folder_guid=name, **browse_arguments)
+        else:
+            folder_contents = await self.get_folder_contents_by_name(name, **browse_arguments)
+
+        if recursive:
+            if max_workers is None:
+                max_workers = self.concurrent_max
+            semaphore = asyncio.Semaphore(max(int(max_workers), 1))
+            sub_folder_contents = dict()
+
+            async def browse(folder_guid: str):
+                async with semaphore:
+                    try:
+                        return await self.get_folder_contents_by_guid(folder_guid=folder_guid, **browse_arguments)
+                    except FileNotFoundError as e:
+                        return e
+
+            level = folder_contents
+            while level:
+                guids = [
+                    item.guid for item in level
+                    if item.object_type == ObjectType.Folder and item.guid not in sub_folder_contents
+                ]
+                results = await asyncio.gather(*[browse(guid) for guid in guids])
+                level = list()
+                for guid, contents in zip(guids, results):
+                    sub_folder_contents[guid] = contents
+                    if isinstance(contents, list):
+                        level.extend(contents)
+            folder_contents = TaskProc._flatten_folder_contents(folder_contents, sub_folder_contents)
+
+        if type_restriction is not None:
+            folder_contents = [sub for sub in folder_contents if sub.object_subtype in type_restriction]
+        return folder_contents
+
+    async def execute_async(self,
+                            executable: ExecutableBase,
+                            arguments: Optional[dict] = None,
+                            value_prompt_answers: Optional[list] = None,
+                            element_prompt_answers: Optional[dict] = None,
+                            refresh_cache: Optional[bool] = False,
+                            max_wait_secs: Optional[int] = 1,
+                            ) -> Message:
+        """
+        Start executing a report/document without waiting for it to finish. See ExecutableBase.execute_async
+
+        Poll the returned Message with update_status or wait_for_message (not Message.update_status).
+        """
+        executable._task_api_client = self
+        if arguments is None:
+            arguments = dict()
+        arguments['maxWait'] = max_wait_secs
+        arguments = executable._get_execute_arguments(
+            arguments=arguments,
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            refresh_cache=refresh_cache,
+        )
+        response = await self.request(arguments)
+        return Message(self, message_type=executable.message_type, response=response)
+
+    async def update_status(self, message: Message, max_wait_ms: Optional[int] = None) -> Message:
+        """
+        Update the status of a running report/document message. See Message.update_status
+        """
+        arguments = message._get_status_arguments(max_wait_ms)
+        try:
+            response = await self.request(arguments, max_retries=3)
+            message.set_from_response(response)
+        except MstrClientException as e:
+            message._set_error(e)
+        return message
+
+    async def wait_for_message(self, message: Message, max_wait_ms: int = 1000) -> Message:
+        """
+        Poll a message until it has a result, needs prompt answers or has failed.
+
+        Arguments
+        ---------
+        message:
+            The Message returned by execute_async
+        max_wait_ms:
+            How long each status poll waits on the server while the report/document is running.
+        """
+        while message.status not in [Status.Result, Status.Prompt, Status.ErrMsg]:
+            self.log.debug("wait_for_message status = {}".format(message.status))
+            await self.update_status(message, max_wait_ms=max_wait_ms)
+        return message
+
+    async def execute_report(self,
+                             report: Report,
+                             start_row: int = 0,
+                             start_col: int = 0,
+                             max_rows: int = 100000,
+                             max_cols: int = 10,
+                             refresh_cache: Optional[bool] = False,
+                             value_prompt_answers: Optional[list] = None,
+                             element_prompt_answers: Optional[dict] = None,
+                             arguments: Optional[dict] = None,
+                             columnar: bool = False,
+                             ) -> Report:
+        """
+        Execute a report and store the results in it (see Report.get_values). See Report.execute
+
+        Raises
+        ------
+            MstrReportException: if there was an error executing the report.
+        """
+        report._task_api_client = self
+        arguments = report._get_execute_arguments(
+            arguments=Report._get_window_arguments(start_row, start_col, max_rows, max_cols, arguments),
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            refresh_cache=refresh_cache,
+        )
+        response = await self.request(arguments)
+        report._set_result(report._parse_report(response, columnar=columnar), columnar=columnar)
+        return report
+
+    async def execute_document(self,
+                               document: Document,
+                               arguments: Optional[dict] = None,
+                               value_prompt_answers: Optional[list] = None,
+                               element_prompt_answers: Optional[dict] = None,
+                               refresh_cache: Optional[bool] = False,
+                               ) -> BeautifulSoup:
+        """
+        Execute a document and return the response. See Document.execute
+        """
+        document._task_api_client = self
+        arguments = document._get_execute_arguments(
+            arguments=Document._get_style_arguments(arguments),
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            refresh_cache=refresh_cache,
+        )
+        return await self.request(arguments)
+
+    async def get_prompts(self, executable: ExecutableBase) -> list:
+        """
+        Returns the prompts of a report/document. See ExecutableBase.get_prompts
+        """
+        if executable._prompts is None:
+            # Start execution to be able to get prompts
+            message = await self.execute_async(executable, arguments=dict(executable.prompt_args))
+            await self.wait_for_message(message)
+            if message.status == Status.ErrMsg:
+                raise MstrReportException(message.status_str)
+            elif message.status == Status.Result:
+                return []
+            response = await self.request(executable._get_prompts_arguments(message), max_retries=3)
+            prompts, prompt_dummy_answers = ExecutableBase._parse_prompts(response)
+            await self.execute_async(
+                executable,
+                arguments={executable.message_id_param: message.guid},
+                element_prompt_answers=prompt_dummy_answers,
+            )
+            executable._prompts = prompts
+        return executable._prompts
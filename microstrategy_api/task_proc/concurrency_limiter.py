@@ -0,0 +1,128 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """
+    Limit on the number of report/document execution requests in flight, adapted to the server's governor
+    limits with AIMD (additive increase, multiplicative decrease):
+     - each successful execution grows the limit by increase / limit (so about increase per limit executions)
+     - each governor error (see TaskProcBase._is_governor_error) multiplies the limit by decrease_factor,
+       at most once per cooldown_seconds so that a burst of rejections of the same overload only counts once.
+
+    TaskProc holds a slot only while an execution request (reportExecute / RWExecute) is sent, so asynchronous
+    executions still running on the server are not counted. ExecutionScheduler also runs at most limit jobs
+    at once, which limits the executions themselves.
+
+    One limiter can be shared by several TaskProc clients (for example all the sessions of a TaskProcSessionPool)
+    and threads.
+
+    Args:
+        initial_limit:
+            Starting number of execution requests allowed in flight.
+        min_limit:
+            The limit never drops below this.
+        max_limit:
+            The limit never grows above this. None for no maximum.
+        increase:
+            Additive increase of the limit per limit successful executions.
+        decrease_factor:
+            Multiplier (0 to 1) applied to the limit on a governor error.
+        cooldown_seconds:
+            Minimum time between two decreases.
+    """
+
+    def __init__(self,
+                 initial_limit: float = 5,
+                 min_limit: float = 1,
+                 max_limit: Optional[float] = None,
+                 increase: float = 1.0,
+                 decrease_factor: float = 0.5,
+                 cooldown_seconds: float = 1.0,
+                 ):
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1 not {}".format(decrease_factor))
+        if min_limit < 1:
+            raise ValueError("min_limit must be at least 1 not {}".format(min_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+        self._limit = self._bounded(float(initial_limit))
+        self._in_flight = 0
+        self._last_decrease = None
+        self.successes = 0
+        self.overloads = 0
+        self._condition = threading.Condition()
+
+    def _bounded(self, limit: float) -> float:
+        limit = max(limit, self.min_limit)
+        if self.max_limit is not None:
+            limit = min(limit, self.max_limit)
+        return limit
+
+    @property
+    def limit(self) -> int:
+        """The current number of execution requests allowed in flight"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait (up to timeout seconds, None to wait forever) until an execution is allowed and count it as in flight.
+
+        Returns:
+            False if the timeout expired.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_flight < self.limit, timeout=timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        """
+        Context manager holding an in flight slot (see acquire).
+        """
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def on_success(self):
+        with self._condition:
+            self.successes += 1
+            old_limit = self.limit
+            self._limit = self._bounded(self._limit + self.increase / self._limit)
+            if self.limit > old_limit:
+                self._condition.notify_all()
+
+    def on_overload(self):
+        with self._condition:
+            self.overloads += 1
+            now = time.monotonic()
+            if self._last_decrease is None or now - self._last_decrease >= self.cooldown_seconds:
+                self._last_decrease = now
+                self._limit = self._bounded(self._limit * self.decrease_factor)
+
+    @property
+    def statistics(self) -> dict:
+        return {
+            'limit': self.limit,
+            'in_flight': self._in_flight,
+            'successes': self.successes,
+            'overloads': self.overloads,
+        }
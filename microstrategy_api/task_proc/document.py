@@ -1,7 +1,5 @@
 from typing import Optional, Tuple
 
-import requests
-
 import microstrategy_api
 from microstrategy_api.task_proc.exceptions import MstrDocumentException
 from microstrategy_api.task_proc.executable_base import ExecutableBase
@@ -72,6 +70,18 @@ class Document(ExecutableBase):
         ------
             MstrReportException: if there was an error executing the report.
         """
+        arguments = Document._get_style_arguments(arguments)
+        response = self.execute_object(
+            arguments=arguments,
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            refresh_cache=refresh_cache,
+            task_api_client=task_api_client,
+        )
+        return response
+
+    @staticmethod
+    def _get_style_arguments(arguments: Optional[dict] = None) -> dict:
         if arguments is None:
             arguments = dict()
 
@@ -81,14 +91,7 @@ class Document(ExecutableBase):
             arguments['styleName'] = 'RWDataVisualizationXMLStyle'
         # prevent columns from merging
         arguments['gridsResultFlags'] = '393216'
-        response = self.execute_object(
-            arguments=arguments,
-            value_prompt_answers=value_prompt_answers,
-            element_prompt_answers=element_prompt_answers,
-            refresh_cache=refresh_cache,
-            task_api_client=task_api_client,
-        )
-        return response
+        return arguments
 
     @staticmethod
     def get_redirect_url(response):
@@ -227,11 +230,11 @@ class Document(ExecutableBase):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; Locust) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36"
         }
 
-        response = requests.get(main_url,
-                                params=arguments,
-                                headers=headers,
-                                cookies=self._task_api_client.cookies
-                                )
+        http_session = self._task_api_client.http_session
+        response = http_session.get(main_url,
+                                    params=arguments,
+                                    headers=headers,
+                                    )
         response.raise_for_status()
         sub_url = Document.get_redirect_url(response)
         if sub_url is not None:
@@ -244,11 +247,10 @@ class Document(ExecutableBase):
                 else:
                     print("timedRedirect call")
                     sub_url = base_url + '/MicroStrategy/asp/' + sub_url
-                    sub_response = requests.get(url=sub_url,
-                                                params=sub_params,
-                                                headers=headers,
-                                                cookies=self._task_api_client.cookies
-                                                )
+                    sub_response = http_session.get(url=sub_url,
+                                                    params=sub_params,
+                                                    headers=headers,
+                                                    )
                     sub_url = Document.get_redirect_url(sub_response)
                     if not sub_url:
                         done = True
@@ -18,6 +18,13 @@ class MstrClientException(Exception):
         )
 
 
+class MstrResponseParseException(MstrClientException):
+    """
+    Class used to raise errors for TaskProc responses that are not valid xml
+    """
+    pass
+
+
 class MstrReportException(MstrClientException):
     """
     Class used to raise errors in the MstrReport class
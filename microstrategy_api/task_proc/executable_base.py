@@ -179,11 +179,33 @@ class ExecutableBase(MetadataObjectNonMemo):
         if task_api_client:
             self._task_api_client = task_api_client
 
+        arguments = self._get_execute_arguments(
+            arguments=arguments,
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            refresh_cache=refresh_cache,
+        )
+        response = self._task_api_client.request(arguments)
+        return response
+
+    def _get_execute_arguments(
+            self,
+            arguments: Optional[dict] = None,
+            value_prompt_answers: Optional[list] = None,
+            element_prompt_answers: Optional[dict] = None,
+            refresh_cache: Optional[bool] = False,
+            task_api_client: 'microstrategy_api.task_proc.task_proc.TaskProc' = None,
+            ) -> dict:
+        """
+        Build the TaskProc arguments used to execute this report/document. See execute_object.
+        """
+        if task_api_client is None:
+            task_api_client = self._task_api_client
         if not arguments:
             arguments = dict()
         arguments['taskId'] = self.exec_task
         arguments[self.obect_id_param] = self.guid
-        arguments['sessionState'] = self._task_api_client.session
+        arguments['sessionState'] = task_api_client.session
         if value_prompt_answers and element_prompt_answers:
             arguments.update(
                 ExecutableBase._format_xml_prompts(
@@ -200,8 +222,7 @@ class ExecutableBase(MetadataObjectNonMemo):
             )
         if refresh_cache:
             arguments[self.refresh_cache_argument] = self.refresh_cache_value
-        response = self._task_api_client.request(arguments)
-        return response
+        return arguments
 
     def execute_async(self,
                       arguments: Optional[dict] = None,
@@ -281,23 +302,8 @@ class ExecutableBase(MetadataObjectNonMemo):
             if message.status == Status.Result:
                 return []
             else:
-                arguments = {
-                    'taskId':       'getPrompts',
-                    'objectType':   self.object_type,
-                    'msgID':        message.guid,
-                    'sessionState': self._task_api_client.session
-                }
-                response = self._task_api_client.request(arguments, max_retries=3)
-
-                # There are many ways that prompts can be returned. This api
-                # currently supports a prompt that uses pre-created prompt objects.
-                prompts = []
-                prompt_dummy_answers = dict()
-                for prompt_xml in response.prompts.contents:
-                    if prompt_xml.name == 'block':
-                        prompt_obj = Prompt(prompt_xml)
-                        prompt_dummy_answers[prompt_obj.attribute] = ''
-                        prompts.append(prompt_obj)
+                response = self._task_api_client.request(self._get_prompts_arguments(message), max_retries=3)
+                prompts, prompt_dummy_answers = ExecutableBase._parse_prompts(response)
                 self.execute_async(
                     arguments={self.message_id_param: message.guid},
                     element_prompt_answers=prompt_dummy_answers
@@ -306,6 +312,31 @@ class ExecutableBase(MetadataObjectNonMemo):
 
         return self._prompts
 
+    def _get_prompts_arguments(self, message: Message) -> dict:
+        return {
+            'taskId':       'getPrompts',
+            'objectType':   self.object_type,
+            'msgID':        message.guid,
+            'sessionState': self._task_api_client.session
+        }
+
+    @staticmethod
+    def _parse_prompts(response: BeautifulSoup) -> Tuple[list, dict]:
+        """
+        Returns the list of Prompt objects in a getPrompts response and a dict of
+        dummy (blank) answers for them.
+        """
+        # There are many ways that prompts can be returned. This api
+        # currently supports a prompt that uses pre-created prompt objects.
+        prompts = []
+        prompt_dummy_answers = dict()
+        for prompt_xml in response.prompts.contents:
+            if prompt_xml.name == 'block':
+                prompt_obj = Prompt(prompt_xml)
+                prompt_dummy_answers[prompt_obj.attribute] = ''
+                prompts.append(prompt_obj)
+        return prompts, prompt_dummy_answers
+
     def get_prompted_attributes(self) -> set:
         attributes = set()
         prompts = self.get_prompts()
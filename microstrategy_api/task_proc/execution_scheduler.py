@@ -0,0 +1,314 @@
+import logging
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Optional, List, Callable
+
+from microstrategy_api.task_proc.exceptions import MstrClientException, MstrReportException
+from microstrategy_api.task_proc.executable_base import ExecutableBase
+from microstrategy_api.task_proc.message import Message
+from microstrategy_api.task_proc.message_poller import MessagePoller, DONE_STATUSES
+from microstrategy_api.task_proc.report import Report
+from microstrategy_api.task_proc.status import Status
+
+if typing.TYPE_CHECKING:
+    import microstrategy_api
+
+
+class JobState(Enum):
+    Pending = 'pending'
+    Running = 'running'
+    Fetching = 'fetching'
+    Done = 'done'
+    Failed = 'failed'
+
+
+class ExecutionJob(object):
+    """
+    One execution of a report or document (with its prompt answers) in an ExecutionScheduler.
+
+    Timings are time.monotonic() values (None until reached):
+     - added_time: when the job was added to the scheduler
+     - start_time: when the (last) execution was started
+     - ready_time: when the result was ready on the server
+     - end_time: when the job finished (including fetching the result)
+    """
+
+    def __init__(self,
+                 executable: ExecutableBase,
+                 value_prompt_answers: Optional[list] = None,
+                 element_prompt_answers: Optional[dict] = None,
+                 arguments: Optional[dict] = None,
+                 refresh_cache: Optional[bool] = False,
+                 fetch_result: bool = True,
+                 name: Optional[str] = None,
+                 ):
+        self.executable = executable
+        self.value_prompt_answers = value_prompt_answers
+        self.element_prompt_answers = element_prompt_answers
+        self.arguments = arguments
+        self.refresh_cache = refresh_cache
+        self.fetch_result = fetch_result
+        self.name = name
+        self.state = JobState.Pending
+        self.message = None  # type: Optional[Message]
+        self.result = None
+        self.error = None  # type: Optional[str]
+        self.tries = 0
+        self.added_time = time.monotonic()
+        self.start_time = None
+        self.ready_time = None
+        self.end_time = None
+
+    def __str__(self):
+        if self.name:
+            result = self.name
+        else:
+            result = str(self.executable)
+        result += " state={}".format(self.state.value)
+        if self.message:
+            result += " status={}".format(self.message.status)
+        if self.error:
+            result += " error={}".format(self.error)
+        return result
+
+    @staticmethod
+    def _elapsed(start: Optional[float], end: Optional[float]) -> Optional[float]:
+        if start is None or end is None:
+            return None
+        return end - start
+
+    @property
+    def queued_seconds(self) -> Optional[float]:
+        """Time from adding the job to starting its (last) execution, including earlier failed tries"""
+        return self._elapsed(self.added_time, self.start_time)
+
+    @property
+    def execution_seconds(self) -> Optional[float]:
+        """Time from starting the (last) execution to the result being ready on the server"""
+        return self._elapsed(self.start_time, self.ready_time)
+
+    @property
+    def fetch_seconds(self) -> Optional[float]:
+        """Time fetching the result"""
+        return self._elapsed(self.ready_time, self.end_time)
+
+    @property
+    def total_seconds(self) -> Optional[float]:
+        """Time from starting the (last) execution to the end of the job"""
+        return self._elapsed(self.start_time, self.end_time)
+
+
+class ExecutionScheduler(object):
+    """
+    Run many report/document executions with at most max_concurrent of them running at a time.
+    If the client has a limiter (AdaptiveConcurrencyLimiter), at most limiter.limit jobs run at a time
+    (when lower), and transient errors of jobs also shrink the limiter's limit.
+
+    Each running job is started with execute_async, its status is polled by a MessagePoller
+    (with intervals that grow while the job runs), and once ready its result is fetched
+    (unless fetch_result is False, for example when warming caches).
+
+    Jobs that fail with one of the transient errors of the TaskProc client
+    (see TaskProc._messages_to_retry, for example governor limits) are started again, up to max_retries times.
+
+    Note: Report results are stored on the Report object, so use a separate Report object for each job
+    that fetches results. Documents can be shared between jobs.
+
+    Args:
+        task_api_client:
+            TaskProc client to execute with
+        max_concurrent:
+            Maximum number of jobs running at once. Defaults to the client's concurrent_max.
+        max_retries:
+            Times to restart a job that failed with a transient error. Defaults to the client's max_retries.
+        poller:
+            Optional. The MessagePoller used to poll running jobs (it can be shared between schedulers).
+            If not provided, one is created for each run.
+        on_job_done:
+            Optional. Called with each ExecutionJob when it is done or has failed.
+    """
+
+    def __init__(self,
+                 task_api_client: 'microstrategy_api.task_proc.task_proc.TaskProc',
+                 max_concurrent: Optional[int] = None,
+                 max_retries: Optional[int] = None,
+                 poller: Optional[MessagePoller] = None,
+                 on_job_done: Optional[Callable[[ExecutionJob], None]] = None,
+                 ):
+        self.log = logging.getLogger("{mod}.{cls}".format(mod=self.__class__.__module__, cls=self.__class__.__name__))
+        self.task_api_client = task_api_client
+        if max_concurrent is None:
+            max_concurrent = task_api_client.concurrent_max
+        self.max_concurrent = max_concurrent
+        if max_retries is None:
+            max_retries = task_api_client.max_retries
+        self.max_retries = max_retries
+        self.poller = poller
+        self._run_poller = None
+        self.on_job_done = on_job_done
+        self.jobs = list()  # type: List[ExecutionJob]
+        self._lock = threading.Lock()
+        self._running = 0
+        self._running_condition = threading.Condition()
+
+    def add(self,
+            executable: ExecutableBase,
+            value_prompt_answers: Optional[list] = None,
+            element_prompt_answers: Optional[dict] = None,
+            arguments: Optional[dict] = None,
+            refresh_cache: Optional[bool] = False,
+            fetch_result: bool = True,
+            name: Optional[str] = None,
+            ) -> ExecutionJob:
+        """
+        Add a job to the schedule. See ExecutableBase.execute_async for the arguments.
+        """
+        job = ExecutionJob(
+            executable,
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            arguments=arguments,
+            refresh_cache=refresh_cache,
+            fetch_result=fetch_result,
+            name=name,
+        )
+        with self._lock:
+            self.jobs.append(job)
+        return job
+
+    def run(self) -> List[ExecutionJob]:
+        """
+        Run all pending jobs and wait for them to finish.
+
+        Returns:
+            The list of jobs that were run (check each job's state, result and error).
+        """
+        with self._lock:
+            jobs = [job for job in self.jobs if job.state == JobState.Pending]
+        if self.poller is None:
+            self._run_poller = MessagePoller()
+        else:
+            self._run_poller = self.poller
+        try:
+            with ThreadPoolExecutor(max_workers=max(int(self.max_concurrent), 1)) as executor:
+                for future in [executor.submit(self._run_job, job) for job in jobs]:
+                    future.result()
+        finally:
+            if self.poller is None:
+                self._run_poller.close()
+            self._run_poller = None
+        return jobs
+
+    def _is_transient_error(self, error: str) -> bool:
+        return self.task_api_client._is_governor_error(error)
+
+    @property
+    def concurrent_limit(self) -> int:
+        """
+        The current maximum number of running jobs: max_concurrent, or the client's limiter.limit if lower.
+        """
+        limit = int(self.max_concurrent)
+        limiter = self.task_api_client.limiter
+        if limiter is not None:
+            limit = min(limit, limiter.limit)
+        return max(limit, 1)
+
+    def _start_running(self):
+        with self._running_condition:
+            # The limiter's limit can grow without notifying us, so re-check it periodically
+            while self._running >= self.concurrent_limit:
+                self._running_condition.wait(timeout=0.5)
+            self._running += 1
+
+    def _stop_running(self):
+        with self._running_condition:
+            self._running -= 1
+            self._running_condition.notify()
+
+    def _run_job(self, job: ExecutionJob):
+        while True:
+            self._start_running()
+            job.tries += 1
+            job.state = JobState.Running
+            job.start_time = time.monotonic()
+            job.ready_time = None
+            job.error = None
+            request_failed = False
+            try:
+                self._execute(job)
+            except (MstrClientException, MstrReportException) as e:
+                job.error = str(e)
+                request_failed = True
+            except Exception as e:
+                # Anything else (connection errors once retries are exhausted, timeouts, bugs) fails the job
+                # instead of the whole run, so that on_job_done is still called
+                self.log.exception("Job {} raised {}".format(job, e))
+                job.error = "{}: {}".format(type(e).__name__, e)
+                request_failed = True
+            finally:
+                self._stop_running()
+            if job.error is None:
+                job.state = JobState.Done
+                self.log.debug("Job {} completed".format(job))
+                break
+            transient_error = self._is_transient_error(job.error)
+            limiter = self.task_api_client.limiter
+            # Governor errors of the execution request itself were already counted by TaskProc.request,
+            # only those of an execution that failed on the server are counted here.
+            if transient_error and not request_failed and limiter is not None:
+                limiter.on_overload()
+            if transient_error and job.tries <= self.max_retries:
+                self.log.info("Job {} failed with a transient error. Retrying. Tries={}".format(job, job.tries))
+                time.sleep(self.task_api_client._get_retry_wait(job.tries))
+            else:
+                job.state = JobState.Failed
+                self.log.error("Job {} failed".format(job))
+                break
+        job.end_time = time.monotonic()
+        if self.on_job_done is not None:
+            self.on_job_done(job)
+
+    def _execute(self, job: ExecutionJob):
+        arguments = dict(job.arguments) if job.arguments else None
+        job.message = job.executable.execute_async(
+            arguments=arguments,
+            value_prompt_answers=job.value_prompt_answers,
+            element_prompt_answers=job.element_prompt_answers,
+            refresh_cache=job.refresh_cache,
+        )
+        if job.message.status not in DONE_STATUSES:
+            self._run_poller.watch(job.message).result()
+        job.ready_time = time.monotonic()
+
+        if job.message.status == Status.ErrMsg:
+            job.error = job.message.status_str
+        elif job.message.status == Status.Prompt:
+            job.error = "{} has un-resolved prompts".format(job.executable)
+        elif job.fetch_result:
+            job.state = JobState.Fetching
+            job.result = job.executable.execute(arguments={job.executable.message_id_param: job.message.guid})
+            if isinstance(job.executable, Report):
+                job.result = job.executable.get_values()
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Summary of the jobs: counts by state and the mean / max execution and total times (in seconds)
+        of the finished jobs.
+        """
+        with self._lock:
+            jobs = list(self.jobs)
+        result = {state.value: 0 for state in JobState}
+        for job in jobs:
+            result[job.state.value] += 1
+        result['retries'] = sum(max(job.tries - 1, 0) for job in jobs)
+        for timing in ['queued_seconds', 'execution_seconds', 'total_seconds']:
+            values = [getattr(job, timing) for job in jobs if job.state == JobState.Done]
+            values = [value for value in values if value is not None]
+            if values:
+                result['mean_' + timing] = sum(values) / len(values)
+                result['max_' + timing] = max(values)
+        return result
@@ -72,7 +72,7 @@ class Message(MessageBase):
             except ValueError:
                 pass
 
-    def update_status(self, max_wait_ms: Optional[int] = None):
+    def _get_status_arguments(self, max_wait_ms: Optional[int] = None) -> dict:
         arguments = {'taskId':    'pollEmmaStatus',
                      'msgID':     self.guid,
                      'resultSetType': self.message_type,
@@ -80,10 +80,17 @@ class Message(MessageBase):
                      }
         if max_wait_ms:
             arguments['maxWait'] = max_wait_ms
+        return arguments
+
+    def _set_error(self, exception: MstrClientException):
+        self.log.exception(exception)
+        self.status = Status.ErrMsg
+        self.status_str = str(exception)
+
+    def update_status(self, max_wait_ms: Optional[int] = None):
+        arguments = self._get_status_arguments(max_wait_ms)
         try:
             response = self.task_api_client.request(arguments, max_retries=3)
             self.set_from_response(response)
         except MstrClientException as e:
-            self.log.exception(e)
-            self.status = Status.ErrMsg
-            self.status_str = str(e)
+            self._set_error(e)
@@ -0,0 +1,206 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Callable, Set
+
+from microstrategy_api.backoff import Backoff
+from microstrategy_api.task_proc.message import Message
+from microstrategy_api.task_proc.status import Status
+
+DONE_STATUSES = frozenset({Status.Result, Status.Prompt, Status.ErrMsg})
+
+WAITING_STATUSES = frozenset({
+    Status.Waiting,
+    Status.WaitingOnGovernor,
+    Status.WaitingForProject,
+    Status.WaitingForChildren,
+})
+
+
+class _WatchedMessage(object):
+    def __init__(self, message: Message, future: Future, callback: Optional[Callable[[Message], None]]):
+        self.message = message
+        self.future = future
+        self.callback = callback
+        self.start_time = time.monotonic()
+        self.polls = 0
+
+
+class MessagePoller(object):
+    """
+    Polls the status of many running report/document messages until each has a result,
+    needs prompt answers or has failed.
+
+    Each message is polled on its own schedule: the interval starts at initial_interval and grows
+    with the number of polls (see Backoff) and with the time the message has been running
+    (elapsed_fraction of it), up to max_interval. Messages waiting in a queue (for example
+    Status.WaitingOnGovernor) are polled waiting_factor times less often than messages being processed.
+    Due polls are sent on a pool of max_workers threads.
+
+    Note: the TaskProc pollEmmaStatus task only accepts a single message, so polls can not be
+    combined into one request. The load is reduced by polling less often instead.
+
+    Use close() (or a with block) to stop polling.
+
+    Args:
+        max_workers:
+            Number of threads sending polls.
+        initial_interval:
+            Seconds before the first poll of a message.
+        max_interval:
+            Maximum seconds between polls of a message.
+        backoff_factor:
+            Growth of the poll interval for each poll.
+        elapsed_fraction:
+            The interval is at least this fraction of the time the message has been running.
+        waiting_factor:
+            Multiplier for the interval of messages in one of waiting_statuses.
+        waiting_statuses:
+            Statuses in which a message is waiting to start rather than being processed.
+    """
+
+    def __init__(self,
+                 max_workers: int = 4,
+                 initial_interval: float = 0.25,
+                 max_interval: float = 10.0,
+                 backoff_factor: float = 1.5,
+                 elapsed_fraction: float = 0.1,
+                 waiting_factor: float = 4.0,
+                 waiting_statuses: Set[Status] = WAITING_STATUSES,
+                 ):
+        self.log = logging.getLogger("{mod}.{cls}".format(mod=self.__class__.__module__, cls=self.__class__.__name__))
+        self.backoff = Backoff(initial_delay=initial_interval, max_delay=max_interval, factor=backoff_factor)
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.elapsed_fraction = elapsed_fraction
+        self.waiting_factor = waiting_factor
+        self.waiting_statuses = waiting_statuses
+        self.polls = 0
+        # heap of (next poll time, sequence, _WatchedMessage)
+        self._heap = list()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max(int(max_workers), 1))
+        self._thread = None
+        self._closed = False
+
+    def __enter__(self) -> 'MessagePoller':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._heap)
+
+    def watch(self, message: Message, callback: Optional[Callable[[Message], None]] = None) -> Future:
+        """
+        Start polling a message.
+
+        Arguments
+        ---------
+        message:
+            The Message returned by execute_async
+        callback:
+            Optional. Called (on a poller thread) with the message once it is done.
+
+        Returns:
+            A Future that is resolved with the message once its status is Result, Prompt or ErrMsg.
+        """
+        entry = _WatchedMessage(message, Future(), callback)
+        if message.status in DONE_STATUSES:
+            self._complete(entry)
+        else:
+            self._schedule(entry, self.initial_interval)
+        return entry.future
+
+    def get_interval(self, message: Message, polls: int, elapsed: float) -> float:
+        """
+        Returns the seconds to wait before the next poll of message.
+
+        Arguments
+        ---------
+        message:
+            The message (with the status of the last poll)
+        polls:
+            The number of polls of the message so far
+        elapsed:
+            The seconds since the message started being watched
+        """
+        interval = max(self.backoff.get_delay(polls), elapsed * self.elapsed_fraction)
+        if message.status in self.waiting_statuses:
+            interval *= self.waiting_factor
+        return min(interval, self.max_interval)
+
+    def close(self):
+        """
+        Stop polling. Futures of messages still being watched are cancelled.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+        with self._condition:
+            for _, _, entry in self._heap:
+                entry.future.cancel()
+            self._heap = list()
+
+    def _schedule(self, entry: _WatchedMessage, delay: float):
+        with self._condition:
+            if self._closed:
+                entry.future.cancel()
+                return
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), entry))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='MessagePoller', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._heap:
+                        wait_seconds = self._heap[0][0] - time.monotonic()
+                        if wait_seconds <= 0:
+                            break
+                        self._condition.wait(wait_seconds)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+                _, _, entry = heapq.heappop(self._heap)
+            self._executor.submit(self._poll, entry)
+
+    def _poll(self, entry: _WatchedMessage):
+        try:
+            entry.message.update_status()
+        except Exception as e:
+            self.log.exception(e)
+            entry.future.set_exception(e)
+            return
+        entry.polls += 1
+        with self._condition:
+            self.polls += 1
+        if entry.message.status in DONE_STATUSES:
+            self._complete(entry)
+        else:
+            interval = self.get_interval(entry.message, entry.polls, time.monotonic() - entry.start_time)
+            self.log.debug("Message {} status {} next poll in {:.2f}s".format(
+                entry.message.guid, entry.message.status, interval
+            ))
+            self._schedule(entry, interval)
+
+    def _complete(self, entry: _WatchedMessage):
+        if entry.callback is not None:
+            try:
+                entry.callback(entry.message)
+            except Exception as e:
+                self.log.exception(e)
+        entry.future.set_result(entry.message)
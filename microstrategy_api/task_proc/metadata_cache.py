@@ -0,0 +1,89 @@
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+from microstrategy_api.ttl_cache import TTLCache
+
+
+class MetadataCache(object):
+    """
+    Cache of TaskProc folder metadata:
+     - folderBrowse results (the raw folder entries, before name pattern filtering)
+     - folder path -> folder guid
+
+    One MetadataCache can be shared by several TaskProc instances (and threads).
+    Entries are scoped by the TaskProc base url, server, project and user so that
+    clients with different permissions do not see each other's results.
+
+    Args:
+        ttl_seconds:
+            How long entries are kept. None to keep entries until they are evicted or invalidated.
+        max_entries:
+            Maximum number of entries kept in memory (least recently used entries are evicted first).
+        path:
+            Optional. File name of a shelve database to persist the cache in, so a warm cache
+            survives process restarts. Call close() to make sure everything is written out.
+        validate_modification_time:
+            If True, before a cached folder listing is used, the most recently modified object in the folder
+            is requested (a one object folderBrowse sorted by FolderSortOrder.ModificationTime) and compared
+            to the one seen when the listing was cached. Objects added or modified in the folder then
+            invalidate the listing. Deleted objects are only picked up once the entry expires.
+            The signature is not requested when a folder is first listed, only when the cached listing is
+            re-used (the first re-use records it), so changes made in between are also only picked up on expiry.
+    """
+
+    def __init__(self,
+                 ttl_seconds: Optional[float] = 3600,
+                 max_entries: Optional[int] = 10000,
+                 path: Optional[str] = None,
+                 validate_modification_time: bool = False,
+                 ):
+        self.validate_modification_time = validate_modification_time
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds, path=path)
+
+    @staticmethod
+    def _path_key(path_parts: Iterable[str]) -> Tuple[str, ...]:
+        return tuple(part for part in path_parts if part != '')
+
+    def get_folder_entries(self, scope: Hashable, browse_key: tuple) -> Optional[Tuple[Optional[str], list]]:
+        """
+        Returns (signature, entries) for a cached folderBrowse or None.
+        """
+        return self._cache.get(('folder', scope, browse_key))
+
+    def set_folder_entries(self, scope: Hashable, browse_key: tuple, entries: list, signature: Optional[str] = None):
+        self._cache.set(('folder', scope, browse_key), (signature, entries))
+
+    def get_path_guid(self, scope: Hashable, path_parts: List[str]) -> Optional[str]:
+        return self._cache.get(('path', scope, self._path_key(path_parts)))
+
+    def set_path_guid(self, scope: Hashable, path_parts: List[str], guid: str):
+        self._cache.set(('path', scope, self._path_key(path_parts)), guid)
+
+    def invalidate_path(self, scope: Hashable, path_parts: List[str]) -> int:
+        """
+        Forget the guid of path (and of all paths below it) in scope.
+        """
+        path_key = self._path_key(path_parts)
+
+        def predicate(key):
+            return key[0] == 'path' and key[1] == scope and key[2][:len(path_key)] == path_key
+
+        return self._cache.delete_where(predicate)
+
+    def invalidate_folder(self, folder_guid: str) -> int:
+        """
+        Forget all cached listings of a folder (in all scopes).
+        """
+        def predicate(key):
+            return key[0] == 'folder' and ('folderID', folder_guid) in key[2]
+
+        return self._cache.delete_where(predicate)
+
+    def clear(self):
+        self._cache.clear()
+
+    def close(self):
+        self._cache.close()
+
+    @property
+    def statistics(self) -> dict:
+        return self._cache.statistics
@@ -1,5 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from bs4 import BeautifulSoup
-from typing import Optional
+from typing import Optional, Iterator, List, Union
 
 from microstrategy_api.task_proc.attribute import Attribute
 from microstrategy_api.task_proc.attribute_form import AttributeForm
@@ -7,7 +9,10 @@ from microstrategy_api.task_proc.exceptions import MstrReportException
 from microstrategy_api.task_proc.executable_base import ExecutableBase
 from microstrategy_api.task_proc.metric import Metric
 from microstrategy_api.task_proc.object_type import ObjectType
+from microstrategy_api.task_proc.report_columns import ReportColumns
 from microstrategy_api.task_proc.report_execution_flags import ReportExecutionFlags
+from microstrategy_api.task_proc.response_parser import ParserBackend
+from microstrategy_api.task_proc.status import Status
 
 
 class Value(object):
@@ -41,6 +46,7 @@ class Report(ExecutableBase):
         self._metrics = []
         self._headers = []
         self._values = None
+        self._columns = None
         self._executed = False
         self.object_type = ObjectType.ReportDefinition
         self.obect_id_param = 'reportID'
@@ -147,6 +153,20 @@ class Report(ExecutableBase):
             return self._values
         raise MstrReportException("Execute a report before viewing the rows")
 
+    def get_columns(self) -> ReportColumns:
+        """
+        Returns the columnar results for a report executed with columnar=True.
+
+        Returns:
+            ReportColumns: with one column per header and numpy/pandas/arrow export methods
+
+        Raises:
+            MstrReportException: if execute(columnar=True) has not been called on this report
+        """
+        if self._columns is not None:
+            return self._columns
+        raise MstrReportException("Execute a report with columnar=True before viewing the columns")
+
     def get_metrics(self):
         """
         Returns the metric objects for the columns of this report.
@@ -176,6 +196,7 @@ class Report(ExecutableBase):
                 element_prompt_answers: Optional[dict] = None,
                 arguments: Optional[dict] = None,
                 task_api_client: 'microstrategy_api.task_proc.task_prod.TaskProc' = None,
+                columnar: bool = False,
                 ):
         """
         Execute a report and returns results.
@@ -211,11 +232,229 @@ class Report(ExecutableBase):
             Other arbitrary arguments to pass to TaskProc.
         task_api_client:
             Alternative task_api_client to use when executing
+        columnar:
+            Store the results in a compact ReportColumns (see get_columns) instead of one Value per cell.
+            get_values() then returns a row view over the columns. Metric values are returned as floats.
+
+        Raises
+        ------
+            MstrReportException: if there was an error executing the report.
+        """
+        values = self._execute_window(
+            start_row=start_row,
+            start_col=start_col,
+            max_rows=max_rows,
+            max_cols=max_cols,
+            refresh_cache=refresh_cache,
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            arguments=arguments,
+            columnar=columnar,
+            task_api_client=task_api_client,
+        )
+        self._set_result(values, columnar=columnar)
+
+    def _set_result(self, values: Union[list, ReportColumns], columnar: bool = False):
+        self._executed = True
+        if columnar:
+            self._columns = values
+            self._values = values.rows()
+        else:
+            self._columns = None
+            self._values = values
+
+    def iter_rows(self,
+                  window_size: int = 10000,
+                  start_col: int = 0,
+                  max_cols: int = 10,
+                  refresh_cache: Optional[bool] = False,
+                  value_prompt_answers: Optional[list] = None,
+                  element_prompt_answers: Optional[dict] = None,
+                  arguments: Optional[dict] = None,
+                  prefetch: bool = True,
+                  max_wait_ms: int = 1000,
+                  task_api_client: 'microstrategy_api.task_proc.task_prod.TaskProc' = None,
+                  ) -> Iterator[List[Value]]:
+        """
+        Execute a report and yield the result rows, retrieving them in windows of window_size rows.
+
+        The report is executed once and the rows are then paged through with startRow/maxRows
+        requests against the same message, so only one window (two with prefetch) is held in memory.
+        With the LxmlStream parser backend the rows of each window are yielded as they are parsed instead,
+        so no window is held in memory (and prefetch is not used).
+        The rows have the same shape as the entries of get_values(). get_values() is not populated.
+
+        Arguments
+        ---------
+        window_size:
+            number of rows to retrieve per request
+        start_col:
+            first column number to be returned
+        max_cols:
+            maximum number of columns to return
+        value_prompt_answers:
+            list of (Prompts, strings) in order. If a value is to be left blank, the second argument in the tuple
+            should be the empty string
+        element_prompt_answers:
+            element prompt answers represented as a dictionary of Prompt objects (with attr field specified)
+            mapping to a list of attribute values to pass
+        refresh_cache:
+            Do a new run against the data source?
+        arguments:
+            Other arbitrary arguments to pass to TaskProc.
+        prefetch:
+            Retrieve the next window in a background thread while the current one is being consumed.
+        max_wait_ms:
+            How long each status poll waits on the server while the report is running.
+        task_api_client:
+            Alternative task_api_client to use when executing
 
         Raises
         ------
             MstrReportException: if there was an error executing the report.
         """
+        message = self.execute_async(
+            arguments=dict(arguments or {}),
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            refresh_cache=refresh_cache,
+            task_api_client=task_api_client,
+        )
+        while message.status not in [Status.Result, Status.Prompt, Status.ErrMsg]:
+            self.log.debug("iter_rows status = {}".format(message.status))
+            message.update_status(max_wait_ms=max_wait_ms)
+        if message.status == Status.ErrMsg:
+            raise MstrReportException(message.status_str)
+        elif message.status == Status.Prompt:
+            raise MstrReportException("Report {} requires prompt answers".format(self))
+
+        def get_window_arguments(window_start_row: int) -> dict:
+            window_arguments = dict(arguments or {})
+            window_arguments[self.message_id_param] = message.guid
+            return Report._get_window_arguments(window_start_row, start_col, window_size, max_cols, window_arguments)
+
+        client = task_api_client or self._task_api_client
+        if client.parser_backend == ParserBackend.LxmlStream:
+            start_row = 0
+            while True:
+                elements = self._request_window_elements(
+                    task_api_client=client,
+                    arguments=get_window_arguments(start_row),
+                )
+                row_count = 0
+                for row in self._iter_report_element_values(elements):
+                    self._executed = True
+                    row_count += 1
+                    yield row
+                self._executed = True
+                if row_count < window_size:
+                    break
+                start_row += row_count
+            return
+
+        def get_window(window_start_row: int) -> list:
+            window_arguments = dict(arguments or {})
+            window_arguments[self.message_id_param] = message.guid
+            return self._execute_window(
+                start_row=window_start_row,
+                start_col=start_col,
+                max_rows=window_size,
+                max_cols=max_cols,
+                arguments=window_arguments,
+                task_api_client=task_api_client,
+            )
+
+        executor = None
+        if prefetch:
+            executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            start_row = 0
+            rows = get_window(start_row)
+            self._executed = True
+            while rows:
+                next_start_row = start_row + len(rows)
+                more_rows = len(rows) >= window_size
+                next_rows = None
+                if more_rows and executor is not None:
+                    next_rows = executor.submit(get_window, next_start_row)
+                # Free the window as it is consumed
+                rows.reverse()
+                while rows:
+                    yield rows.pop()
+                if not more_rows:
+                    break
+                if next_rows is not None:
+                    rows = next_rows.result()
+                else:
+                    rows = get_window(next_start_row)
+                start_row = next_start_row
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def _execute_window(self,
+                        start_row: int,
+                        start_col: int,
+                        max_rows: int,
+                        max_cols: int,
+                        refresh_cache: Optional[bool] = False,
+                        value_prompt_answers: Optional[list] = None,
+                        element_prompt_answers: Optional[dict] = None,
+                        arguments: Optional[dict] = None,
+                        columnar: bool = False,
+                        task_api_client: 'microstrategy_api.task_proc.task_prod.TaskProc' = None,
+                        ) -> Union[list, ReportColumns]:
+        """
+        Request one window of report rows and return the parsed rows (as ReportColumns if columnar).
+        """
+        arguments = Report._get_window_arguments(start_row, start_col, max_rows, max_cols, arguments)
+        client = task_api_client or self._task_api_client
+        if client.parser_backend == ParserBackend.LxmlStream:
+            elements = self._request_window_elements(
+                value_prompt_answers=value_prompt_answers,
+                element_prompt_answers=element_prompt_answers,
+                refresh_cache=refresh_cache,
+                arguments=arguments,
+                task_api_client=client,
+            )
+            return self._parse_report_elements(elements, columnar=columnar)
+        else:
+            response = self.execute_object(
+                value_prompt_answers=value_prompt_answers,
+                element_prompt_answers=element_prompt_answers,
+                refresh_cache=refresh_cache,
+                arguments=arguments,
+                task_api_client=task_api_client,
+            )
+            return self._parse_report(response, columnar=columnar)
+
+    def _request_window_elements(self,
+                                 task_api_client: 'microstrategy_api.task_proc.task_prod.TaskProc',
+                                 refresh_cache: Optional[bool] = False,
+                                 value_prompt_answers: Optional[list] = None,
+                                 element_prompt_answers: Optional[dict] = None,
+                                 arguments: Optional[dict] = None,
+                                 ) -> Iterator:
+        """
+        Request a window of report rows (see _get_window_arguments) with the LxmlStream parser backend,
+        returning the streamed lxml elements.
+        """
+        arguments = self._get_execute_arguments(
+            value_prompt_answers=value_prompt_answers,
+            element_prompt_answers=element_prompt_answers,
+            refresh_cache=refresh_cache,
+            arguments=arguments,
+            task_api_client=task_api_client,
+        )
+        return task_api_client.request_iter(arguments, tags={'objects', 'headers', 'r', 'error'})
+
+    @staticmethod
+    def _get_window_arguments(start_row: int,
+                              start_col: int,
+                              max_rows: int,
+                              max_cols: int,
+                              arguments: Optional[dict] = None,
+                              ) -> dict:
         if arguments is None:
             arguments = dict()
         arguments.update({
@@ -227,17 +466,9 @@ class Report(ExecutableBase):
             'styleName':    'ReportDataVisualizationXMLStyle',
             'resultFlags':  '393216',  # prevent columns from merging
         })
-        response = self.execute_object(
-            value_prompt_answers=value_prompt_answers,
-            element_prompt_answers=element_prompt_answers,
-            refresh_cache=refresh_cache,
-            arguments=arguments,
-            task_api_client=task_api_client,
-        )
-        self._executed = True
-        self._values = self._parse_report(response)
+        return arguments
 
-    def _parse_report(self, response):
+    def _parse_report(self, response, columnar: bool = False):
         if Report._report_errors(response):
             return None
         if not self._headers:
@@ -246,6 +477,12 @@ class Report(ExecutableBase):
         # and create a list of tuples with the attribute and value for that
         # column for each row
 
+        if columnar:
+            results = ReportColumns(self._headers)
+            for row in response('r'):
+                results.append_row([val.string for val in row.children])
+            return results
+
         results = list()
         for row in response('r'):
             row_values = list()
@@ -254,6 +491,57 @@ class Report(ExecutableBase):
                 row_values.append(Value(header=self._headers[index], value=val.string))
         return results
 
+    def _iter_report_elements(self, elements) -> Iterator[list]:
+        """
+        Yields the rows (lists of the cell text) of the report from lxml elements streamed by
+        TaskProc.request_iter, as they are parsed. The headers are read before the first row.
+        Each element is freed after it is processed so only the row values are kept.
+        """
+        # Header object details by rfd: (tag, id, name, [(form id, form name)])
+        header_objects = dict()
+        for element in elements:
+            if element.tag == 'r':
+                yield [val.text for val in element]
+            elif element.tag == 'objects':
+                for obj in element.iter('attribute', 'metric'):
+                    if obj.get('rfd') not in header_objects:
+                        forms = [(form.get('id'), form.get('name')) for form in obj.iter('form')]
+                        header_objects[obj.get('rfd')] = (obj.tag, obj.get('id'), obj.get('name'), forms)
+            elif element.tag == 'headers':
+                if not self._headers:
+                    self._attribute_forms = []
+                    self._attributes = []
+                    self._metrics = []
+                    for col in element:
+                        tag, guid, name, forms = header_objects[col.get('rfd')]
+                        self._add_header(tag == 'attribute', guid, name, forms)
+            elif element.tag == 'error':
+                raise MstrReportException("There was an error running the report." +
+                                          "Microstrategy error message: " + str(element.text))
+
+    def _iter_report_element_values(self, elements) -> Iterator[List[Value]]:
+        """
+        Like _iter_report_elements but yields the rows as lists of Value.
+        """
+        for row in self._iter_report_elements(elements):
+            headers = self._headers
+            yield [Value(header=headers[index], value=value) for index, value in enumerate(row)]
+
+    def _parse_report_elements(self, elements, columnar: bool = False):
+        """
+        Parse the report from lxml elements streamed by TaskProc.request_iter.
+        """
+        if columnar:
+            results = None
+            for row in self._iter_report_elements(elements):
+                if results is None:
+                    results = ReportColumns(self._headers)
+                results.append_row(row)
+            if results is None:
+                results = ReportColumns(self._headers)
+            return results
+        return list(self._iter_report_element_values(elements))
+
     @staticmethod
     def _report_errors(response: BeautifulSoup):
         """
@@ -287,15 +575,19 @@ class Report(ExecutableBase):
         self._metrics = []
         for col in headers.children:
             elem = objects.find(['attribute', 'metric'], attrs={'rfd': col['rfd']})
-            if elem.name == 'attribute':
-                attr = Attribute(elem['id'], elem['name'])
-                self._attributes.append(attr)
-                # Look for multiple attribute forms
-                for form_element in elem('form'):
-                    attr_form = AttributeForm(attr, form_element['id'], form_element['name'])
-                    self._attribute_forms.append(attr_form)
-                    self._headers.append(attr_form)
-            else:
-                metric = Metric(elem['id'], elem['name'])
-                self._metrics.append(metric)
-                self._headers.append(metric)
+            forms = [(form_element['id'], form_element['name']) for form_element in elem('form')]
+            self._add_header(elem.name == 'attribute', elem['id'], elem['name'], forms)
+
+    def _add_header(self, is_attribute: bool, guid: str, name: str, forms: list):
+        if is_attribute:
+            attr = Attribute(guid, name)
+            self._attributes.append(attr)
+            # Look for multiple attribute forms
+            for form_guid, form_name in forms:
+                attr_form = AttributeForm(attr, form_guid, form_name)
+                self._attribute_forms.append(attr_form)
+                self._headers.append(attr_form)
+        else:
+            metric = Metric(guid, name)
+            self._metrics.append(metric)
+            self._headers.append(metric)
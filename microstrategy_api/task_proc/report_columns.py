@@ -0,0 +1,211 @@
+import math
+from array import array
+from collections.abc import Sequence
+from typing import Iterable, List, Optional, Union
+
+from microstrategy_api.task_proc.attribute_form import AttributeForm
+
+
+class DictionaryColumn(object):
+    """
+    Dictionary encoded column for attribute form values.
+
+    Each distinct value is stored once and rows hold an int code into the list of values.
+    Missing (None) values are stored as code -1.
+    """
+
+    def __init__(self):
+        self.codes = array('i')
+        self.values = list()
+        self._value_codes = dict()
+
+    def __len__(self):
+        return len(self.codes)
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self.codes.append(-1)
+        else:
+            code = self._value_codes.get(value)
+            if code is None:
+                code = len(self.values)
+                self.values.append(value)
+                self._value_codes[value] = code
+            self.codes.append(code)
+
+    def get(self, row_number: int) -> Optional[str]:
+        code = self.codes[row_number]
+        if code < 0:
+            return None
+        return self.values[code]
+
+    def to_numpy(self):
+        import numpy as np
+        # The extra None entry at the end is selected by code -1
+        return np.array(self.values + [None], dtype=object)[self.codes_numpy()]
+
+    def codes_numpy(self):
+        import numpy as np
+        return np.frombuffer(self.codes, dtype=np.int32)
+
+    def to_pandas(self):
+        import pandas as pd
+        return pd.Categorical.from_codes(self.codes_numpy(), categories=self.values)
+
+    def to_arrow(self):
+        import pyarrow as pa
+        codes = self.codes_numpy()
+        indices = pa.array(codes, mask=codes < 0)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(self.values, type=pa.string()))
+
+
+class MetricColumn(object):
+    """
+    Metric values column.
+
+    Values are stored in a float array with NaN for empty cells.
+    If a value that is not numeric is found, the column switches to a plain list of values
+    (values already read are kept as floats).
+    """
+
+    def __init__(self):
+        self.values = array('d')
+        self.numeric = True
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value: Optional[str]):
+        if self.numeric:
+            if value is None or value == '':
+                self.values.append(math.nan)
+                return
+            try:
+                self.values.append(float(value))
+                return
+            except ValueError:
+                self.values = [None if math.isnan(v) else v for v in self.values]
+                self.numeric = False
+        self.values.append(value)
+
+    def get(self, row_number: int) -> Union[float, str, None]:
+        value = self.values[row_number]
+        if self.numeric and math.isnan(value):
+            return None
+        return value
+
+    def to_numpy(self):
+        import numpy as np
+        if self.numeric:
+            return np.frombuffer(self.values, dtype=np.float64)
+        else:
+            return np.array(self.values, dtype=object)
+
+    def to_pandas(self):
+        return self.to_numpy()
+
+    def to_arrow(self):
+        import pyarrow as pa
+        if self.numeric:
+            # from_pandas treats NaN as null
+            return pa.array(self.to_numpy(), from_pandas=True)
+        else:
+            return pa.array(self.values)
+
+
+class ReportColumns(object):
+    """
+    Columnar report result with one column per header (AttributeForm or Metric).
+
+    Attribute form columns are dictionary encoded and metric columns are float arrays,
+    so a report needs a handful of Python objects per column instead of one Value object per cell.
+
+    The numpy, pandas and pyarrow exports are only available if those packages are installed.
+    Numeric columns are exported without copying, so export once all rows have been added.
+
+    Args:
+        headers:
+            The report headers (as returned by Report.get_headers)
+    """
+
+    def __init__(self, headers: list):
+        self.headers = list(headers)
+        self.columns = [
+            DictionaryColumn() if isinstance(header, AttributeForm) else MetricColumn()
+            for header in self.headers
+        ]
+        self._row_count = 0
+
+    def __len__(self):
+        return self._row_count
+
+    def append_row(self, values: Iterable[Optional[str]]):
+        for column, value in zip(self.columns, values):
+            column.append(value)
+        self._row_count += 1
+
+    def column_names(self) -> List[str]:
+        names = list()
+        for header in self.headers:
+            if isinstance(header, AttributeForm):
+                names.append('{}@{}'.format(header.attribute.name, header.name))
+            else:
+                names.append(header.name)
+        return names
+
+    def rows(self) -> 'ReportRowView':
+        return ReportRowView(self)
+
+    def to_numpy(self) -> dict:
+        """
+        Returns a dict of column name to numpy array.
+        """
+        return {name: column.to_numpy() for name, column in zip(self.column_names(), self.columns)}
+
+    def to_pandas(self):
+        """
+        Returns a pandas DataFrame. Attribute form columns are pandas Categoricals.
+        """
+        import pandas as pd
+        return pd.DataFrame(
+            {name: column.to_pandas() for name, column in zip(self.column_names(), self.columns)},
+            copy=False,
+        )
+
+    def to_arrow(self):
+        """
+        Returns a pyarrow Table. Attribute form columns are dictionary arrays.
+        """
+        import pyarrow as pa
+        return pa.Table.from_arrays(
+            [column.to_arrow() for column in self.columns],
+            names=self.column_names(),
+        )
+
+
+class ReportRowView(Sequence):
+    """
+    Read only view of ReportColumns with the same shape as Report.get_values():
+    a list of rows, each a list of Value(header, value).
+    The Value objects are created as each row is accessed.
+    """
+
+    def __init__(self, report_columns: ReportColumns):
+        self.report_columns = report_columns
+
+    def __len__(self):
+        return len(self.report_columns)
+
+    def __getitem__(self, row_number):
+        if isinstance(row_number, slice):
+            return [self[i] for i in range(*row_number.indices(len(self)))]
+        if row_number < 0:
+            row_number += len(self)
+        if not 0 <= row_number < len(self):
+            raise IndexError('row number {} out of range'.format(row_number))
+        # Imported here since report.py imports this module
+        from microstrategy_api.task_proc.report import Value
+        return [
+            Value(header=header, value=column.get(row_number))
+            for header, column in zip(self.report_columns.headers, self.report_columns.columns)
+        ]
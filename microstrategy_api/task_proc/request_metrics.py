@@ -0,0 +1,163 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Optional, Sequence
+
+# Upper bounds of the histogram buckets (the last bucket is unbounded)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+HISTOGRAM_BUCKETS = {
+    'network_seconds': SECONDS_BUCKETS,
+    'parse_seconds': SECONDS_BUCKETS,
+    'response_bytes': BYTES_BUCKETS,
+}
+
+
+class Histogram(object):
+    """
+    Count, sum and bucket counts of observed values (Prometheus style).
+
+    Args:
+        bounds:
+            Sorted upper bounds of the buckets.
+    """
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.bucket_counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        """
+        Returns the count, sum and the cumulative count of each bucket (by upper bound, inf for the last one).
+        """
+        buckets = dict()
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds + (float('inf'),), self.bucket_counts):
+            cumulative += bucket_count
+            buckets[bound] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class RequestMetrics(object):
+    """
+    Metrics of the requests of TaskProc clients, labelled with the taskId of each request:
+     - counters: requests, errors (requests that failed after any retries), retries (also labelled with the
+       reason: connection, logged_out or governor) and relogins
+     - histograms: network_seconds, parse_seconds (time parsing the xml) and response_bytes
+
+    Values are aggregated in memory (see get_counter, get_histogram and snapshot) and, if a callback is given,
+    also passed to it as they are recorded, for example to forward them to statsd or a Prometheus client:
+    callback(metric name, value, labels dict).
+
+    One RequestMetrics can be shared by several TaskProc clients (and threads).
+    Clients without metrics skip all of this.
+
+    Args:
+        callback:
+            Optional. Called with (name, value, labels) for each counter increment and histogram observation.
+        aggregate:
+            If False, values are only passed to the callback.
+    """
+
+    def __init__(self,
+                 callback: Optional[Callable[[str, float, dict], None]] = None,
+                 aggregate: bool = True,
+                 ):
+        self.callback = callback
+        self.aggregate = aggregate
+        # (name, labels tuple) -> value
+        self._counters = defaultdict(float)
+        # (name, labels tuple) -> Histogram
+        self._histograms = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels_key(labels: dict) -> tuple:
+        return tuple(sorted(labels.items()))
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        if self.aggregate:
+            with self._lock:
+                self._counters[(name, self._labels_key(labels))] += amount
+        if self.callback is not None:
+            self.callback(name, amount, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        if self.aggregate:
+            key = (name, self._labels_key(labels))
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = Histogram(HISTOGRAM_BUCKETS.get(name, SECONDS_BUCKETS))
+                    self._histograms[key] = histogram
+                histogram.observe(value)
+        if self.callback is not None:
+            self.callback(name, value, labels)
+
+    def record_request(self,
+                       task_id: str,
+                       network_seconds: Optional[float] = None,
+                       parse_seconds: Optional[float] = None,
+                       response_bytes: Optional[int] = None,
+                       ):
+        """
+        Record one (attempt of a) request. Values that are None are not observed.
+        """
+        self.increment('requests', task_id=task_id)
+        if network_seconds is not None:
+            self.observe('network_seconds', network_seconds, task_id=task_id)
+        if parse_seconds is not None:
+            self.observe('parse_seconds', parse_seconds, task_id=task_id)
+        if response_bytes is not None:
+            self.observe('response_bytes', response_bytes, task_id=task_id)
+
+    def record_retry(self, task_id: str, reason: str):
+        self.increment('retries', task_id=task_id, reason=reason)
+
+    def record_relogin(self, task_id: str):
+        self.increment('relogins', task_id=task_id)
+
+    def record_error(self, task_id: str):
+        self.increment('errors', task_id=task_id)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, self._labels_key(labels)), 0)
+
+    def get_histogram(self, name: str, **labels) -> Optional[dict]:
+        """
+        Returns the snapshot of a histogram (see Histogram.snapshot) or None if nothing was observed.
+        """
+        with self._lock:
+            histogram = self._histograms.get((name, self._labels_key(labels)))
+            if histogram is None:
+                return None
+            return histogram.snapshot()
+
+    def snapshot(self) -> list:
+        """
+        Returns a list of dicts with the name, labels and value (counters) or histogram snapshot of each metric.
+        """
+        with self._lock:
+            result = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in self._counters.items()
+            ]
+            result.extend(
+                {'name': name, 'labels': dict(labels), 'histogram': histogram.snapshot()}
+                for (name, labels), histogram in self._histograms.items()
+            )
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
@@ -0,0 +1,95 @@
+from typing import Dict, Hashable, Optional
+
+from microstrategy_api.ttl_cache import TTLCache
+
+# Read only tasks cached by default and how long (seconds) their responses are kept.
+# getPrompts is not included since it is keyed by the msgID of one report execution.
+DEFAULT_CACHED_TASKS = {
+    'folderBrowse': 600,
+    'getAttributeForms': 3600,
+    'browseElements': 600,
+    'browseAttributeForms': 3600,
+    'checkUserPrivileges': 300,
+}
+
+
+class ResponseCache(object):
+    """
+    Cache of the response text of idempotent (read only) TaskProc tasks, used by TaskProc.request.
+
+    Only tasks in task_ttl_seconds are cached. Requests are keyed by their arguments (the sessionState
+    is ignored, taskId / taskID are the same argument) and scoped by the TaskProc base url, server,
+    project and user so that clients with different permissions do not see each other's responses.
+    Only successful responses are cached.
+
+    One ResponseCache can be shared by several TaskProc instances (and threads).
+
+    Args:
+        task_ttl_seconds:
+            Maps the taskId of each task to cache to how long its responses are kept (None for no expiry).
+            Defaults to DEFAULT_CACHED_TASKS.
+        max_entries:
+            Maximum number of responses kept in memory (least recently used entries are evicted first).
+        path:
+            Optional. File name of a shelve database to persist the cache in.
+    """
+
+    def __init__(self,
+                 task_ttl_seconds: Optional[Dict[str, Optional[float]]] = None,
+                 max_entries: Optional[int] = 1000,
+                 path: Optional[str] = None,
+                 ):
+        if task_ttl_seconds is None:
+            task_ttl_seconds = DEFAULT_CACHED_TASKS
+        self.task_ttl_seconds = dict(task_ttl_seconds)
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=None, path=path)
+
+    @staticmethod
+    def get_task_id(arguments: dict) -> Optional[str]:
+        task_id = arguments.get('taskId')
+        if task_id is None:
+            task_id = arguments.get('taskID')
+        return task_id
+
+    def is_cached_task(self, arguments: dict) -> bool:
+        return self.get_task_id(arguments) in self.task_ttl_seconds
+
+    @staticmethod
+    def get_request_key(arguments: dict) -> tuple:
+        """
+        Returns the canonical form of the request arguments (sorted, without sessionState).
+        """
+        return tuple(sorted(
+            ('taskId' if key == 'taskID' else key, str(value))
+            for key, value in arguments.items()
+            if key != 'sessionState'
+        ))
+
+    def get(self, scope: Hashable, arguments: dict) -> Optional[str]:
+        """
+        Returns the cached response text for a request or None.
+        """
+        return self._cache.get((scope, self.get_request_key(arguments)))
+
+    def set(self, scope: Hashable, arguments: dict, response_text: str):
+        ttl_seconds = self.task_ttl_seconds[self.get_task_id(arguments)]
+        self._cache.set((scope, self.get_request_key(arguments)), response_text, ttl_seconds=ttl_seconds)
+
+    def invalidate_task(self, task_id: str) -> int:
+        """
+        Forget all cached responses of a task (in all scopes).
+        """
+        def predicate(key):
+            return ('taskId', task_id) in key[1]
+
+        return self._cache.delete_where(predicate)
+
+    def clear(self):
+        self._cache.clear()
+
+    def close(self):
+        self._cache.close()
+
+    @property
+    def statistics(self) -> dict:
+        return self._cache.statistics
@@ -0,0 +1,85 @@
+from enum import Enum
+from typing import Iterable, Iterator
+
+from microstrategy_api.task_proc.exceptions import MstrClientException, MstrResponseParseException
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+class ParserBackend(Enum):
+    """
+    How TaskProc xml responses are parsed.
+    """
+    # Build a complete BeautifulSoup 4 tree of the response
+    BeautifulSoup = 'bs4'
+    # Incrementally parse the response stream with lxml iterparse, freeing elements as they are consumed
+    LxmlStream = 'lxml'
+
+
+def iter_task_response(stream, tags: Iterable[str], request: str = None) -> Iterator['etree._Element']:
+    """
+    Incrementally parse a TaskProc xml response, yielding each completed element whose tag is in tags.
+
+    The taskResponse status is checked as soon as its start tag is read, so server errors are raised
+    before the first element is yielded.
+
+    Each yielded element (and anything before it in its parent) is freed once the caller asks for the
+    next element, so callers must copy whatever they need out of an element before moving on.
+    The requested tags must not be nested inside each other.
+
+    Arguments
+    ---------
+    stream:
+        A binary file-like object with the response body (for example requests' response.raw)
+    tags:
+        The element tags to yield
+    request:
+        Optional. The request url, used in exception messages.
+
+    Raises
+    ------
+        MstrClientException: if the response has an error status or is not a taskResponse.
+        MstrResponseParseException: if the response is not valid xml (for example if it was cut off).
+    """
+    if etree is None:
+        raise ImportError("The lxml parser backend requires the lxml package")
+    tags = set(tags)
+    checked_root = False
+    events = etree.iterparse(stream, events=('start', 'end'))
+    while True:
+        try:
+            event, element = next(events)
+        except StopIteration:
+            break
+        except etree.XMLSyntaxError as e:
+            raise MstrResponseParseException(
+                msg=f"Server error 'Unexpected server response that is not valid xml {e}'",
+                request=request,
+            )
+        if not checked_root:
+            checked_root = True
+            _check_task_response(element, request)
+        if event == 'end' and element.tag in tags:
+            yield element
+            # Free the element and any earlier siblings that were already consumed
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+def _check_task_response(element, request: str):
+    if element.tag != 'taskResponse':
+        error = f"Unexpected server response with no taskResponse tag. Found {element.tag}"
+        raise MstrClientException(msg=f"Server error '{error}'", request=request)
+    status_code = element.get('statusCode')
+    if status_code is None:
+        error = f"Unexpected server response with no statusCode in taskResponse tag {dict(element.attrib)}"
+        raise MstrClientException(msg=f"Server error '{error}'", request=request)
+    if status_code in ['400', '500']:
+        error = element.get('errorMsg')
+        raise MstrClientException(msg=f"Server error '{error}'", request=request)
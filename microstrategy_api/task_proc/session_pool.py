@@ -0,0 +1,224 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Union, Iterator
+
+from microstrategy_api.http_session import new_http_adapter, new_http_session
+from microstrategy_api.task_proc.concurrency_limiter import AdaptiveConcurrencyLimiter
+from microstrategy_api.task_proc.metadata_cache import MetadataCache
+from microstrategy_api.task_proc.request_metrics import RequestMetrics
+from microstrategy_api.task_proc.response_cache import ResponseCache
+from microstrategy_api.task_proc.response_parser import ParserBackend
+from microstrategy_api.task_proc.task_proc import TaskProc
+
+
+class TaskProcSessionPool(object):
+    """
+    A pool of logged in TaskProc clients (MicroStrategy sessions) leased to callers,
+    to spread work past the per session limit on concurrent work (rws / concurrent_max).
+
+    Sessions are logged in lazily, when first leased. Leases go to the least loaded session
+    (preferring logged in sessions), so a new session is only logged in once all the logged in sessions
+    are in use. A session is leased to at most leases_per_session callers at once (lease waits for one to be free).
+    Sessions that the server logged out are logged back in (once, by whichever lease fails first) by TaskProc.request
+    when next used.
+
+    All the sessions share one HTTP connection pool, but each keeps its own cookies.
+
+    Usage:
+        with pool.lease() as task_api_client:
+            task_api_client.request(...)
+
+    Args:
+        base_url:
+            base url of form http://hostname/MicroStrategy/asp/TaskProc.aspx
+        username:
+            username for project
+        password:
+            password for project
+        server:
+            The machine name (or IP) of the MicroStrategy Intelligence Server to connect to.
+        project_name:
+            The name of the MicroStrategy project to connect to.
+        max_sessions:
+            Maximum number of sessions to log in.
+        concurrent_max:
+            The concurrent_max (rws) of each session.
+        leases_per_session:
+            Maximum number of callers using a session at once. Defaults to concurrent_max.
+        pool_size:
+            Maximum number of pooled keep-alive HTTP connections. Defaults to max_sessions * leases_per_session.
+        limiter:
+            Optional. AdaptiveConcurrencyLimiter shared by all the sessions, so that executions across the pool
+            back off together when the server's governor limits are hit.
+        max_retries, retry_delay, parser_backend, metadata_cache, response_cache, metrics:
+            Passed to each TaskProc.
+    """
+
+    def __init__(self,
+                 base_url: str,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None,
+                 server: Optional[str] = None,
+                 project_name: Optional[str] = None,
+                 max_sessions: int = 4,
+                 concurrent_max: int = 5,
+                 leases_per_session: Optional[int] = None,
+                 pool_size: Optional[int] = None,
+                 max_retries: int = 3,
+                 retry_delay: float = 2,
+                 parser_backend: Union[ParserBackend, str] = ParserBackend.BeautifulSoup,
+                 metadata_cache: Optional[MetadataCache] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 metrics: Optional[RequestMetrics] = None,
+                 ):
+        self.log = logging.getLogger("{mod}.{cls}".format(mod=self.__class__.__module__, cls=self.__class__.__name__))
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.server = server
+        self.project_name = project_name
+        self.concurrent_max = concurrent_max
+        if leases_per_session is None:
+            leases_per_session = concurrent_max
+        self.leases_per_session = max(int(leases_per_session), 1)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.parser_backend = parser_backend
+        self.metadata_cache = metadata_cache
+        self.response_cache = response_cache
+        self.limiter = limiter
+        self.metrics = metrics
+        if pool_size is None:
+            pool_size = max_sessions * self.leases_per_session
+        self._adapter = new_http_adapter(pool_size)
+
+        self._clients = [None] * max_sessions  # type: List[Optional[TaskProc]]
+        self._leases = [0] * max_sessions
+        self._login_locks = [threading.Lock() for _ in range(max_sessions)]
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __enter__(self) -> 'TaskProcSessionPool':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def max_sessions(self) -> int:
+        return len(self._clients)
+
+    @property
+    def session_count(self) -> int:
+        """Number of logged in sessions"""
+        return sum(1 for client in self._clients if client is not None)
+
+    @property
+    def statistics(self) -> dict:
+        with self._condition:
+            return {
+                'sessions': self.session_count,
+                'leases': sum(self._leases),
+                'session_leases': list(self._leases),
+            }
+
+    def _new_client(self) -> TaskProc:
+        return TaskProc(
+            base_url=self.base_url,
+            username=self.username,
+            password=self.password,
+            server=self.server,
+            project_name=self.project_name,
+            concurrent_max=self.concurrent_max,
+            max_retries=self.max_retries,
+            retry_delay=self.retry_delay,
+            http_session=new_http_session(adapter=self._adapter),
+            parser_backend=self.parser_backend,
+            metadata_cache=self.metadata_cache,
+            response_cache=self.response_cache,
+            limiter=self.limiter,
+            metrics=self.metrics,
+        )
+
+    def _select_session(self) -> Optional[int]:
+        """
+        Returns the number of the least loaded session with a free lease (preferring logged in sessions),
+        or None if all sessions are fully leased.
+        """
+        candidates = [
+            (leases, self._clients[session_number] is None, session_number)
+            for session_number, leases in enumerate(self._leases)
+            if leases < self.leases_per_session
+        ]
+        if not candidates:
+            return None
+        return min(candidates)[2]
+
+    def acquire(self, timeout: Optional[float] = None) -> TaskProc:
+        """
+        Lease a logged in TaskProc client. It must be given back with release().
+        Waits up to timeout seconds (None to wait forever) for a free lease, then raises TimeoutError.
+        """
+        with self._condition:
+            if self._closed:
+                raise ValueError("TaskProcSessionPool is closed")
+            if not self._condition.wait_for(lambda: self._select_session() is not None, timeout=timeout):
+                raise TimeoutError(f"No TaskProc session was free within {timeout} seconds")
+            session_number = self._select_session()
+            self._leases[session_number] += 1
+
+        try:
+            # Log in outside of the pool lock so that other sessions can be leased meanwhile
+            with self._login_locks[session_number]:
+                client = self._clients[session_number]
+                if client is None:
+                    self.log.debug(f"Logging in session {session_number}")
+                    client = self._new_client()
+                    self._clients[session_number] = client
+        except Exception:
+            with self._condition:
+                self._leases[session_number] -= 1
+                self._condition.notify()
+            raise
+        return client
+
+    def release(self, client: TaskProc):
+        """
+        Give back a client leased with acquire().
+        """
+        with self._condition:
+            if self._closed:
+                return
+            for session_number, pool_client in enumerate(self._clients):
+                if pool_client is client:
+                    self._leases[session_number] -= 1
+                    self._condition.notify()
+                    return
+        raise ValueError("The TaskProc client does not belong to this pool")
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[TaskProc]:
+        """
+        Context manager leasing a logged in TaskProc client (see acquire).
+        """
+        client = self.acquire(timeout=timeout)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def close(self):
+        """
+        Log out all the sessions and close the HTTP connection pool.
+        """
+        with self._condition:
+            self._closed = True
+            clients = [client for client in self._clients if client is not None]
+            self._clients = [None] * len(self._clients)
+        for client in clients:
+            client.logout()
+        self._adapter.close()
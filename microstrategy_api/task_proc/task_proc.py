@@ -1,4 +1,5 @@
 import re
+import threading
 import urllib.parse
 
 
@@ -6,28 +7,462 @@ import warnings
 from enum import Enum
 
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from fnmatch import fnmatch
 
-from typing import Optional, List, Set, Union
+from typing import Optional, List, Set, Union, Iterable, Iterator, Tuple
 
 import requests
 import logging
 
 from bs4 import BeautifulSoup
 
+from microstrategy_api.backoff import Backoff
+from microstrategy_api.http_session import new_http_session
 from microstrategy_api.task_proc.document import Document
 from microstrategy_api.task_proc.privilege_types import PrivilegeTypes, PrivilegeTypesIDDict
 from microstrategy_api.task_proc.report import Report
 from microstrategy_api.task_proc.attribute import Attribute
 from microstrategy_api.task_proc.bit_set import BitSet
-from microstrategy_api.task_proc.exceptions import MstrClientException
+from microstrategy_api.task_proc.concurrency_limiter import AdaptiveConcurrencyLimiter
+from microstrategy_api.task_proc.exceptions import MstrClientException, MstrResponseParseException
 from microstrategy_api.task_proc.executable_base import ExecutableBase
+from microstrategy_api.task_proc.metadata_cache import MetadataCache
+from microstrategy_api.task_proc.response_cache import ResponseCache
 from microstrategy_api.task_proc.object_type import ObjectType, ObjectTypeIDDict, ObjectSubTypeIDDict, ObjectSubType
+from microstrategy_api.task_proc.request_metrics import RequestMetrics
+from microstrategy_api.task_proc.response_parser import ParserBackend, iter_task_response
 
 BASE_PARAMS = {'taskEnv': 'xml', 'taskContentType': 'xml'}
 
+# Tasks that start report/document executions, gated by the client's AdaptiveConcurrencyLimiter
+LIMITED_TASKS = frozenset({'reportExecute', 'RWExecute'})
 
-class TaskProc(object):
+# Retry waits grow exponentially (per try) up to this many seconds
+RETRY_MAX_DELAY = 60
+# Fraction of each retry wait that is randomized
+RETRY_JITTER = 0.5
+
+# Requests with longer urls are sent as form encoded POST requests (proxies can truncate or reject long urls)
+DEFAULT_MAX_GET_URL_LENGTH = 2000
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+class TaskProcBase(object):
+    """
+    Logic shared by the TaskProc and AsyncTaskProc clients that does not depend on how requests are sent:
+    argument encoding, response checking and the decision to retry a failed request.
+
+    Arguments
+    ----------
+    base_url (str):
+        base url of form http://hostname/MicroStrategy/asp/TaskProc.aspx
+    username (str):
+        username for project
+    password (str):
+        password for project
+    server (str):
+        The machine name (or IP) of the MicroStrategy Intelligence Server to connect to.
+    project_name (str):
+        The name of the MicroStrategy project to connect to.
+    limiter (AdaptiveConcurrencyLimiter):
+        Optional. Limit on the execution requests (LIMITED_TASKS) in flight, adapted to governor errors.
+        Can be shared between clients.
+    max_get_url_length (int):
+        Requests with a longer url are sent as POST requests with the arguments in a form encoded body.
+        None to always use GET.
+    metrics (RequestMetrics):
+        Optional. Records per taskId timings, response sizes, retries and re-logins of the requests.
+    """
+
+    def __init__(self,
+                 base_url,
+                 username=None,
+                 password=None,
+                 server=None,
+                 project_name=None,
+                 concurrent_max=5,
+                 max_retries=3,
+                 retry_delay=2,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 max_get_url_length: Optional[int] = DEFAULT_MAX_GET_URL_LENGTH,
+                 metrics: Optional[RequestMetrics] = None,
+                 ):
+        self.log = logging.getLogger("{mod}.{cls}".format(mod=self.__class__.__module__, cls=self.__class__.__name__))
+        if 'TaskProc' in base_url:
+            if base_url[-1] != '?':
+                base_url += '?'
+        self._base_url = base_url
+        self.trace = False
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.concurrent_max = concurrent_max
+        self.server = server
+        self.project_name = project_name
+        self.username = username
+        self.password = password
+        self.limiter = limiter
+        self.max_get_url_length = max_get_url_length
+        self.metrics = metrics
+        self._session = None
+        self.__messages_to_retry_list = None
+
+    @property
+    def _messages_to_retry(self):
+        if self.__messages_to_retry_list is None:
+            regex_list = \
+                [
+                    'There are too many auditor handles at the moment. Please try again later.',
+                    'There is possible deadlock. Please try to run the report later.',
+                    'Failed to create job.',
+                    '.* Number of jobs has exceeded maximum for project .*',
+                    'Maximum number of executing jobs exceeded .*',
+                ]
+            self.__messages_to_retry_list = [re.compile(pattern) for pattern in regex_list]
+        return self.__messages_to_retry_list
+
+    def _is_governor_error(self, error: str) -> bool:
+        """
+        True if error is one of the transient (server governor / overload) errors in _messages_to_retry.
+        """
+        return any(regex_pattern.search(error) for regex_pattern in self._messages_to_retry)
+
+    @staticmethod
+    def _get_task_id(arguments: dict) -> Optional[str]:
+        return arguments.get('taskId', arguments.get('taskID'))
+
+    @property
+    def _metadata_cache_scope(self) -> tuple:
+        """
+        Scope of the metadata_cache and response_cache entries of this client. Clients without a username
+        (authenticated with a session_state, or guests) are scoped by their session, since the user is unknown.
+        """
+        if self.username is None:
+            user = ('sessionState', self._session)
+        else:
+            user = self.username
+        return self._base_url, self.server, self.project_name, user
+
+    def _is_limited_task(self, arguments: dict) -> bool:
+        if self.limiter is None:
+            return False
+        return self._get_task_id(arguments) in LIMITED_TASKS
+
+    def _get_retry_reason(self, exception: Exception, connection_error: bool) -> str:
+        """
+        Returns the reason (metrics label) of a retried request: connection, logged_out or governor.
+        """
+        if connection_error:
+            return 'connection'
+        elif 'automatically logged out' in str(exception):
+            return 'logged_out'
+        else:
+            return 'governor'
+
+    def _use_post(self, request: str) -> bool:
+        return self.max_get_url_length is not None and len(request) > self.max_get_url_length
+
+    def _get_post_url_and_body(self, request: str) -> Tuple[str, str]:
+        """
+        Split a request url (see _encode_arguments) into the url to POST to and the form encoded arguments.
+        """
+        return self._base_url.rstrip('?'), request[len(self._base_url):]
+
+    @property
+    def base_url(self):
+        return self._base_url
+
+    @property
+    def session(self):
+        return self._session
+
+    def _get_login_arguments(self,
+                             server: str = None,
+                             project_name: str = None,
+                             username: str = None,
+                             password: str = None,
+                             ) -> dict:
+        if server:
+            self.server = server
+        if project_name:
+            self.project_name = project_name
+        if username:
+            self.username = username
+        if password:
+            self.password = password
+
+        # getSessionState is used instead of login because we can set the rws parameter that way.
+        # arguments = {
+        #     'taskId':   'login',
+        #     'server':   self.server,
+        #     'project':  self.project_name,
+        #     'userid':   self.username,
+        #     'password': self.password
+        # }
+
+        return {
+                'taskId': 'getSessionState',
+                'server': self.server,
+                'project': self.project_name,
+                'uid': self.username,
+                'pwd': self.password,
+                'rws': self.concurrent_max,
+            }
+
+    def _get_guest_login_arguments(self,
+                                   server: str = None,
+                                   project_name: str = None,
+                                   ) -> dict:
+        if server:
+            self.server = server
+        if project_name:
+            self.project_name = project_name
+
+        return {
+                'taskId':   'getSessionState',
+                'server':   self.server,
+                'project':  self.project_name,
+                'authMode':   8,
+                'rws': self.concurrent_max,
+            }
+
+    def _set_session_from_login(self, response: BeautifulSoup):
+        if self.trace:
+            self.log.debug("logging in returned %s" % response)
+        # self._session_state = response.find('sessionState')
+        self._session = response.find('max-state').string
+
+    def _get_logout_arguments(self) -> dict:
+        arguments = {
+            'taskId':       'logout',
+            'sessionState': self._session,
+        }
+        arguments.update(BASE_PARAMS)
+        return arguments
+
+    def _encode_arguments(self, arguments: dict) -> str:
+        """
+        Convert the argument values to strings (in place) and return the request url.
+        """
+        arguments.update(BASE_PARAMS)
+        for arg_name, arg_value in arguments.items():
+            if isinstance(arg_value, str):
+                pass
+            elif isinstance(arg_value, Enum):
+                arguments[arg_name] = str(arg_value.value)
+            elif isinstance(arg_value, BitSet):
+                arguments[arg_name] = arg_value.combine()
+            elif isinstance(arg_value, list) or isinstance(arg_value, set):
+                if len(arg_value) == 0:
+                    arguments[arg_name] = ''
+                elif isinstance(list(arg_value)[0], Enum):
+                    new_arg_value = set()
+                    for arg_sub_value in arg_value:
+                        if isinstance(arg_sub_value, Enum):
+                            new_arg_value.add(str(arg_sub_value.value))
+                        else:
+                            new_arg_value.add(str(arg_sub_value))
+                    arg_value = new_arg_value
+                arguments[arg_name] = ','.join(arg_value)
+            else:
+                arguments[arg_name] = str(arg_value)
+
+        if self.trace:
+            self.log.debug("arguments {}".format(arguments))
+        request = self._base_url + urllib.parse.urlencode(arguments)
+        if self.trace:
+            self.log.debug("submitting request {}".format(request))
+        return request
+
+    def _parse_response(self,
+                        status_code: int,
+                        text: str,
+                        request: str,
+                        ) -> Tuple[BeautifulSoup, Optional[MstrClientException]]:
+        """
+        Parse a TaskProc response body and check its status.
+
+        Returns:
+            The xml response as a BeautifulSoup 4 object, and the MstrClientException for the error
+            reported by the server (None if the request succeeded).
+        """
+        exception = None
+        if self.trace:
+            self.log.debug(f"received response {status_code}")
+        if status_code != 200:
+            exception = MstrClientException(
+                msg=f"Server response {status_code}.",
+                request=request
+            )
+        result_bs4 = BeautifulSoup(text, 'xml')
+        task_response = result_bs4.find('taskResponse')
+        if task_response is None:
+            self.log.error(f"Server response {status_code}")
+            error = f"Unexpected server response with no taskResponse tag {result_bs4.prettify()}"
+            exception = MstrClientException(
+                msg=f"Server error '{error}'",
+                request=request
+            )
+        else:
+            if task_response.attrs is None or 'statusCode' not in task_response.attrs:
+                self.log.error(f"Server response {status_code}")
+                self.log.error(task_response)
+                error = f"Unexpected server response with no statusCode in taskResponse tag {task_response}"
+                exception = MstrClientException(
+                    msg=f"Server error '{error}'",
+                    request=request
+                )
+            else:
+                if task_response['statusCode'] in ['400', '500']:
+                    self.log.error(f"Server response {status_code}")
+                    self.log.error(task_response)
+                    error = task_response['errorMsg']
+                    exception = MstrClientException(
+                        msg=f"Server error '{error}'",
+                        request=request
+                    )
+        return result_bs4, exception
+
+    def _get_retry(self,
+                   exception: Exception,
+                   tries: float,
+                   max_retries: int,
+                   connection_error: bool = False,
+                   ) -> Tuple[float, bool]:
+        """
+        Decide if a failed request attempt can be retried, otherwise raise the exception.
+
+        Arguments
+        ---------
+        exception:
+            The error from the failed attempt
+        tries:
+            The number of tries so far
+        max_retries:
+            Maximum number of retries
+        connection_error:
+            The request failed to connect (or the connection was lost, or the response was cut off)
+
+        Returns:
+            The updated number of tries, and True if the session needs to log in again before retrying.
+        """
+        error = str(exception)
+        if connection_error:
+            if tries < max_retries:
+                self.log.info("Request failed with error {}".format(repr(exception)))
+                self.log.info("Retrying. Tries={} < {} max".format(tries, max_retries))
+                # Count these as 1/1000 of a try (allows 5 minutes of retries) for each max_retries
+                return tries + (1/300), False
+            else:
+                self.log.error('. Tries limit {} reached'.format(tries))
+                raise exception
+        elif 'automatically logged out' in error:
+            if tries < max_retries:
+                tries += 1
+                # We can't re-login if we don't have a username (ie. we authenticated with a session_state value)
+                if self.username is not None:
+                    self.log.info("Request failed with error {}".format(repr(exception)))
+                    self.log.info("Logging back in. Tries= {} < {} max".format(tries, max_retries))
+                    return tries, True
+                else:
+                    exception.msg += '. Re-login not possible without username.'
+                    raise exception
+            else:
+                self.log.error('. Tries limit {} reached'.format(tries))
+                raise exception
+        elif self._is_governor_error(error):
+            if tries < max_retries:
+                self.log.info("Request failed with error {}".format(repr(exception)))
+                self.log.info("Retrying. Tries={} < {} max".format(tries, max_retries))
+                return tries + 1, False
+            else:
+                self.log.error('. Tries limit {} reached'.format(tries))
+                raise exception
+        else:
+            self.log.debug("Request failed with error {}".format(repr(exception)))
+            raise exception
+
+    def _get_recorded_retry(self,
+                            exception: Exception,
+                            tries: float,
+                            max_retries: int,
+                            task_id: Optional[str] = None,
+                            connection_error: bool = False,
+                            ) -> Tuple[float, bool]:
+        """
+        _get_retry that also records the retry, or the error if it is raised, in metrics.
+        Logging back in is recorded by _login_again, once the session was actually replaced.
+        """
+        try:
+            tries, login_again = self._get_retry(exception, tries, max_retries, connection_error=connection_error)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_error(task_id)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_retry(task_id, self._get_retry_reason(exception, connection_error))
+        return tries, login_again
+
+    def _get_retry_wait(self, tries: float = 1) -> float:
+        """
+        Seconds to wait before retrying a failed request: 1 + retry_delay after the first try, doubling for each
+        further (whole) try up to RETRY_MAX_DELAY, with jitter so that clients rejected at the same time
+        do not all retry at once.
+        """
+        initial_delay = 1 + self.retry_delay
+        backoff = Backoff(
+            initial_delay=initial_delay,
+            max_delay=max(initial_delay, RETRY_MAX_DELAY),
+            jitter=RETRY_JITTER,
+        )
+        return backoff.get_delay(max(int(tries) - 1, 0))
+
+    @staticmethod
+    def _get_folder_browse_arguments(session: str,
+                                     folder_guid: str = None,
+                                     system_folder=None,
+                                     type_restriction: Optional[set] = None,
+                                     sort_key=None,
+                                     sort_ascending: Optional[bool] = True,
+                                     ) -> dict:
+        arguments = {'sessionState': session,
+                     'taskID': 'folderBrowse',
+                     'includeObjectDesc': 'true',
+                     'showObjectTags': 'true',
+                     }
+        if folder_guid:
+            arguments['folderID'] = folder_guid
+        if system_folder:
+            if isinstance(system_folder, Enum):
+                system_folder = system_folder.value
+            arguments['systemFolder'] = system_folder
+
+        if type_restriction is None:
+            # Note: Type 776 is added to the defaults to include cubes
+            type_restriction = '2048,768,769,774,776,14081'
+        elif not isinstance(type_restriction, str):
+            type_restriction_codes = set()
+            # noinspection PyTypeChecker
+            for type_restriction_val in type_restriction:
+                if isinstance(type_restriction_val, ObjectSubType):
+                    type_restriction_codes.add(str(type_restriction_val.value))
+                else:
+                    type_restriction_codes.add(str(type_restriction_val))
+            type_restriction = ','.join(sorted(type_restriction_codes))
+        arguments['typeRestriction'] = type_restriction
+
+        if sort_key:
+            arguments['sortKey'] = sort_key
+        if not sort_ascending:
+            arguments['asc'] = 'false'
+        return arguments
+
+    @staticmethod
+    def _is_folder_not_found(exception: MstrClientException) -> bool:
+        return 'The folder name is unknown to the server.' in exception.msg
+
+
+class TaskProc(TaskProcBase):
     """
     Class encapsulating base logic for the MicroStrategy Task Proc API
     """
@@ -43,6 +478,14 @@ class TaskProc(object):
                  concurrent_max=5,
                  max_retries=3,
                  retry_delay=2,
+                 http_session: Optional[requests.Session] = None,
+                 pool_size: Optional[int] = None,
+                 parser_backend: Union[ParserBackend, str] = ParserBackend.BeautifulSoup,
+                 metadata_cache: Optional[MetadataCache] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 max_get_url_length: Optional[int] = DEFAULT_MAX_GET_URL_LENGTH,
+                 metrics: Optional[RequestMetrics] = None,
                  ):
         """
         Initialize the MstrClient by logging in and retrieving a session.
@@ -59,22 +502,54 @@ class TaskProc(object):
             The machine name (or IP) of the MicroStrategy Intelligence Server to connect to.
         project_name (str):
             The name of the MicroStrategy project to connect to.
+        http_session (requests.Session):
+            Optional. The HTTP session (transport) to send requests with.
+            If not provided, a new keep-alive session is created with a connection pool of pool_size.
+        pool_size (int):
+            Optional. Maximum number of pooled keep-alive connections. Defaults to concurrent_max.
+        parser_backend (ParserBackend):
+            Optional. How large responses (report rows and folder contents) are parsed.
+            ParserBackend.LxmlStream parses the response stream incrementally with lxml (requires lxml).
+            Default is ParserBackend.BeautifulSoup.
+        metadata_cache (MetadataCache):
+            Optional. Cache for folder contents and folder path lookups. Can be shared between TaskProc instances.
+        response_cache (ResponseCache):
+            Optional. Cache for the responses of read only tasks (see request). Can be shared between TaskProc instances.
+        limiter (AdaptiveConcurrencyLimiter):
+            Optional. Limit on the report/document execution requests in flight, shrunk on governor errors
+            and grown back on success. Can be shared between TaskProc instances.
+            Asynchronous executions keep running on the server after their request, use an ExecutionScheduler
+            (which runs at most limiter.limit jobs at once) to also limit those.
+        max_get_url_length (int):
+            Optional. Requests with a longer url (for example with large prompt answers) are sent
+            as POST requests with the arguments in a form encoded body. None to always use GET.
+        metrics (RequestMetrics):
+            Optional. Records per taskId network and xml parse times, response sizes, retries (by reason)
+            and re-logins of the requests. Can be shared between TaskProc instances.
         """
-        self.log = logging.getLogger("{mod}.{cls}".format(mod=self.__class__.__module__, cls=self.__class__.__name__))
-        if 'TaskProc' in base_url:
-            if base_url[-1] != '?':
-                base_url += '?'
-        self._base_url = base_url
-        self.cookies = None
-        self.trace = False
-        self.retry_delay = retry_delay
-        self.max_retries = max_retries
-        self.concurrent_max = concurrent_max
-        self.server = server
-        self.project_name = project_name
-        self.username = username
-        self.password = password
-        self.__messages_to_retry_list = None
+        super().__init__(
+            base_url=base_url,
+            username=username,
+            password=password,
+            server=server,
+            project_name=project_name,
+            concurrent_max=concurrent_max,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            limiter=limiter,
+            max_get_url_length=max_get_url_length,
+            metrics=metrics,
+        )
+        if http_session is None:
+            if pool_size is None:
+                pool_size = concurrent_max
+            http_session = new_http_session(pool_size=pool_size)
+        self._http_session = http_session
+        # Serializes logging back in, since one client can be used by several threads
+        self._login_lock = threading.RLock()
+        self.parser_backend = ParserBackend(parser_backend)
+        self.metadata_cache = metadata_cache
+        self.response_cache = response_cache
 
         if session_state is None:
             if project_source is not None:
@@ -98,22 +573,24 @@ class TaskProc(object):
         return 'MstrClient session: {}'.format(self._session)
 
     @property
-    def _messages_to_retry(self):
-        if self.__messages_to_retry_list is None:
-            regex_list = \
-                [
-                    'There are too many auditor handles at the moment. Please try again later.',
-                    'There is possible deadlock. Please try to run the report later.',
-                    'Failed to create job.',
-                    '.* Number of jobs has exceeded maximum for project .*',
-                    'Maximum number of executing jobs exceeded .*',
-                ]
-            self.__messages_to_retry_list = [re.compile(pattern) for pattern in regex_list]
-        return self.__messages_to_retry_list
+    def http_session(self) -> requests.Session:
+        return self._http_session
 
     @property
-    def base_url(self):
-        return self._base_url
+    def cookies(self):
+        return self._http_session.cookies
+
+    @cookies.setter
+    def cookies(self, value):
+        self._http_session.cookies.clear()
+        if value is not None:
+            self._http_session.cookies.update(value)
+
+    def close(self):
+        """
+        Close the pooled HTTP connections. Does not log out the MicroStrategy session.
+        """
+        self._http_session.close()
 
     def login(self,
               server: str=None,
@@ -130,44 +607,21 @@ class TaskProc(object):
             The machine name (or IP) of the MicroStrategy Intelligence Server to connect to.
         project_name (str):
             The name of the MicroStrategy project to connect to.
-        username (str):
-            username for project
-        password (str):
-            password for project
-
-        """
-        if server:
-            self.server = server
-        if project_name:
-            self.project_name = project_name
-        if username:
-            self.username = username
-        if password:
-            self.password = password
-
-        # getSessionState is used instead of login because we can set the rws parameter that way.
-        # arguments = {
-        #     'taskId':   'login',
-        #     'server':   self.server,
-        #     'project':  self.project_name,
-        #     'userid':   self.username,
-        #     'password': self.password
-        # }
+        username (str):
+            username for project
+        password (str):
+            password for project
 
-        arguments = {
-                'taskId': 'getSessionState',
-                'server': self.server,
-                'project': self.project_name,
-                'uid': self.username,
-                'pwd': self.password,
-                'rws': self.concurrent_max,
-            }
+        """
+        arguments = self._get_login_arguments(
+            server=server,
+            project_name=project_name,
+            username=username,
+            password=password,
+        )
         self.log.debug("logging in.")
         response = self.request(arguments)
-        if self.trace:
-            self.log.debug("logging in returned %s" % response)
-        # self._session_state = response.find('sessionState')
-        self._session = response.find('max-state').string
+        self._set_session_from_login(response)
 
     def login_guest(self,
                     server: str=None,
@@ -184,28 +638,10 @@ class TaskProc(object):
             The name of the MicroStrategy project to connect to.
 
         """
-        if server:
-            self.server = server
-        if project_name:
-            self.project_name = project_name
-
-        arguments = {
-                'taskId':   'getSessionState',
-                'server':   self.server,
-                'project':  self.project_name,
-                'authMode':   8,
-                'rws': self.concurrent_max,
-            }
+        arguments = self._get_guest_login_arguments(server=server, project_name=project_name)
         self.log.debug("logging in as guest")
         response = self.request(arguments)
-        if self.trace:
-            self.log.debug("logging in returned %s" % response)
-        # self._session_state = response.find('sessionState')
-        self._session = response.find('max-state').string
-
-    @property
-    def session(self):
-        return self._session
+        self._set_session_from_login(response)
 
     class SystemFolders(Enum):  # EnumDSSXMLFolderNames
         """
@@ -409,82 +845,176 @@ class TaskProc(object):
         if isinstance(name_patterns_to_exclude, str):
             name_patterns_to_exclude = [name_patterns_to_exclude]
 
-        arguments = {'sessionState': self._session,
-                     'taskID': 'folderBrowse',
-                     'includeObjectDesc': 'true',
-                     'showObjectTags': 'true',
-                     }
-        if folder_guid:
-            arguments['folderID'] = folder_guid
-        if system_folder:
-            if isinstance(system_folder, TaskProc.SystemFolders):
-                system_folder = system_folder.value
-            arguments['systemFolder'] = system_folder
-
-        if type_restriction is None:
-            # Note: Type 776 is added to the defaults to include cubes
-            type_restriction = '2048,768,769,774,776,14081'
-        elif not isinstance(type_restriction, str):
-            type_restriction_codes = set()
-            # noinspection PyTypeChecker
-            for type_restriction_val in type_restriction:
-                if isinstance(type_restriction_val, ObjectSubType):
-                    type_restriction_codes.add(str(type_restriction_val.value))
-                else:
-                    type_restriction_codes.add(str(type_restriction_val))
-            type_restriction = ','.join(type_restriction_codes)
-        arguments['typeRestriction'] = type_restriction
+        arguments = self._get_folder_browse_arguments(
+            self._session,
+            folder_guid=folder_guid,
+            system_folder=system_folder,
+            type_restriction=type_restriction,
+            sort_key=sort_key,
+            sort_ascending=sort_ascending,
+        )
 
-        if sort_key:
-            arguments['sortKey'] = sort_key
-        if not sort_ascending:
-            arguments['asc'] = 'false'
         try:
-            response = self.request(arguments)
+            if self.metadata_cache is not None:
+                folder_entries = self._get_cached_folder_entries(arguments)
+            else:
+                folder_entries = self._iter_folder_entries(arguments)
+            return TaskProc._get_folder_objects(folder_entries, name_patterns_to_include, name_patterns_to_exclude)
         except MstrClientException as e:
-            if 'The folder name is unknown to the server.' in e.msg:
+            if TaskProc._is_folder_not_found(e):
                 raise FileNotFoundError("Folder ID {} not found".format(folder_guid))
             else:
                 raise e
+
+    @staticmethod
+    def _get_folder_objects(folder_entries: Iterable[tuple],
+                            name_patterns_to_include: Optional[List[str]],
+                            name_patterns_to_exclude: Optional[List[str]],
+                            ) -> List['TaskProc.FolderObject']:
         result = []
-        for folder in response('folders'):
-            path_list = list()
-            for seq_num, path_folder in enumerate(folder.path.find_all('folder')):
-                path_folder_name = path_folder.string
-                if seq_num == 0 and path_folder_name == 'Shared Reports':
-                    path_list.append('Public Objects')
-                    path_folder_name = 'Reports'
-                path_list.append(path_folder_name)
-            folder_name = folder.attrs['name']
-            if len(path_list) == 0 and folder_name == 'Shared Reports':
-                path_list.append('Public Objects')
-                folder_name = 'Reports'
-            path_list.append(folder_name)
-            for obj in folder('obj'):
-                name = obj.find('n').string
-                if name_patterns_to_include is None:
+        for path_list, guid, name, description, object_type, object_subtype in folder_entries:
+            if TaskProc._name_matches(name, name_patterns_to_include, name_patterns_to_exclude):
+                obj_inst = TaskProc.FolderObject(
+                              guid=guid,
+                              name=name,
+                              path=list(path_list),
+                              description=description,
+                              object_type=object_type,
+                              object_subtype=object_subtype,
+                           )
+                result.append(obj_inst)
+        return result
+
+    @staticmethod
+    def _name_matches(name: str,
+                      name_patterns_to_include: Optional[List[str]],
+                      name_patterns_to_exclude: Optional[List[str]],
+                      ) -> bool:
+        if name_patterns_to_include is None:
+            name_ok = True
+        else:
+            name_ok = False
+            for include_pattern in name_patterns_to_include:
+                if fnmatch(name.lower(), include_pattern.lower()):
                     name_ok = True
-                else:
+        if name_patterns_to_exclude is not None:
+            for exclude_pattern in name_patterns_to_exclude:
+                if fnmatch(name.lower(), exclude_pattern.lower()):
                     name_ok = False
-                    for include_pattern in name_patterns_to_include:
-                        if fnmatch(name.lower(), include_pattern.lower()):
-                            name_ok = True
-                if name_patterns_to_exclude is not None:
-                    for exclude_pattern in name_patterns_to_exclude:
-                        if fnmatch(name.lower(), exclude_pattern.lower()):
-                            name_ok = False
-
-                if name_ok:
-                    obj_inst = TaskProc.FolderObject(
-                                  guid=obj.find('id').string,
-                                  name=name,
-                                  path=path_list,
-                                  description=obj.find('d').string,
-                                  object_type=obj.find('t').string,
-                                  object_subtype=obj.find('st').string,
-                               )
-                    result.append(obj_inst)
-        return result
+        return name_ok
+
+    @staticmethod
+    def _folder_path_list(folder_name: str, path_folder_names: List[str]) -> List[str]:
+        path_list = list()
+        for seq_num, path_folder_name in enumerate(path_folder_names):
+            if seq_num == 0 and path_folder_name == 'Shared Reports':
+                path_list.append('Public Objects')
+                path_folder_name = 'Reports'
+            path_list.append(path_folder_name)
+        if len(path_list) == 0 and folder_name == 'Shared Reports':
+            path_list.append('Public Objects')
+            folder_name = 'Reports'
+        path_list.append(folder_name)
+        return path_list
+
+    def _iter_folder_entries(self, arguments: dict, use_cache: bool = True):
+        if self.parser_backend == ParserBackend.LxmlStream:
+            return self._iter_folder_entries_lxml(arguments)
+        else:
+            return self._iter_folder_entries_bs4(arguments, use_cache=use_cache)
+
+    def _get_folder_signature(self, arguments: dict) -> str:
+        """
+        Returns the xml of the most recently modified object in a folder (or '' if the folder is empty)
+        """
+        signature_arguments = arguments.copy()
+        signature_arguments['sortKey'] = TaskProc.FolderSortOrder.ModificationTime.value
+        signature_arguments['asc'] = 'false'
+        signature_arguments['blockBegin'] = 1
+        signature_arguments['blockCount'] = 1
+        # The signature must come from the server, not the response_cache
+        response = self.request(signature_arguments, use_cache=False)
+        obj = response.find('obj')
+        if obj is None:
+            return ''
+        return str(obj)
+
+    def _get_cached_folder_entries(self, arguments: dict) -> list:
+        """
+        Returns the list of folder entries for a folderBrowse from metadata_cache, browsing the folder if needed.
+        """
+        cache = self.metadata_cache
+        scope = self._metadata_cache_scope
+        browse_key = tuple(sorted((key, str(value)) for key, value in arguments.items() if key != 'sessionState'))
+        cached = cache.get_folder_entries(scope, browse_key)
+        # The signature is only requested to validate a cached listing. New listings are cached without one,
+        # and get the signature of their first validation.
+        signature = None
+        use_cache = True
+        if cached is not None:
+            cached_signature, entries = cached
+            if not cache.validate_modification_time:
+                return entries
+            signature = self._get_folder_signature(arguments)
+            if cached_signature is None:
+                cache.set_folder_entries(scope, browse_key, entries, signature)
+                return entries
+            if cached_signature == signature:
+                return entries
+            self.log.debug("Folder changed since cached {}".format(browse_key))
+            # The response_cache can still hold the old listing
+            use_cache = False
+        entries = list(self._iter_folder_entries(arguments, use_cache=use_cache))
+        cache.set_folder_entries(scope, browse_key, entries, signature)
+        return entries
+
+    def _iter_folder_entries_bs4(self, arguments: dict, use_cache: bool = True):
+        response = self.request(arguments, use_cache=use_cache)
+        return TaskProc._parse_folder_entries_bs4(response)
+
+    @staticmethod
+    def _parse_folder_entries_bs4(response: BeautifulSoup):
+        """
+        Yields (path_list, guid, name, description, type, subtype) for each object in a folderBrowse response
+        """
+        for folder in response('folders'):
+            path_list = TaskProc._folder_path_list(
+                folder.attrs['name'],
+                [path_folder.string for path_folder in folder.path.find_all('folder')],
+            )
+            for obj in folder('obj'):
+                yield (
+                    path_list,
+                    obj.find('id').string,
+                    obj.find('n').string,
+                    obj.find('d').string,
+                    obj.find('t').string,
+                    obj.find('st').string,
+                )
+
+    def _iter_folder_entries_lxml(self, arguments: dict):
+        """
+        Yields (path_list, guid, name, description, type, subtype) for each object in a folderBrowse response
+        parsing the response stream incrementally.
+        """
+        path_list = None
+        for element in self.request_iter(arguments, tags={'path', 'obj'}):
+            if element.tag == 'path':
+                path_list = TaskProc._folder_path_list(
+                    element.getparent().get('name'),
+                    [path_folder.text for path_folder in element.iter('folder')],
+                )
+            else:
+                if path_list is None:
+                    path_list = TaskProc._folder_path_list(element.getparent().get('name'), [])
+                yield (
+                    path_list,
+                    element.findtext('id'),
+                    element.findtext('n'),
+                    element.findtext('d'),
+                    element.findtext('t'),
+                    element.findtext('st'),
+                )
 
     @staticmethod
     def path_parts(path) -> List[str]:
@@ -508,12 +1038,48 @@ class TaskProc(object):
             name_parts = TaskProc.path_parts(name)
         else:
             # Blindly assume it's an iterable type
-            name_parts = name
+            name_parts = list(name)
         if isinstance(type_restriction, str):
             type_restriction = set(type_restriction.split(','))
-        folder_contents = []
         intermediatefolder_type_restriction = {'2048'}
-        for folder_name in name_parts:
+
+        def browse_folder(folder_name: str, folder_guid: str):
+            # If this is the last folder use the passed type_restriction and name patterns
+            if folder_name == name_parts[-1]:
+                return self.get_folder_contents_by_guid(
+                    folder_guid=folder_guid,
+                    type_restriction=type_restriction,
+                    sort_key=sort_key,
+                    sort_ascending=sort_ascending,
+                    name_patterns_to_include=name_patterns_to_include,
+                    name_patterns_to_exclude=name_patterns_to_exclude,
+                )
+            else:
+                return self.get_folder_contents_by_guid(
+                    folder_guid=folder_guid,
+                    type_restriction=intermediatefolder_type_restriction,
+                    sort_key=sort_key,
+                    sort_ascending=sort_ascending,
+                )
+
+        folder_contents = []
+        start_part = 0
+        if self.metadata_cache is not None:
+            # Resume from the deepest folder in the path with a known guid
+            scope = self._metadata_cache_scope
+            for part_number in range(len(name_parts) - 1, 0, -1):
+                folder_guid = self.metadata_cache.get_path_guid(scope, name_parts[:part_number + 1])
+                if folder_guid is not None:
+                    try:
+                        folder_contents = browse_folder(name_parts[part_number], folder_guid)
+                        start_part = part_number + 1
+                    except FileNotFoundError:
+                        # Folder was deleted (or replaced), walk the path again
+                        self.metadata_cache.invalidate_path(scope, name_parts[:part_number + 1])
+                    break
+
+        for part_number in range(start_part, len(name_parts)):
+            folder_name = name_parts[part_number]
             if folder_name == '':
                 pass
             elif folder_name == 'Public Objects':
@@ -529,24 +1095,11 @@ class TaskProc(object):
                     if sub_folder.name == folder_name:
                         found = True
                         if sub_folder.object_type == ObjectType.Folder:
-                            # If this is the last folder use the passed type_restriction and name patterns
-                            if folder_name == name_parts[-1]:
-                                new_folder_contents = self.get_folder_contents_by_guid(
-                                    folder_guid=sub_folder.guid,
-                                    type_restriction=type_restriction,
-                                    sort_key=sort_key,
-                                    sort_ascending=sort_ascending,
-                                    name_patterns_to_include=name_patterns_to_include,
-                                    name_patterns_to_exclude=name_patterns_to_exclude,
-                                )
-                            else:
-                                new_folder_contents = self.get_folder_contents_by_guid(
-                                    folder_guid=sub_folder.guid,
-                                    type_restriction=intermediatefolder_type_restriction,
-                                    sort_key=sort_key,
-                                    sort_ascending=sort_ascending,
-                                )
-
+                            if self.metadata_cache is not None:
+                                self.metadata_cache.set_path_guid(self._metadata_cache_scope,
+                                                                  name_parts[:part_number + 1],
+                                                                  sub_folder.guid)
+                            new_folder_contents = browse_folder(folder_name, sub_folder.guid)
                         else:
                             new_folder_contents = sub_folder
                 if not found:
@@ -568,7 +1121,35 @@ class TaskProc(object):
                             flatten_structure: Optional[bool] = True,
                             name_patterns_to_include: Optional[List[str]] = None,
                             name_patterns_to_exclude: Optional[List[str]] = None,
+                            max_workers: Optional[int] = None,
                             ) -> List[FolderObject]:
+        """
+        Get the contents of a folder (by path or guid), optionally including all sub folders.
+
+        Sub folders are browsed breadth first with up to max_workers folderBrowse requests running concurrently.
+
+        Args
+        ----
+        name:
+            Folder path or guid
+        type_restriction:
+            A set of the object SubTypes to include in the contents.
+        sort_key:
+            How the elements of the folder are sorted.
+        sort_ascending:
+            Sort the results in ascending order, if False, then descending order will be used.
+        recursive:
+            Include the contents of sub folders
+        flatten_structure:
+            If True return one list of all objects. If False, sub folder contents are set in each folder's
+            contents attribute (or the FileNotFoundError if the folder could not be browsed).
+        name_patterns_to_include:
+            A list of file name patterns (using * wildcards) to include. Not case sensitive.
+        name_patterns_to_exclude:
+            A list of file name patterns (using * wildcards) to exclude. Not case sensitive.
+        max_workers:
+            Maximum concurrent folderBrowse requests when recursive. Defaults to concurrent_max.
+        """
         if type_restriction is not None:
             sub_type_restriction = type_restriction.copy()
             if recursive:
@@ -593,27 +1174,23 @@ class TaskProc(object):
                                                                name_patterns_to_exclude=name_patterns_to_exclude,
                                                                )
         if recursive:
-            for item in folder_contents:
-                if item.object_type == ObjectType.Folder:
-                    try:
-                        contents = self.get_folder_contents(
-                                     name=item.guid,
-                                     type_restriction=type_restriction,
-                                     sort_key=sort_key,
-                                     sort_ascending=sort_ascending,
-                                     recursive=recursive,
-                                     flatten_structure=flatten_structure,
-                                     name_patterns_to_include=name_patterns_to_include,
-                                     name_patterns_to_exclude=name_patterns_to_exclude,
-                                   )
-                    except FileNotFoundError as e:
-                        contents = e
-
-                    if flatten_structure:
-                        if isinstance(contents, list):
-                            folder_contents.extend(contents)
-                    else:
-                        item.contents = contents
+            sub_folder_contents = self._crawl_sub_folders(
+                folder_contents,
+                max_workers=max_workers,
+                type_restriction=sub_type_restriction,
+                sort_key=sort_key,
+                sort_ascending=sort_ascending,
+                name_patterns_to_include=name_patterns_to_include,
+                name_patterns_to_exclude=name_patterns_to_exclude,
+            )
+            if flatten_structure:
+                folder_contents = TaskProc._flatten_folder_contents(folder_contents, sub_folder_contents)
+            else:
+                for contents in [folder_contents] + list(sub_folder_contents.values()):
+                    if isinstance(contents, list):
+                        for item in contents:
+                            if item.object_type == ObjectType.Folder:
+                                item.contents = sub_folder_contents.get(item.guid)
 
         if flatten_structure:
             if type_restriction is not None:
@@ -621,6 +1198,68 @@ class TaskProc(object):
 
         return folder_contents
 
+    def _crawl_sub_folders(self,
+                           folder_contents: List[FolderObject],
+                           max_workers: Optional[int] = None,
+                           known_contents: Optional[dict] = None,
+                           **browse_arguments
+                           ) -> dict:
+        """
+        Browse all folders in folder_contents and their sub folders, breadth first,
+        with up to max_workers folderBrowse requests running concurrently.
+        Folders in known_contents (dict of guid to list of FolderObject) are not browsed again.
+        The workers share this client, so if the server logs the session out only one of them logs back in
+        (see _login_again).
+
+        Returns:
+            dict of folder guid to the list of FolderObject in it (or the FileNotFoundError raised browsing it)
+        """
+        if max_workers is None:
+            max_workers = self.concurrent_max
+        results = dict()
+        seen_guids = set()
+        with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as executor:
+            pending = dict()
+
+            def submit_folders(contents):
+                for item in contents:
+                    if item.object_type == ObjectType.Folder and item.guid not in seen_guids:
+                        seen_guids.add(item.guid)
+                        if known_contents is not None and item.guid in known_contents:
+                            results[item.guid] = known_contents[item.guid]
+                            if isinstance(results[item.guid], list):
+                                submit_folders(results[item.guid])
+                        else:
+                            future = executor.submit(self.get_folder_contents_by_guid,
+                                                     folder_guid=item.guid,
+                                                     **browse_arguments)
+                            pending[future] = item.guid
+
+            submit_folders(folder_contents)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    guid = pending.pop(future)
+                    try:
+                        contents = future.result()
+                    except FileNotFoundError as e:
+                        contents = e
+                    results[guid] = contents
+                    if isinstance(contents, list):
+                        submit_folders(contents)
+        return results
+
+    @staticmethod
+    def _flatten_folder_contents(folder_contents: List[FolderObject], sub_folder_contents: dict) -> List[FolderObject]:
+        # Each folder's contents followed by the flattened contents of its sub folders in order
+        result = list(folder_contents)
+        for item in folder_contents:
+            if item.object_type == ObjectType.Folder:
+                contents = sub_folder_contents.get(item.guid)
+                if isinstance(contents, list):
+                    result.extend(TaskProc._flatten_folder_contents(contents, sub_folder_contents))
+        return result
+
     def get_folder_object(self,
                           name: str,
                           type_restriction: Optional[set] = None,
@@ -640,7 +1279,103 @@ class TaskProc(object):
         else:
             return folder_contents[0]
 
-    def get_matching_objects_list(self, path_list: list, type_restriction: set, error_list=None) -> List[FolderObject]:
+    def _browse_folder_paths(self,
+                             folder_paths: Iterable[tuple],
+                             type_restriction: Optional[set] = None,
+                             max_workers: Optional[int] = None,
+                             ) -> Tuple[dict, dict]:
+        """
+        Browse all folders needed to resolve a set of folder paths, each folder exactly once.
+
+        The paths are merged into a prefix tree, which is walked one level at a time from Public Objects
+        with the folders of each level browsed concurrently (up to max_workers).
+
+        Args
+        ----
+        folder_paths:
+            Iterable of folder paths, each a tuple of folder names starting with 'Public Objects'
+        type_restriction:
+            A set of the object SubTypes to include in the contents. Folders are always included.
+        max_workers:
+            Maximum concurrent folderBrowse requests. Defaults to concurrent_max.
+
+        Returns
+        -------
+        dict of folder path tuple to the list of FolderObject in it (or a FileNotFoundError),
+        dict of folder guid to the list of FolderObject in it
+        """
+        if type_restriction is not None:
+            type_restriction = set(type_restriction)
+            type_restriction.add(ObjectSubType.Folder)
+        if max_workers is None:
+            max_workers = self.concurrent_max
+
+        path_tree = dict()
+        for folder_path in folder_paths:
+            node = path_tree
+            for folder_name in folder_path:
+                node = node.setdefault(folder_name, dict())
+
+        contents_by_path = dict()
+        contents_by_guid = dict()
+
+        def path_not_found(folder_path: tuple, sub_tree: dict, error: FileNotFoundError):
+            contents_by_path[folder_path] = error
+            for sub_folder_name, sub_folder_tree in sub_tree.items():
+                path_not_found(folder_path + (sub_folder_name,), sub_folder_tree, error)
+
+        # List of (folder path, folder guid, sub tree) to browse next. A guid of None is Public Objects.
+        level = list()
+        for folder_name, sub_tree in path_tree.items():
+            if folder_name == 'Public Objects':
+                level.append(((folder_name,), None, sub_tree))
+            else:
+                error = FileNotFoundError(f'"{folder_name}" not found when processing path {folder_name}')
+                path_not_found((folder_name,), sub_tree, error)
+
+        with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as executor:
+            while level:
+                futures = list()
+                for folder_path, folder_guid, sub_tree in level:
+                    if folder_guid is None:
+                        futures.append(executor.submit(self.get_folder_contents_by_guid,
+                                                       system_folder=TaskProc.SystemFolders.PublicObjects,
+                                                       type_restriction=type_restriction))
+                    else:
+                        futures.append(executor.submit(self.get_folder_contents_by_guid,
+                                                       folder_guid=folder_guid,
+                                                       type_restriction=type_restriction))
+                next_level = list()
+                for (folder_path, folder_guid, sub_tree), future in zip(level, futures):
+                    try:
+                        contents = future.result()
+                    except FileNotFoundError as e:
+                        path_not_found(folder_path, sub_tree, e)
+                        continue
+                    contents_by_path[folder_path] = contents
+                    if folder_guid is not None:
+                        contents_by_guid[folder_guid] = contents
+                    for sub_folder_name, sub_folder_tree in sub_tree.items():
+                        sub_folder_path = folder_path + (sub_folder_name,)
+                        sub_folder_guid = None
+                        for item in contents:
+                            if item.name == sub_folder_name and item.object_type == ObjectType.Folder:
+                                sub_folder_guid = item.guid
+                        if sub_folder_guid is None:
+                            path_str = '\\'.join(sub_folder_path)
+                            error = FileNotFoundError(f'"{sub_folder_name}" not found when processing path {path_str}')
+                            path_not_found(sub_folder_path, sub_folder_tree, error)
+                        else:
+                            next_level.append((sub_folder_path, sub_folder_guid, sub_folder_tree))
+                level = next_level
+        return contents_by_path, contents_by_guid
+
+    def get_matching_objects_list(self,
+                                  path_list: list,
+                                  type_restriction: set,
+                                  error_list=None,
+                                  max_workers: Optional[int] = None,
+                                  ) -> List[FolderObject]:
         """
         Get a list of matching FolderObjects based on a list of object name patterns.
         Patterns accept wildcards:
@@ -648,6 +1383,8 @@ class TaskProc(object):
         - Patterns that end in [r] will match objects in any sub folder. Any non / characters immediately before
           the [r] will be considered as an object name pattern to match in all sub folders.
 
+        All the patterns are resolved together: each folder needed by any of the patterns is browsed only once.
+
         Parameters
         ----------
         path_list:
@@ -656,6 +1393,8 @@ class TaskProc(object):
             A set of ObjectSubType values to allow.
         error_list:
             Option list to return path errors (FileNotFoundError) in. If not passed, then errors are raised.
+        max_workers:
+            Maximum concurrent folderBrowse requests. Defaults to concurrent_max.
 
 
         Returns
@@ -664,48 +1403,71 @@ class TaskProc(object):
         """
         if isinstance(path_list, str):
             path_list = [path_list]
-        result_list = list()
+
+        # List of (path, folder path tuple, object name pattern, is recursive)
+        patterns = list()
         for path in path_list:
             path = path.strip()
+            if path == '':
+                continue
+            recursive = path[-3:].lower() == '[r]'
+            path_parts = self.path_parts(path)
+            object_pattern = path_parts[-1]
+            if recursive:
+                object_pattern = object_pattern[:-3]
+            folder_path = tuple(folder_name for folder_name in path_parts[:-1] if folder_name != '')
+            patterns.append((path, folder_path, object_pattern, recursive))
+
+        if type_restriction is not None:
+            browse_type_restriction = set(type_restriction)
+            browse_type_restriction.add(ObjectSubType.Folder)
+        else:
+            browse_type_restriction = None
+        contents_by_path, contents_by_guid = self._browse_folder_paths(
+            {folder_path for _, folder_path, _, _ in patterns if folder_path},
+            type_restriction=browse_type_restriction,
+            max_workers=max_workers,
+        )
+
+        # Crawl the sub folders of all recursive patterns together, reusing folders already browsed
+        recursive_roots = list()
+        for _, folder_path, _, recursive in patterns:
+            contents = contents_by_path.get(folder_path)
+            if recursive and isinstance(contents, list):
+                recursive_roots.extend(contents)
+        if recursive_roots:
+            sub_folder_contents = self._crawl_sub_folders(recursive_roots,
+                                                          max_workers=max_workers,
+                                                          known_contents=contents_by_guid,
+                                                          type_restriction=browse_type_restriction,
+                                                          )
+        else:
+            sub_folder_contents = dict()
+
+        result_list = list()
+        for path, folder_path, object_pattern, recursive in patterns:
             try:
-                if path == '':
-                    pass
-                elif path[-3:].lower() == '[r]':
-                    # Ends in [r] so recursive search is needed
-                    path_parts = self.path_parts(path)
-                    folder = path_parts[:-1]
-                    file_name = path_parts[-1][:-3]
-                    if file_name == '':
-                        file_name_list = None
-                    else:
-                        file_name_list = [file_name]
-                    contents = self.get_folder_contents(
-                        name=folder,
-                        name_patterns_to_include=file_name_list,
-                        recursive=True,
-                        flatten_structure=True,
-                        type_restriction=type_restriction,
-                    )
-                    if len(contents) == 0:
-                        msg = f"Path pattern {path} returned no matches"
-                        if error_list is not None:
-                            error_list.append(msg)
-                        else:
-                            self.log.warning(msg)
-                    result_list.extend(contents)
+                contents = contents_by_path.get(folder_path, [])
+                if isinstance(contents, FileNotFoundError):
+                    raise contents
+                if recursive:
+                    contents = TaskProc._flatten_folder_contents(contents, sub_folder_contents)
+                if object_pattern == '':
+                    name_patterns_to_include = None
                 else:
-                    # Non recursive pass last part as name_patterns_to_include
-                    path_parts = self.path_parts(path)
-                    contents = self.get_folder_contents(
-                        name=path_parts[:-1],
-                        name_patterns_to_include=[path_parts[-1]],
-                        recursive=False,
-                        flatten_structure=True,
-                        type_restriction=type_restriction,
-                    )
-                    if len(contents) == 0:
-                        self.log.warning("Path pattern {} returned no matches".format(path))
-                    result_list.extend(contents)
+                    name_patterns_to_include = [object_pattern]
+                contents = [
+                    item for item in contents
+                    if TaskProc._name_matches(item.name, name_patterns_to_include, None)
+                    and (type_restriction is None or item.object_subtype in type_restriction)
+                ]
+                if len(contents) == 0:
+                    msg = f"Path pattern {path} returned no matches"
+                    if recursive and error_list is not None:
+                        error_list.append(msg)
+                    else:
+                        self.log.warning(msg)
+                result_list.extend(contents)
             except FileNotFoundError as e:
                 if error_list is None:
                     raise e
@@ -809,11 +1571,7 @@ class TaskProc(object):
         return Attribute(response.find('dssid').string, response.find('n').string)
 
     def logout(self):
-        arguments = {
-            'taskId':       'logout',
-            'sessionState': self._session,
-        }
-        arguments.update(BASE_PARAMS)
+        arguments = self._get_logout_arguments()
         try:
             result = self.request(arguments, max_retries=0)
         except Exception as e:
@@ -822,10 +1580,62 @@ class TaskProc(object):
         if self.trace:
             self.log.debug("logging out returned %s" % result)
 
-    def request(self, arguments: dict, max_retries: int = None) -> BeautifulSoup:
+    def _send_request(self, request: str, **kwargs) -> requests.Response:
+        """
+        GET the request url, or POST its arguments as a form if the url is longer than max_get_url_length.
+        """
+        if self._use_post(request):
+            url, body = self._get_post_url_and_body(request)
+            return self._http_session.post(url, data=body, headers=FORM_HEADERS, **kwargs)
+        return self._http_session.get(request, **kwargs)
+
+    def _login_again(self, arguments: dict, task_id: Optional[str] = None):
+        """
+        Replace the session that the server logged out, and update the sessionState of arguments.
+
+        Only the first thread that failed with the old session logs in again (and records the re-login in metrics).
+        Other threads using the same client wait for it and then retry with its new session.
         """
-        Assembles the url and performs a get request to
-        the MicroStrategy Task Service API
+        failed_session = arguments.get('sessionState')
+        with self._login_lock:
+            if failed_session is None or failed_session == self._session:
+                try:
+                    self.logout()
+                except MstrClientException:
+                    pass
+                self.login()
+                if self.metrics is not None:
+                    self.metrics.record_relogin(task_id)
+            if 'sessionState' in arguments:
+                arguments['sessionState'] = self._session
+
+    def _retry_or_raise(self,
+                        exception: Exception,
+                        tries: float,
+                        max_retries: int,
+                        arguments: dict,
+                        task_id: Optional[str] = None,
+                        ) -> float:
+        """
+        Handle a failed request attempt. Waits (and logs back in if needed) when the error can be retried,
+        otherwise raises the exception. arguments must be encoded again (see _encode_arguments) before retrying,
+        since logging in again changes their sessionState.
+
+        Returns:
+            The updated number of tries.
+        """
+        # Streamed responses that are not valid xml were usually cut off, so they are retried like lost connections
+        connection_error = isinstance(exception, (requests.exceptions.ConnectionError, MstrResponseParseException))
+        tries, login_again = self._get_recorded_retry(exception, tries, max_retries, task_id, connection_error)
+        time.sleep(self._get_retry_wait(tries))
+        if login_again:
+            self._login_again(arguments, task_id)
+        return tries
+
+    def request(self, arguments: dict, max_retries: int = None, use_cache: bool = True) -> BeautifulSoup:
+        """
+        Assembles the url and performs a get request (or a post request if the url is too long, see
+        max_get_url_length) to the MicroStrategy Task Service API
 
         Arumgents
         ---------
@@ -833,49 +1643,113 @@ class TaskProc(object):
             Maps get key parameters to values
         max_retries:
             Optional. Number of retries to allow. Default = 1.
+        use_cache:
+            Optional. False to bypass the response_cache (the response is still cached).
 
         Returns:
             The xml response as a BeautifulSoup 4 object.
+
+        If the client has a response_cache and the task is one of its cached tasks,
+        a cached response to the same arguments is returned instead of calling the server.
         """
 
         if max_retries is None:
             max_retries = self.max_retries
 
-        arguments.update(BASE_PARAMS)
-        for arg_name, arg_value in arguments.items():
-            if isinstance(arg_value, str):
-                pass
-            elif isinstance(arg_value, Enum):
-                arguments[arg_name] = str(arg_value.value)
-            elif isinstance(arg_value, BitSet):
-                arguments[arg_name] = arg_value.combine()
-            elif isinstance(arg_value, list) or isinstance(arg_value, set):
-                if len(arg_value) == 0:
-                    arguments[arg_name] = ''
-                elif isinstance(list(arg_value)[0], Enum):
-                    new_arg_value = set()
-                    for arg_sub_value in arg_value:
-                        if isinstance(arg_sub_value, Enum):
-                            new_arg_value.add(str(arg_sub_value.value))
-                        else:
-                            new_arg_value.add(str(arg_sub_value))
-                    arg_value = new_arg_value
-                arguments[arg_name] = ','.join(arg_value)
-            else:
-                arguments[arg_name] = str(arg_value)
-
-        if self.trace:
-            self.log.debug("arguments {}".format(arguments))
-        request = self._base_url + urllib.parse.urlencode(arguments)
-        if self.trace:
-            self.log.debug("submitting request {}".format(request))
+        request = self._encode_arguments(arguments)
+        # Checked after _encode_arguments so that the cache key uses the encoded (string) argument values
+        cache_response = self.response_cache is not None and self.response_cache.is_cached_task(arguments)
+        if cache_response and use_cache:
+            response_text = self.response_cache.get(self._metadata_cache_scope, arguments)
+            if response_text is not None:
+                return BeautifulSoup(response_text, 'xml')
+
+        task_id = self._get_task_id(arguments)
+        limited = self._is_limited_task(arguments)
+        metrics = self.metrics
         result_bs4 = None
         done = False
         tries = 0
-        exception = None
         while not done:
+            exception = None
+            if limited:
+                self.limiter.acquire()
+            try:
+                if metrics is not None:
+                    start_time = time.perf_counter()
+                # The session keeps the connection alive and persists cookies between requests
+                response = self._send_request(request)
+                if metrics is None:
+                    result_bs4, exception = self._parse_response(response.status_code, response.text, request)
+                else:
+                    response_time = time.perf_counter()
+                    result_bs4, exception = self._parse_response(response.status_code, response.text, request)
+                    metrics.record_request(
+                        task_id,
+                        network_seconds=response_time - start_time,
+                        parse_seconds=time.perf_counter() - response_time,
+                        response_bytes=len(response.content),
+                    )
+            except requests.exceptions.ConnectionError as e:
+                # Includes pooled keep-alive connections that the server has since closed
+                exception = e
+            finally:
+                if limited:
+                    self.limiter.release()
+
+            if exception is None:
+                done = True
+                if limited:
+                    self.limiter.on_success()
+            else:
+                if limited and self._is_governor_error(str(exception)):
+                    self.limiter.on_overload()
+                tries = self._retry_or_raise(exception, tries, max_retries, arguments, task_id)
+                request = self._encode_arguments(arguments)
+
+        if cache_response:
+            self.response_cache.set(self._metadata_cache_scope, arguments, response.text)
+        return result_bs4
+
+    def request_iter(self, arguments: dict, tags: Iterable[str], max_retries: int = None) -> Iterator:
+        """
+        Performs a request like request() but parses the response stream incrementally with lxml.
+        Yields each completed element with a tag in tags, freeing it once the next element is requested.
+        Errors reported by the server, and responses that are not valid xml, are retried (or raised) before the
+        first element is yielded. A response cut off after that raises MstrResponseParseException.
+
+        Arumgents
+        ---------
+        arguments:
+            Maps get key parameters to values
+        tags:
+            The xml tags to yield. These must not be nested inside each other.
+        max_retries:
+            Optional. Number of retries to allow.
+
+        Returns:
+            An iterator of lxml elements.
+        """
+        if max_retries is None:
+            max_retries = self.max_retries
+
+        request = self._encode_arguments(arguments)
+        task_id = self._get_task_id(arguments)
+        limited = self._is_limited_task(arguments)
+        tries = 0
+        while True:
+            exception = None
+            response = None
+            elements = None
+            first_element = None
+            if limited:
+                self.limiter.acquire()
             try:
-                response = requests.get(request, cookies=self.cookies)
+                if self.metrics is not None:
+                    start_time = time.perf_counter()
+                response = self._send_request(request, stream=True)
+                if self.metrics is not None:
+                    response_time = time.perf_counter()
                 if self.trace:
                     self.log.debug(f"received response {response}")
                 if response.status_code != 200:
@@ -884,87 +1758,43 @@ class TaskProc(object):
                         request=request
                     )
                 else:
-                    self.cookies = response.cookies
-                result_bs4 = BeautifulSoup(response.text, 'xml')
-                task_response = result_bs4.find('taskResponse')
-                if task_response is None:
-                    self.log.error(response)
-                    self.log.error(task_response)
-                    error = f"Unexpected server response with no taskResponse tag {result_bs4.prettify()}"
-                    exception = MstrClientException(
-                        msg=f"Server error '{error}'",
-                        request=request
-                    )
-                else:
-                    if task_response.attrs is None or 'statusCode' not in task_response.attrs:
-                        self.log.error(response)
-                        self.log.error(task_response)
-                        error = f"Unexpected server response with no statusCode in taskResponse tag {task_response}"
-                        exception = MstrClientException(
-                            msg=f"Server error '{error}'",
-                            request=request
-                        )
-                    else:
-                        if task_response['statusCode'] in ['400', '500']:
-                            self.log.error(response)
-                            self.log.error(task_response)
-                            error = task_response['errorMsg']
-                            exception = MstrClientException(
-                                msg=f"Server error '{error}'",
-                                request=request
-                            )
-            except requests.packages.urllib3.exceptions.NewConnectionError as e:
+                    # Let urllib3 undo any gzip/deflate content encoding
+                    response.raw.decode_content = True
+                    elements = iter_task_response(response.raw, tags, request)
+                    # The first step checks the taskResponse status
+                    first_element = next(elements, None)
+            except MstrClientException as e:
+                exception = e
+            except requests.exceptions.ConnectionError as e:
                 exception = e
+            finally:
+                if limited:
+                    self.limiter.release()
 
             if exception is None:
-                done = True
-            else:
-                error = exception.msg
-                messages_to_retry = self._messages_to_retry
-                time.sleep(1)
-                if isinstance(exception, requests.packages.urllib3.exceptions.NewConnectionError):
-                    if tries < max_retries:
-                        self.log.info("Request failed with error {}".format(repr(exception)))
-                        time.sleep(self.retry_delay)
-                        self.log.info("Retrying. Tries={} < {} max".format(tries, max_retries))
-                        # Count these as 1/1000 of a try (allows 5 minutes of retries) for each max_retries
-                        tries += (1/300)
-                    else:
-                        self.log.error('. Tries limit {} reached'.format(tries))
-                        raise exception
-                elif 'automatically logged out' in error:
-                    if tries < max_retries:
-                        tries += 1
-                        # We can't re-login if we don't have a username (ie. we authenticated with a session_state value)
-                        if self.username is not None:
-                            self.log.info("Request failed with error {}".format(repr(exception)))
-                            time.sleep(self.retry_delay)
-                            self.log.info("Logging back in. Tries= {} < {} max".format(tries, max_retries))
-                            try:
-                                self.logout()
-                            except MstrClientException:
-                                pass
-                            self.login()
-                        else:
-                            exception.msg += '. Re-login not possible without username.'
-                            raise exception
-                    else:
-                        self.log.error('. Tries limit {} reached'.format(tries))
-                        raise exception
-                elif any(regex_pattern.match(error) for regex_pattern in messages_to_retry):
-                    if tries < max_retries:
-                        self.log.info("Request failed with error {}".format(repr(exception)))
-                        time.sleep(self.retry_delay)
-                        self.log.info("Retrying. Tries={} < {} max".format(tries, max_retries))
-                        tries += 1
-                    else:
-                        self.log.error('. Tries limit {} reached'.format(tries))
-                        raise exception
-                else:
-                    self.log.debug("Request failed with error {}".format(repr(exception)))
-                    raise exception
+                if limited:
+                    self.limiter.on_success()
+                break
+            if response is not None:
+                response.close()
+            if limited and self._is_governor_error(str(exception)):
+                self.limiter.on_overload()
+            tries = self._retry_or_raise(exception, tries, max_retries, arguments, task_id)
+            request = self._encode_arguments(arguments)
 
-        return result_bs4
+        try:
+            if first_element is not None:
+                yield first_element
+                yield from elements
+        finally:
+            if self.metrics is not None:
+                # The body is parsed while it is received, so only the time to the response headers is known
+                self.metrics.record_request(
+                    task_id,
+                    network_seconds=response_time - start_time,
+                    response_bytes=response.raw.tell(),
+                )
+            response.close()
 
 
 def get_task_client_from_config(config, config_section) -> TaskProc:
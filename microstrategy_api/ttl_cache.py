@@ -0,0 +1,142 @@
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache(object):
+    """
+    Thread safe least recently used cache with a time to live on each entry.
+
+    Optionally entries are also written through to a shelve file, so that a warm cache
+    survives process restarts. Only the in memory entries are bounded by max_entries;
+    entries in the shelve file are dropped when they are found to be expired.
+
+    Args:
+        max_entries:
+            Maximum number of entries kept in memory. None for no limit.
+        ttl_seconds:
+            Default time to live for entries. None for no expiry.
+        path:
+            Optional. File name of a shelve database to persist entries in.
+            Keys and values must be picklable.
+    """
+
+    def __init__(self,
+                 max_entries: Optional[int] = 10000,
+                 ttl_seconds: Optional[float] = 3600,
+                 path: Optional[str] = None,
+                 ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires_at, value)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        if path is not None:
+            self._shelf = shelve.open(path)
+        else:
+            self._shelf = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    @staticmethod
+    def _shelf_key(key: Hashable) -> str:
+        return repr(key)
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """
+        Get the value for key or default if it is not cached (or has expired).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._shelf is not None:
+                shelf_entry = self._shelf.get(self._shelf_key(key))
+                if shelf_entry is not None:
+                    _, expires_at, value = shelf_entry
+                    entry = (expires_at, value)
+                    self._store(key, entry)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return value
+                self.delete(key)
+            if count:
+                self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = _MISSING):
+        """
+        Cache value for key. ttl_seconds overrides the default time to live (None for no expiry).
+        """
+        if ttl_seconds is _MISSING:
+            ttl_seconds = self.ttl_seconds
+        if ttl_seconds is None:
+            expires_at = None
+        else:
+            expires_at = time.time() + ttl_seconds
+        with self._lock:
+            self._store(key, (expires_at, value))
+            if self._shelf is not None:
+                self._shelf[self._shelf_key(key)] = (key, expires_at, value)
+
+    def _store(self, key: Hashable, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._shelf is not None:
+                self._shelf.pop(self._shelf_key(key), None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Delete all entries whose key matches predicate. Returns the number of entries deleted.
+        """
+        deleted_keys = set()
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+                deleted_keys.add(key)
+            if self._shelf is not None:
+                for shelf_key in list(self._shelf.keys()):
+                    key = self._shelf[shelf_key][0]
+                    if predicate(key):
+                        del self._shelf[shelf_key]
+                        deleted_keys.add(key)
+        return len(deleted_keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._shelf is not None:
+                self._shelf.clear()
+
+    def close(self):
+        """
+        Write out and close the shelve file (if any).
+        """
+        with self._lock:
+            if self._shelf is not None:
+                self._shelf.close()
+                self._shelf = None
+
+    @property
+    def statistics(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+from microstrategy_api.mstr_rest_api_facade.api_error import APIError
+
+try:
+    import aiohttp
+    from microstrategy_api.mstr_rest_api_facade.async_facade import AsyncMstrRestApiFacade
+except ImportError:
+    aiohttp = None
+
+BASE_URL = 'http://localhost/MicroStrategyLibrary/api'
+
+
+class FakeResponse(object):
+    def __init__(self, json_object, status=200, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self._json_object = json_object
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def json(self, loads=None, content_type=None):
+        return self._json_object
+
+
+class FakeSession(object):
+    """
+    Stand in for aiohttp.ClientSession. handler(method, path, params) returns a FakeResponse.
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.active = 0
+        self.max_active = 0
+
+    def request(self, method, url, headers=None, params=None, data=None):
+        session = self
+        response = self.handler(method, url[len(BASE_URL):], params)
+
+        class TrackedResponse(FakeResponse):
+            async def __aenter__(self):
+                session.active += 1
+                session.max_active = max(session.max_active, session.active)
+                await asyncio.sleep(0)
+                return self
+
+            async def __aexit__(self, exc_type, exc_val, exc_tb):
+                session.active -= 1
+
+        return TrackedResponse(response._json_object, response.status, response.headers)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp not installed')
+class TestAsyncMstrRestApiFacade(unittest.TestCase):
+
+    def _facade(self, handler, **kwargs):
+        return AsyncMstrRestApiFacade(BASE_URL, 'user', 'pw', http_session=FakeSession(handler), **kwargs)
+
+    def test_gather_user_groups(self):
+        def handler(method, path, params):
+            if path == '/auth/login':
+                return FakeResponse(None, status=204, headers={'x-mstr-authtoken': 'T1'})
+            if path == '/auth/logout':
+                return FakeResponse(None, status=204)
+            user_id = path.split('/')[-1]
+            if user_id == 'missing':
+                return FakeResponse({'code': 'ERR', 'message': 'not found'}, status=404)
+            return FakeResponse({'memberships': [{'name': f'group_{user_id}'}]})
+
+        async def run():
+            async with self._facade(handler, max_concurrent=3) as facade:
+                self.assertEqual(facade.mstr_auth_token, 'T1')
+                results = await facade.gather_user_groups([str(n) for n in range(10)] + ['missing'])
+                self.assertTrue(await facade.is_user_in_group('4', 'group_4'))
+                return facade, results
+
+        facade, results = asyncio.run(run())
+        self.assertEqual(results['7']['mstr_user_groups'], [{'name': 'group_7'}])
+        self.assertEqual(results['missing']['http_status_code'], 404)
+        self.assertEqual(facade._http_session.max_active, 3)
+        self.assertIsNone(facade.mstr_auth_token)
+
+    def test_run_reports(self):
+        def handler(method, path, params):
+            report_id = path.split('/')[3]
+            if report_id == 'BAD':
+                return FakeResponse({'code': 'ERR', 'message': 'bad report'}, status=400)
+            return FakeResponse({
+                'id': report_id,
+                'instanceId': 'I1',
+                'status': 1,
+                'definition': {'grid': {'rows': [], 'columns': []}},
+                'data': {
+                    'paging': {'total': 1, 'current': 1},
+                    'headers': {'rows': [[]], 'columns': []},
+                    'metricValues': {'raw': [[]], 'formatted': [[]]},
+                },
+            })
+
+        async def run():
+            facade = self._facade(handler)
+            return await facade.run_reports(['R1', 'R2', 'BAD'], project_id='P1', return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertEqual(results['R2']['id'], 'R2')
+        self.assertIsInstance(results['BAD'], APIError)
+
+
+if __name__ == '__main__':
+    unittest.main()
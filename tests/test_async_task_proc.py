@@ -0,0 +1,180 @@
+import asyncio
+import unittest
+import urllib.parse
+from unittest import mock
+
+from microstrategy_api.task_proc.concurrency_limiter import AdaptiveConcurrencyLimiter
+from microstrategy_api.task_proc.exceptions import MstrClientException
+from microstrategy_api.task_proc.report import Report
+from microstrategy_api.task_proc.request_metrics import RequestMetrics
+from microstrategy_api.task_proc.response_cache import ResponseCache
+
+try:
+    import aiohttp
+    from microstrategy_api.task_proc.async_task_proc import AsyncTaskProc
+except ImportError:
+    aiohttp = None
+
+BASE_URL = 'http://localhost/MicroStrategy/asp/TaskProc.aspx'
+
+
+class FakeResponse(object):
+    def __init__(self, text, status=200):
+        self.status = status
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def read(self):
+        return self._text.encode('utf-8')
+
+    async def text(self):
+        return self._text
+
+
+class FakeSession(object):
+    """
+    Stand in for aiohttp.ClientSession. handler(arguments) returns the taskResponse body.
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def get(self, url):
+        arguments = dict(urllib.parse.parse_qsl(url.split('?', 1)[1]))
+        self.requests.append(arguments)
+        result = self.handler(arguments)
+        if isinstance(result, FakeResponse):
+            return result
+        return FakeResponse('<taskResponse statusCode="200">{}</taskResponse>'.format(result))
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp not installed')
+class TestAsyncTaskProc(unittest.TestCase):
+
+    def setUp(self):
+        sleep_patch = mock.patch('microstrategy_api.task_proc.async_task_proc.asyncio.sleep', new=mock.AsyncMock())
+        sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+
+    def _client(self, handler, **kwargs):
+        return AsyncTaskProc(BASE_URL, server='srv', project_name='prj', http_session=FakeSession(handler), **kwargs)
+
+    def test_login_and_retry(self):
+        failures = ['Job 1. Number of jobs has exceeded maximum for project prj (10)']
+
+        def handler(arguments):
+            if arguments.get('taskId') == 'getSessionState':
+                return '<max-state>S1</max-state>'
+            if arguments.get('taskId') == 'logout':
+                return ''
+            if failures:
+                return FakeResponse('<taskResponse statusCode="500" errorMsg="{}"/>'.format(failures.pop()))
+            return '<n>ok</n>'
+
+        async def run():
+            async with self._client(handler, username='user', password='pw') as client:
+                self.assertEqual(client.session, 'S1')
+                response = await client.request({'taskId': 'test', 'sessionState': client.session})
+                self.assertEqual(response.find('n').string, 'ok')
+                with self.assertRaises(MstrClientException):
+                    failures.append('Bad things')
+                    await client.request({'taskId': 'test'})
+                return client
+
+        client = asyncio.run(run())
+        self.assertIsNone(client.session)
+        tasks = [arguments['taskId'] for arguments in client.http_session.requests]
+        self.assertEqual(tasks, ['getSessionState', 'test', 'test', 'test', 'logout'])
+
+    def test_execute_report(self):
+        report_xml = (
+            '<objects><attribute rfd="0" id="AT1" name="Region"><form id="FM1" name="DESC"/></attribute>'
+            '<metric rfd="1" id="ME1" name="Revenue"/></objects>'
+            '<headers><oi rfd="0"/><oi rfd="1"/></headers>'
+            '<rows><r><v>East</v><v>1</v></r><r><v>West</v><v>2</v></r></rows>'
+        )
+
+        def handler(arguments):
+            self.assertEqual(arguments['taskId'], 'reportExecute')
+            self.assertEqual(arguments['sessionState'], 'S0')
+            return report_xml
+
+        async def run():
+            client = self._client(handler, session_state='S0')
+            report = Report(client, guid='R1')
+            await client.execute_report(report)
+            return report
+
+        report = asyncio.run(run())
+        self.assertEqual([[value.value for value in row] for row in report.get_values()],
+                         [['East', '1'], ['West', '2']])
+
+    def test_folder_contents_by_name(self):
+        listings = {
+            None: '<obj><id>RP</id><n>Reports</n><d/><t>8</t><st>2048</st></obj>',
+            'RP': '<obj><id>A1</id><n>Alpha</n><d/><t>3</t><st>768</st></obj>',
+        }
+
+        def handler(arguments):
+            return '<folders name="x"><path/>{}</folders>'.format(listings[arguments.get('folderID')])
+
+        async def run():
+            client = self._client(handler, session_state='S0')
+            return await client.get_folder_contents_by_name('\\Public Objects\\Reports')
+
+        contents = asyncio.run(run())
+        self.assertEqual([obj.guid for obj in contents], ['A1'])
+
+    def test_folder_contents_by_name_object(self):
+        listings = {
+            None: '<obj><id>RP</id><n>Reports</n><d/><t>8</t><st>2048</st></obj>',
+            'RP': '<obj><id>A1</id><n>Alpha</n><d/><t>3</t><st>768</st></obj>',
+        }
+
+        def handler(arguments):
+            return '<folders name="x"><path/>{}</folders>'.format(listings[arguments.get('folderID')])
+
+        async def run():
+            client = self._client(handler, session_state='S0')
+            return await client.get_folder_contents_by_name('\\Public Objects\\Reports\\Alpha')
+
+        self.assertEqual(asyncio.run(run()).guid, 'A1')
+
+    def test_cache_limiter_and_metrics(self):
+        failures = ['Maximum number of executing jobs exceeded (4)']
+
+        def handler(arguments):
+            if arguments['taskId'] == 'reportExecute' and failures:
+                return FakeResponse('<taskResponse statusCode="500" errorMsg="{}"/>'.format(failures.pop()))
+            return '<n>{}</n>'.format(arguments['taskId'])
+
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+        metrics = RequestMetrics()
+
+        async def run():
+            # executor_parse_length=0 parses every response in the executor
+            client = self._client(handler, session_state='S0', response_cache=ResponseCache(), limiter=limiter,
+                                  metrics=metrics, executor_parse_length=0)
+            arguments = {'taskId': 'checkUserPrivileges', 'privilegeTypes': '1'}
+            for _ in range(2):
+                response = await client.request(dict(arguments))
+                self.assertEqual(response.find('n').string, 'checkUserPrivileges')
+            response = await client.request({'taskId': 'reportExecute'})
+            self.assertEqual(response.find('n').string, 'reportExecute')
+            return client
+
+        client = asyncio.run(run())
+        tasks = [arguments['taskId'] for arguments in client.http_session.requests]
+        self.assertEqual(tasks, ['checkUserPrivileges', 'reportExecute', 'reportExecute'])
+        self.assertEqual(limiter.statistics, {'limit': 2, 'in_flight': 0, 'successes': 1, 'overloads': 1})
+        self.assertEqual(metrics.get_counter('requests', task_id='reportExecute'), 2)
+        self.assertEqual(metrics.get_counter('retries', task_id='reportExecute', reason='governor'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
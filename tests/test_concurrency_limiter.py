@@ -0,0 +1,38 @@
+import threading
+import unittest
+
+from microstrategy_api.task_proc.concurrency_limiter import AdaptiveConcurrencyLimiter
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+
+    def test_aimd(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=5, cooldown_seconds=0)
+        limiter.on_overload()
+        self.assertEqual(limiter.limit, 2)
+        limiter.on_overload()
+        limiter.on_overload()
+        self.assertEqual(limiter.limit, 1)
+        for _ in range(20):
+            limiter.on_success()
+        self.assertEqual(limiter.limit, 5)
+
+    def test_cooldown(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, cooldown_seconds=60)
+        limiter.on_overload()
+        limiter.on_overload()
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.overloads, 2)
+
+    def test_acquire(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(timeout=0.01))
+        threading.Timer(0.01, limiter.release).start()
+        self.assertTrue(limiter.acquire(timeout=5))
+        limiter.release()
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
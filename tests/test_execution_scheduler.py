@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from microstrategy_api.task_proc.concurrency_limiter import AdaptiveConcurrencyLimiter
+from microstrategy_api.task_proc.document import Document
+from microstrategy_api.task_proc.exceptions import MstrClientException
+from microstrategy_api.task_proc.execution_scheduler import ExecutionScheduler, JobState
+from microstrategy_api.task_proc.status import Status
+from microstrategy_api.task_proc.task_proc import TaskProc
+
+
+class FakeMessage(object):
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.status = self.statuses.pop(0)
+        self.status_str = str(self.status)
+        self.guid = 'M1'
+        self.polls = 0
+
+    def update_status(self, max_wait_ms=None):
+        self.polls += 1
+        self.status = self.statuses.pop(0)
+
+
+class TestExecutionScheduler(unittest.TestCase):
+
+    def setUp(self):
+        http_session = mock.Mock(spec=requests.Session)
+        self.client = TaskProc('http://localhost/MicroStrategy/asp/TaskProc.aspx',
+                               session_state='test_session',
+                               http_session=http_session,
+                               concurrent_max=2,
+                               )
+        sleep_patch = mock.patch('microstrategy_api.task_proc.execution_scheduler.time.sleep')
+        sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+
+    def _document(self, execute_async_results):
+        document = mock.Mock(spec=Document)
+        document.message_id_param = 'messageID'
+        document.execute_async.side_effect = execute_async_results
+        document.execute.return_value = 'result'
+        return document
+
+    def test_run(self):
+        done = []
+        scheduler = ExecutionScheduler(self.client, on_job_done=done.append)
+        governor_error = MstrClientException("Server error 'Job 1. Number of jobs has exceeded maximum for project P (1)'")
+        retried = self._document([governor_error, FakeMessage([Status.JobRunning, Status.Result])])
+        failed = self._document([FakeMessage([Status.WaitingOnGovernor, Status.ErrMsg])])
+        prompted = self._document([FakeMessage([Status.Prompt])])
+        cache_only = self._document([FakeMessage([Status.Result])])
+
+        jobs = [
+            scheduler.add(retried, element_prompt_answers={'p': 'a'}),
+            scheduler.add(failed),
+            scheduler.add(prompted),
+            scheduler.add(cache_only, fetch_result=False),
+        ]
+        self.assertEqual(scheduler.run(), jobs)
+        self.assertEqual(len(done), 4)
+
+        self.assertEqual(jobs[0].state, JobState.Done)
+        self.assertEqual(jobs[0].tries, 2)
+        self.assertEqual(jobs[0].result, 'result')
+        retried.execute.assert_called_once_with(arguments={'messageID': 'M1'})
+        self.assertEqual(retried.execute_async.call_args[1]['element_prompt_answers'], {'p': 'a'})
+
+        self.assertEqual(jobs[1].state, JobState.Failed)
+        self.assertEqual(jobs[1].tries, 1)
+        self.assertEqual(jobs[2].state, JobState.Failed)
+        self.assertIn('prompts', jobs[2].error)
+
+        self.assertEqual(jobs[3].state, JobState.Done)
+        cache_only.execute.assert_not_called()
+
+        stats = scheduler.statistics
+        self.assertEqual((stats['done'], stats['failed'], stats['retries']), (2, 2, 1))
+        self.assertIn('mean_total_seconds', stats)
+
+    def test_unexpected_error(self):
+        done = []
+        scheduler = ExecutionScheduler(self.client, on_job_done=done.append)
+        broken = self._document([requests.exceptions.ConnectionError('reset')])
+        ok = self._document([FakeMessage([Status.Result])])
+        jobs = [scheduler.add(broken), scheduler.add(ok)]
+        self.assertEqual(scheduler.run(), jobs)
+        self.assertCountEqual(done, jobs)
+        self.assertEqual(jobs[0].state, JobState.Failed)
+        self.assertEqual(jobs[0].tries, 1)
+        self.assertIn('reset', jobs[0].error)
+        self.assertIsNotNone(jobs[0].end_time)
+        self.assertEqual(jobs[1].state, JobState.Done)
+
+    def test_limiter(self):
+        self.client.limiter = AdaptiveConcurrencyLimiter(initial_limit=4, cooldown_seconds=0)
+        scheduler = ExecutionScheduler(self.client, max_concurrent=3)
+        self.assertEqual(scheduler.concurrent_limit, 3)
+        governor_error = MstrClientException("Server error 'Maximum number of executing jobs exceeded (4)'")
+        # Governor errors raised by the execution request are counted by TaskProc.request, not again here
+        job = scheduler.add(self._document([governor_error, FakeMessage([Status.Result])]))
+        scheduler.run()
+        self.assertEqual(job.state, JobState.Done)
+        self.assertEqual(self.client.limiter.limit, 4)
+
+        failed_message = FakeMessage([Status.ErrMsg])
+        failed_message.status_str = 'Maximum number of executing jobs exceeded (4)'
+        job = scheduler.add(self._document([failed_message, FakeMessage([Status.Result])]))
+        scheduler.run()
+        self.assertEqual(job.state, JobState.Done)
+        self.assertEqual(self.client.limiter.limit, 2)
+        self.assertEqual(scheduler.concurrent_limit, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from microstrategy_api.backoff import Backoff
+from microstrategy_api.task_proc.message_poller import MessagePoller
+from microstrategy_api.task_proc.status import Status
+
+
+class FakeMessage(object):
+    def __init__(self, guid, statuses):
+        self.guid = guid
+        self.statuses = list(statuses)
+        self.status = self.statuses.pop(0)
+
+    def update_status(self, max_wait_ms=None):
+        self.status = self.statuses.pop(0)
+
+
+class TestMessagePoller(unittest.TestCase):
+
+    def test_watch(self):
+        done = []
+        with MessagePoller(max_workers=2, initial_interval=0.001, max_interval=0.005) as poller:
+            messages = [
+                FakeMessage('M1', [Status.JobRunning, Status.InQueryEngine, Status.Result]),
+                FakeMessage('M2', [Status.WaitingOnGovernor, Status.ErrMsg]),
+                FakeMessage('M3', [Status.Result]),
+            ]
+            futures = [poller.watch(message, callback=done.append) for message in messages]
+            results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(results, messages)
+        self.assertEqual(sorted(message.guid for message in done), ['M1', 'M2', 'M3'])
+        self.assertEqual([message.status for message in results], [Status.Result, Status.ErrMsg, Status.Result])
+        self.assertEqual(poller.polls, 3)
+
+    def test_close_cancels(self):
+        poller = MessagePoller(initial_interval=60)
+        future = poller.watch(FakeMessage('M1', [Status.JobRunning]))
+        poller.close()
+        self.assertTrue(future.cancelled())
+
+    def test_interval(self):
+        poller = MessagePoller(initial_interval=1, max_interval=30, backoff_factor=2, waiting_factor=4)
+        running = FakeMessage('M1', [Status.InQueryEngine])
+        waiting = FakeMessage('M2', [Status.WaitingOnGovernor])
+        self.assertEqual(poller.get_interval(running, polls=2, elapsed=3), 4)
+        self.assertEqual(poller.get_interval(running, polls=1, elapsed=100), 10)
+        self.assertEqual(poller.get_interval(waiting, polls=2, elapsed=3), 16)
+        self.assertEqual(poller.get_interval(waiting, polls=5, elapsed=3), 30)
+        poller.close()
+
+
+class TestBackoff(unittest.TestCase):
+
+    def test_delays(self):
+        self.assertEqual(list(Backoff(initial_delay=1, max_delay=5, factor=2).delays(5)), [1, 2, 4, 5, 5])
+        for delay in Backoff(initial_delay=1, max_delay=5, factor=2, jitter=0.5).delays(5):
+            self.assertTrue(0.5 <= delay <= 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+from microstrategy_api.backoff import Backoff
+from microstrategy_api.mstr_rest_api_facade import MstrRestApiFacade
+from microstrategy_api.mstr_rest_api_facade.metadata_cache import RestMetadataCache
+from microstrategy_api.task_proc.object_type import ObjectType
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+BASE_URL = 'http://localhost/MicroStrategyLibrary/api'
+
+
+class TestMstrRestApiFacade(unittest.TestCase):
+
+    def test_http_session(self):
+        http_session = mock.Mock(spec=requests.Session)
+        response = mock.Mock(spec=requests.Response)
+        response.ok = True
+        response.content = b'{"webVersion": "11.1"}'
+        http_session.request.return_value = response
+        facade = MstrRestApiFacade(BASE_URL, 'user', 'password', http_session=http_session, timeout=30)
+
+        self.assertEqual(facade.get_web_version(), '11.1')
+        self.assertEqual(facade.get_web_version(), '11.1')
+        http_session.request.assert_called_once()
+        args, kwargs = http_session.request.call_args
+        self.assertEqual(args, ('GET', f'{BASE_URL}/status'))
+        self.assertEqual(kwargs['timeout'], 30)
+
+        facade.close()
+        http_session.close.assert_not_called()
+
+    def test_share_pool(self):
+        facade_1 = MstrRestApiFacade(BASE_URL, 'user1', 'password', share_pool=True)
+        facade_2 = MstrRestApiFacade(BASE_URL, 'user2', 'password', share_pool=True)
+        facade_3 = MstrRestApiFacade(BASE_URL, 'user3', 'password')
+        self.assertIs(facade_1.http_session.get_adapter(BASE_URL), facade_2.http_session.get_adapter(BASE_URL))
+        self.assertIsNot(facade_1.http_session.get_adapter(BASE_URL), facade_3.http_session.get_adapter(BASE_URL))
+        self.assertIsNot(facade_1.http_session.cookies, facade_2.http_session.cookies)
+        for facade in [facade_1, facade_2, facade_3]:
+            facade.close()
+
+    def test_run_report_raw_wait(self):
+        facade = MstrRestApiFacade(BASE_URL, 'user', 'password', wait_backoff=Backoff(initial_delay=1, factor=2))
+        running = {'id': 'R1', 'instanceId': 'I1', 'status': 3}
+        ready = {'id': 'R1', 'instanceId': 'I1', 'status': 1}
+        with mock.patch.object(facade, 'create_report_instance', return_value=dict(running)), \
+                mock.patch.object(facade, 'get_report_instance_data',
+                                  side_effect=[dict(running), dict(ready), dict(ready, data='rows')]) as get_data, \
+                mock.patch('microstrategy_api.mstr_rest_api_facade.time.sleep') as sleep:
+            result = facade.run_report_raw(project_id='P1', report_id='R1', limit=100, offset=0)
+        self.assertEqual(result['data'], 'rows')
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [1, 2])
+        # Status polls fetch one row, then the requested rows are fetched once
+        self.assertEqual([call[1]['limit'] for call in get_data.call_args_list], [1, 1, 100])
+
+        with mock.patch.object(facade, 'create_report_instance', return_value=dict(ready, data='rows')), \
+                mock.patch.object(facade, 'get_report_instance_data') as get_data:
+            self.assertEqual(facade.run_report_raw(project_id='P1', report_id='R1')['data'], 'rows')
+        get_data.assert_not_called()
+
+    def test_metadata_cache(self):
+        folders = {
+            None: [{'name': 'Public Objects', 'id': 'F1', 'type': ObjectType.Folder.value}],
+            'F1': [{'name': 'Sales', 'id': 'R1', 'type': ObjectType.ReportDefinition.value}],
+        }
+
+        def get_folder_contents(project_id, folder_id=None):
+            return folders[folder_id]
+
+        cache = RestMetadataCache()
+        facade = MstrRestApiFacade(BASE_URL, 'user', 'password', metadata_cache=cache)
+        other_user = MstrRestApiFacade(BASE_URL, 'user2', 'password', metadata_cache=cache)
+        with mock.patch.object(facade, 'get_project_by_name', return_value={'id': 'P1'}) as get_project, \
+                mock.patch.object(facade, 'make_request_and_handle') as make_request, \
+                mock.patch.object(other_user, 'make_request_and_handle') as other_make_request:
+            make_request.side_effect = lambda name, url, **kwargs: get_folder_contents(
+                'P1', None if url.endswith('/folders') else url.split('/')[-1]
+            )
+            other_make_request.side_effect = make_request.side_effect
+            for _ in range(2):
+                objects = facade.get_objects_by_path('\\Public Objects\\Sales', project_name='Project')
+                self.assertEqual(objects[0]['id'], 'R1')
+            self.assertEqual(get_project.call_count, 1)
+            self.assertEqual(make_request.call_count, 2)
+
+            # Scoped by user
+            other_user.get_folder_contents('P1', 'F1')
+            self.assertEqual(other_make_request.call_count, 1)
+
+            # A stale cached folder is refreshed when the path is not found
+            folders['F1'] = folders['F1'] + [{'name': 'Costs', 'id': 'R2', 'type': ObjectType.ReportDefinition.value}]
+            objects = facade.get_objects_by_path('\\Public Objects\\Costs', project_id='P1')
+            self.assertEqual(objects[0]['id'], 'R2')
+
+            self.assertEqual(cache.invalidate_path('P1', ['Public Objects']), 2)
+            self.assertEqual(cache.invalidate_project('Project'), 1)
+
+    @unittest.skipIf(ijson is None, 'ijson not installed')
+    def test_stream_report_instance_data(self):
+        instance = {
+            'id': 'R1',
+            'definition': {'grid': {'rows': [], 'columns': []}},
+            'data': {
+                'paging': {'total': 2, 'current': 2},
+                'headers': {'rows': [[0], [1]], 'columns': []},
+                'metricValues': {'raw': [[1.5, None], [2, 3]], 'formatted': [['1.5', ''], ['2', '3']]},
+            },
+        }
+        http_session = mock.Mock(spec=requests.Session)
+        response = mock.Mock(spec=requests.Response)
+        response.ok = True
+        response.raw = io.BytesIO(json.dumps(instance).encode('utf-8'))
+        http_session.request.return_value = response
+        facade = MstrRestApiFacade(BASE_URL, 'user', 'password', http_session=http_session)
+
+        streamed = facade.stream_report_instance_data('P1', 'R1', 'I1', get_formatted=True)
+        self.assertEqual(list(streamed), [([0], ['1.5', '']), ([1], ['2', '3'])])
+        self.assertEqual(streamed.instance['data']['paging']['total'], 2)
+        self.assertTrue(http_session.request.call_args[1]['stream'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+import io
+import unittest
+from unittest import mock
+
+from microstrategy_api.mstr_rest_api_facade import MstrRestApiFacade
+from microstrategy_api.mstr_rest_api_facade.metadata_cache import RestMetadataCache
+from microstrategy_api.mstr_rest_api_facade.report_data import ReportDataMerger, ReportLayout
+
+
+def _attribute(name, values):
+    return {
+        'name': name,
+        'type': 'attribute',
+        'forms': [{'name': 'DESC'}],
+        'elements': [{'id': f'{name}:{value}', 'formValues': [value]} for value in values],
+    }
+
+
+def _metrics(names):
+    return {
+        'name': 'Metrics',
+        'type': 'templateMetrics',
+        'elements': [{'id': name, 'name': name} for name in names],
+    }
+
+
+def _page(offset, row_values, years, rows, columns, raw, total=4):
+    return {
+        'id': 'R1',
+        'instanceId': 'I1',
+        'status': 1,
+        'definition': {
+            'grid': {
+                'pageBy': [],
+                'rows': [_attribute('Region', row_values)],
+                'columns': [_attribute('Year', years), _metrics(['Sales'])],
+            }
+        },
+        'data': {
+            'paging': {'total': total, 'current': len(rows), 'offset': offset, 'limit': 2},
+            'headers': {'rows': rows, 'columns': columns},
+            'metricValues': {
+                'raw': raw,
+                'formatted': [[str(value) for value in row] for row in raw],
+            },
+        },
+    }
+
+
+def _metric_page(offset, row_values, raw):
+    page = _page(offset, row_values, [], [[i] for i in range(len(raw))], [[0]], [[value] for value in raw], total=3)
+    page['definition']['grid']['columns'] = [_metrics(['Sales'])]
+    return page
+
+
+PAGE_1 = _page(0, ['East', 'West'], ['2019'], [[0], [1]], [[0], [0]], [[1], [2]])
+# The elements of each page are numbered independently and this page has an extra column
+PAGE_2 = _page(2, ['North', 'East'], ['2020', '2019'], [[0], [1]], [[1, 0], [0, 0]], [[3, 4], [5, 6]])
+
+
+class TestReportDataMerger(unittest.TestCase):
+
+    def _check_result(self, result):
+        grid = result['definition']['grid']
+        self.assertEqual([e['formValues'][0] for e in grid['rows'][0]['elements']], ['East', 'West', 'North'])
+        self.assertEqual([e['formValues'][0] for e in grid['columns'][0]['elements']], ['2019', '2020'])
+        self.assertEqual(result['data']['headers']['rows'], [[0], [1], [2], [0]])
+        self.assertEqual(result['data']['headers']['columns'], [[0, 1], [0, 0]])
+        self.assertEqual(result['data']['metricValues']['raw'], [[1, None], [2, None], [3, 4], [5, 6]])
+        self.assertEqual(result['data']['metricValues']['formatted'][0], ['1', ''])
+        self.assertEqual(result['data']['paging']['current'], 4)
+
+    def test_merge(self):
+        merger = ReportDataMerger(PAGE_1)
+        merger.add_page(PAGE_2)
+        self._check_result(merger.get_result())
+
+    def test_run_report_raw_all_data(self):
+        facade = MstrRestApiFacade('http://localhost/MicroStrategyLibrary/api', 'user', 'password')
+        with mock.patch.object(facade, 'get_project_id', return_value='P1'), \
+                mock.patch.object(facade, 'run_report_raw', return_value=PAGE_1), \
+                mock.patch.object(facade, 'get_report_instance_data', return_value=PAGE_2) as get_data:
+            result = facade.run_report_raw_all_data(report_id='R1', chuck_size=2)
+        get_data.assert_called_once()
+        self.assertEqual(get_data.call_args[1]['offset'], 2)
+        self._check_result(result)
+
+
+class TestReportCsv(unittest.TestCase):
+
+    def test_csv(self):
+        facade = MstrRestApiFacade('http://localhost/MicroStrategyLibrary/api', 'user', 'password')
+        expected = '\n'.join([
+            '"Region DESC","2019 Sales","2020 Sales"',
+            '"East","1",',
+            '"West","2",',
+            '"North","3","4"',
+            '"East","5","6"',
+        ])
+        # Year on the columns adds a column in the second page, so the pages are merged before the output
+        with mock.patch.object(facade, 'iter_report_raw_pages', side_effect=lambda **kwargs: iter([PAGE_1, PAGE_2])):
+            self.assertEqual(facade.run_report_csv(), expected)
+            chunks = list(facade.iter_report_csv(chunk_rows=2))
+            self.assertEqual(len(chunks), 3)
+            self.assertEqual(b''.join(chunks), expected.encode('utf-8'))
+            file_obj = io.StringIO()
+            facade.write_report_csv(file_obj)
+            self.assertEqual(file_obj.getvalue(), expected)
+
+    def test_csv_streamed(self):
+        facade = MstrRestApiFacade('http://localhost/MicroStrategyLibrary/api', 'user', 'password')
+        fetched = []
+
+        def iter_pages(**kwargs):
+            for page in [_metric_page(0, ['East', 'West'], [1, 2]), _metric_page(2, ['North'], [3])]:
+                fetched.append(page['data']['paging']['offset'])
+                yield page
+
+        with mock.patch.object(facade, 'iter_report_raw_pages', side_effect=iter_pages):
+            chunks = facade.iter_report_csv(chunk_rows=1, encoding=None)
+            self.assertEqual(next(chunks), '"Region DESC","Sales"')
+            self.assertEqual(next(chunks), '\n"East","1"')
+            self.assertEqual(fetched, [0])
+            self.assertEqual(list(chunks), ['\n"West","2"', '\n"North","3"'])
+            self.assertEqual(fetched, [0, 2])
+
+    def test_layout(self):
+        facade = MstrRestApiFacade('http://localhost/MicroStrategyLibrary/api', 'user', 'password',
+                                   metadata_cache=RestMetadataCache())
+        layout = facade.get_report_layout(PAGE_1)
+        self.assertEqual(layout.get_headers(PAGE_1), ['Region DESC', '2019 Sales'])
+        self.assertEqual(layout.get_headers(PAGE_2), ['Region DESC', '2019 Sales', '2020 Sales'])
+        self.assertIs(facade.get_report_layout(PAGE_2), layout)
+
+        changed_grid = dict(PAGE_1['definition']['grid'], rows=[{'name': 'Country', 'type': 'attribute', 'forms': []}])
+        changed = dict(PAGE_1, definition={'grid': changed_grid})
+        self.assertIsNot(facade.get_report_layout(changed), layout)
+        self.assertIsInstance(facade.get_report_layout(changed), ReportLayout)
+
+
+def _page_by_slice(row_values, raw):
+    page = _page(0, row_values, [], [[i] for i in range(len(raw))], [[0]], [[value] for value in raw],
+                 total=len(raw))
+    grid = page['definition']['grid']
+    grid['columns'] = [_metrics(['Sales'])]
+    grid['pageBy'] = [dict(_attribute('Year', ['2019', '2020']), id='YEAR')]
+    page['data']['headers']['columns'] = [[0]]
+    page['project_id'] = 'P1'
+    return page
+
+
+class TestPageBy(unittest.TestCase):
+
+    def test_page_by_csv(self):
+        facade = MstrRestApiFacade('http://localhost/MicroStrategyLibrary/api', 'user', 'password')
+        instances = [
+            # The first instance (one row) only lists the page-by elements
+            _page_by_slice(['East'], [1]),
+            _page_by_slice(['East'], [1]),
+            _page_by_slice(['East', 'West'], [3, 4]),
+        ]
+        filters = {'viewFilter': {'operator': 'In', 'operands': []}}
+        with mock.patch.object(facade, 'run_report_raw', side_effect=instances) as run_raw, \
+                mock.patch.object(facade, 'get_report_instance_data') as get_data:
+            result = facade.run_report_csv(project_id='P1', report_id='R1', filters=filters)
+        self.assertEqual(result, '\n'.join([
+            '"Year DESC","Region DESC","Sales"',
+            '"2019","East","1"',
+            '"2020","East","3"',
+            '"2020","West","4"',
+        ]))
+        get_data.assert_not_called()
+        self.assertEqual(run_raw.call_count, 3)
+        self.assertEqual(run_raw.call_args_list[0][1]['limit'], 1)
+        slice_filter = run_raw.call_args_list[2][1]['filters']['viewFilter']
+        self.assertEqual(slice_filter['operands'][0], filters['viewFilter'])
+        self.assertEqual(slice_filter['operands'][1]['operands'][1]['elements'], [{'id': 'Year:2020'}])
+        self.assertEqual(run_raw.call_args_list[2][1]['project_id'], 'P1')
+
+    def test_no_page_by(self):
+        facade = MstrRestApiFacade('http://localhost/MicroStrategyLibrary/api', 'user', 'password')
+        first_page = _page(0, ['East'], ['2019'], [[0]], [[0], [0]], [[1]])
+        pages = [
+            _page(1, ['West', 'North'], ['2019'], [[0], [1]], [[0], [0]], [[2], [3]]),
+            _page(3, ['East'], ['2019'], [[0]], [[0], [0]], [[4]]),
+        ]
+        with mock.patch.object(facade, 'run_report_raw', return_value=first_page) as run_raw, \
+                mock.patch.object(facade, 'get_report_instance_data', side_effect=pages) as get_data:
+            result = facade.run_report_raw_all_page_by(project_id='P1', report_id='R1', chuck_size=2)
+        # The report only runs once, the rows after the first are fetched from the same instance
+        run_raw.assert_called_once()
+        self.assertEqual([(call[1]['offset'], call[1]['limit']) for call in get_data.call_args_list],
+                         [(1, 2), (3, 2)])
+        self.assertEqual([e['formValues'][0] for e in result['definition']['grid']['rows'][0]['elements']],
+                         ['East', 'West', 'North'])
+        self.assertEqual(result['data']['headers']['rows'], [[0], [1], [2], [0]])
+        self.assertEqual(result['data']['metricValues']['raw'], [[1], [2], [3], [4]])
+
+
+try:
+    import numpy
+    import pandas
+    import pyarrow
+except ImportError:
+    numpy = pandas = pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None or pandas is None, "requires numpy, pandas and pyarrow")
+class TestReportColumns(unittest.TestCase):
+
+    def setUp(self):
+        merger = ReportDataMerger(PAGE_1)
+        merger.add_page(PAGE_2)
+        self.instance = merger.get_result()
+        self.facade = MstrRestApiFacade('http://localhost/MicroStrategyLibrary/api', 'user', 'password')
+
+    def test_frame(self):
+        with mock.patch.object(self.facade, 'run_report_raw_all_page_by', return_value=self.instance):
+            frame = self.facade.run_report_frame()
+        self.assertEqual(list(frame.columns), ['Region DESC', '2019 Sales', '2020 Sales'])
+        self.assertEqual(frame['Region DESC'].dtype.name, 'category')
+        self.assertEqual(list(frame['Region DESC'].cat.categories), ['East', 'West', 'North'])
+        self.assertEqual(list(frame['Region DESC']), ['East', 'West', 'North', 'East'])
+        self.assertEqual(list(frame['2019 Sales']), [1.0, 2.0, 3.0, 5.0])
+        self.assertTrue(numpy.isnan(frame['2020 Sales'][0]))
+
+    def test_arrow(self):
+        with mock.patch.object(self.facade, 'run_report_raw_all_page_by', return_value=self.instance):
+            table = self.facade.run_report_arrow()
+        self.assertEqual(table.column_names, ['Region DESC', '2019 Sales', '2020 Sales'])
+        self.assertTrue(pyarrow.types.is_dictionary(table.schema.field('Region DESC').type))
+        self.assertEqual(table.column('Region DESC').to_pylist(), ['East', 'West', 'North', 'East'])
+        self.assertEqual(table.column('2020 Sales').to_pylist(), [None, None, 4.0, 6.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from microstrategy_api.task_proc.request_metrics import RequestMetrics, Histogram
+
+
+class TestRequestMetrics(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram([1, 10])
+        for value in [0.5, 1, 5, 50]:
+            histogram.observe(value)
+        self.assertEqual(histogram.snapshot(), {
+            'count': 4,
+            'sum': 56.5,
+            'buckets': {1: 2, 10: 3, float('inf'): 4},
+        })
+
+    def test_callback(self):
+        recorded = []
+        metrics = RequestMetrics(callback=lambda name, value, labels: recorded.append((name, value, labels)),
+                                 aggregate=False)
+        metrics.record_request('getPrompts', network_seconds=0.2, response_bytes=100)
+        metrics.record_relogin('getPrompts')
+        self.assertEqual(recorded, [
+            ('requests', 1, {'task_id': 'getPrompts'}),
+            ('network_seconds', 0.2, {'task_id': 'getPrompts'}),
+            ('response_bytes', 100, {'task_id': 'getPrompts'}),
+            ('relogins', 1, {'task_id': 'getPrompts'}),
+        ])
+        self.assertEqual(metrics.snapshot(), [])
+
+    def test_snapshot(self):
+        metrics = RequestMetrics()
+        metrics.record_retry('reportExecute', 'governor')
+        metrics.record_request('reportExecute', parse_seconds=0.01)
+        names = sorted(entry['name'] for entry in metrics.snapshot())
+        self.assertEqual(names, ['parse_seconds', 'requests', 'retries'])
+        metrics.clear()
+        self.assertEqual(metrics.get_counter('requests', task_id='reportExecute'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import io
+import threading
+import unittest
+import urllib.parse
+from unittest import mock
+
+from microstrategy_api.task_proc.session_pool import TaskProcSessionPool
+
+BASE_URL = 'http://localhost/MicroStrategy/asp/TaskProc.aspx'
+
+
+class TestTaskProcSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = TaskProcSessionPool(BASE_URL, 'user', 'password', server='server', project_name='project',
+                                        max_sessions=2, concurrent_max=2)
+        new_client_patch = mock.patch.object(self.pool, '_new_client', side_effect=lambda: mock.Mock())
+        self.new_client = new_client_patch.start()
+        self.addCleanup(new_client_patch.stop)
+
+    def test_lazy_login(self):
+        with self.pool.lease() as client_1:
+            pass
+        with self.pool.lease() as client_2:
+            self.assertIs(client_2, client_1)
+        self.assertEqual(self.new_client.call_count, 1)
+
+    def test_least_loaded(self):
+        clients = [self.pool.acquire() for _ in range(4)]
+        self.assertEqual(self.new_client.call_count, 2)
+        self.assertIs(clients[0], clients[2])
+        self.assertIsNot(clients[0], clients[1])
+        self.assertEqual(self.pool.statistics['session_leases'], [2, 2])
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(timeout=0.01)
+        self.pool.release(clients[1])
+        self.assertIs(self.pool.acquire(timeout=0.01), clients[1])
+
+    def test_close(self):
+        with self.pool.lease() as client:
+            pass
+        self.pool.close()
+        client.logout.assert_called_once()
+        with self.assertRaises(ValueError):
+            self.pool.acquire()
+
+
+class FakeTaskProcServer(object):
+    """
+    Answers TaskProc GET requests, logging out sessions on expire().
+    """
+
+    def __init__(self):
+        self.logins = 0
+        self.session = None
+        self.expired_barrier = None
+        self.lock = threading.Lock()
+
+    def expire(self, callers: int):
+        with self.lock:
+            self.session = None
+        # Hold the requests with the expired session until all callers failed with it
+        self.expired_barrier = threading.Barrier(callers)
+
+    def get(self, url, **kwargs):
+        arguments = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+        task_id = arguments['taskId']
+        with self.lock:
+            if task_id == 'getSessionState':
+                self.logins += 1
+                self.session = 'S{}'.format(self.logins)
+                return self._response('<taskResponse statusCode="200"><max-state>{}</max-state></taskResponse>'.format(
+                    self.session))
+            session = self.session
+        if task_id == 'logout' or arguments.get('sessionState') == session:
+            return self._response('<taskResponse statusCode="200"/>')
+        self.expired_barrier.wait(timeout=5)
+        return self._response('<taskResponse statusCode="500" errorMsg="You have been automatically logged out"/>')
+
+    @staticmethod
+    def _response(text):
+        response = mock.Mock()
+        response.status_code = 200
+        response.text = text
+        response.content = text.encode('utf-8')
+        response.raw = io.BytesIO(response.content)
+        return response
+
+
+class TestTaskProcSessionPoolRelogin(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeTaskProcServer()
+        http_session = mock.Mock()
+        http_session.get.side_effect = self.server.get
+        http_session_patch = mock.patch('microstrategy_api.task_proc.session_pool.new_http_session',
+                                        return_value=http_session)
+        http_session_patch.start()
+        self.addCleanup(http_session_patch.stop)
+        sleep_patch = mock.patch('microstrategy_api.task_proc.task_proc.time.sleep')
+        sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+        self.pool = TaskProcSessionPool(BASE_URL, 'user', 'password', server='server', project_name='project',
+                                        max_sessions=1, concurrent_max=2)
+
+    def test_session_expires_during_lease(self):
+        errors = []
+
+        def work(client):
+            try:
+                client.request({'taskId': 'test', 'sessionState': client._session})
+            except Exception as e:
+                errors.append(e)
+
+        with self.pool.lease() as client_1, self.pool.lease() as client_2:
+            self.assertIs(client_1, client_2)
+            self.assertEqual(client_1._session, 'S1')
+            self.server.expire(callers=2)
+            threads = [threading.Thread(target=work, args=(client,)) for client in (client_1, client_2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        # Logged in once by the lease and once more by only one of the two callers
+        self.assertEqual(self.server.logins, 2)
+        self.assertEqual(client_1._session, 'S2')
+
+
+if __name__ == '__main__':
+    unittest.main()
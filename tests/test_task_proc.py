@@ -0,0 +1,462 @@
+import io
+import threading
+import urllib.parse
+import unittest
+from unittest import mock
+
+import requests
+
+from microstrategy_api.task_proc.concurrency_limiter import AdaptiveConcurrencyLimiter
+from microstrategy_api.task_proc.exceptions import MstrClientException
+from microstrategy_api.task_proc.metadata_cache import MetadataCache
+from microstrategy_api.task_proc.object_type import ObjectType, ObjectSubType
+from microstrategy_api.task_proc.request_metrics import RequestMetrics
+from microstrategy_api.task_proc.report import Report
+from microstrategy_api.task_proc.response_cache import ResponseCache
+from microstrategy_api.task_proc.response_parser import ParserBackend
+from microstrategy_api.task_proc.task_proc import TaskProc
+
+BASE_URL = 'http://localhost/MicroStrategy/asp/TaskProc.aspx'
+
+
+def _response(text, status_code=200):
+    response = mock.Mock()
+    response.status_code = status_code
+    response.text = text
+    response.content = text.encode('utf-8')
+    response.raw = io.BytesIO(response.content)
+    return response
+
+
+def _ok(body=''):
+    return _response('<taskResponse statusCode="200">{}</taskResponse>'.format(body))
+
+
+def _error(msg):
+    return _response('<taskResponse statusCode="500" errorMsg="{}"/>'.format(msg))
+
+
+class TestTaskProcRequest(unittest.TestCase):
+
+    def setUp(self):
+        self.http_session = mock.Mock(spec=requests.Session)
+        self.http_session.cookies = requests.cookies.RequestsCookieJar()
+        self.client = TaskProc(BASE_URL,
+                               session_state='test_session',
+                               http_session=self.http_session,
+                               retry_delay=0,
+                               )
+        sleep_patch = mock.patch('microstrategy_api.task_proc.task_proc.time.sleep')
+        sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+
+    def test_uses_http_session(self):
+        self.http_session.get.return_value = _ok('<n>x</n>')
+        response = self.client.request({'taskId': 'test'})
+        self.assertEqual(response.find('n').string, 'x')
+        self.assertEqual(self.http_session.get.call_count, 1)
+        url = self.http_session.get.call_args[0][0]
+        self.assertTrue(url.startswith(BASE_URL + '?'))
+        self.assertIn('taskId=test', url)
+
+    def test_default_session_pool(self):
+        client = TaskProc(BASE_URL, session_state='test_session', concurrent_max=7)
+        adapter = client.http_session.get_adapter(BASE_URL)
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+    def test_retry_connection_error(self):
+        self.http_session.get.side_effect = [requests.exceptions.ConnectionError('reset'), _ok()]
+        self.client.request({'taskId': 'test'})
+        self.assertEqual(self.http_session.get.call_count, 2)
+
+    def test_retry_governor_error(self):
+        self.http_session.get.side_effect = [_error('Job 12. Number of jobs has exceeded maximum for project Test (10)'), _ok()]
+        self.client.request({'taskId': 'test'})
+        self.assertEqual(self.http_session.get.call_count, 2)
+
+    def test_retry_executing_jobs_exceeded(self):
+        self.http_session.get.side_effect = [_error('Maximum number of executing jobs exceeded for user (10)'), _ok()]
+        self.client.request({'taskId': 'test'})
+        self.assertEqual(self.http_session.get.call_count, 2)
+
+    def test_limiter(self):
+        self.client.limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+        self.http_session.get.side_effect = [_error('There are too many auditor handles at the moment. '
+                                                    'Please try again later.'), _ok(), _ok()]
+        self.client.request({'taskId': 'reportExecute'})
+        self.assertEqual(self.client.limiter.statistics,
+                         {'limit': 2, 'in_flight': 0, 'successes': 1, 'overloads': 1})
+        # Other tasks are not limited
+        self.client.request({'taskId': 'test'})
+        self.assertEqual(self.client.limiter.successes, 1)
+
+    def test_post_long_request(self):
+        self.http_session.post.side_effect = [requests.exceptions.ConnectionError('reset'), _ok('<n>x</n>')]
+        answer = '<pa>' + 'x' * 3000 + '</pa>'
+        response = self.client.request({'taskId': 'reportExecute', 'promptsAnswerXML': answer})
+        self.assertEqual(response.find('n').string, 'x')
+        self.http_session.get.assert_not_called()
+        self.assertEqual(self.http_session.post.call_count, 2)
+        url = self.http_session.post.call_args[0][0]
+        self.assertEqual(url, BASE_URL)
+        body = urllib.parse.parse_qs(self.http_session.post.call_args[1]['data'])
+        self.assertEqual(body['promptsAnswerXML'], [answer])
+        self.assertEqual(body['taskId'], ['reportExecute'])
+
+    def test_response_cache_session_scope(self):
+        # Clients authenticated with session_state have no username, so they must not share responses
+        response_cache = ResponseCache()
+        self.client.response_cache = response_cache
+        other_client = TaskProc(BASE_URL, session_state='other_session', http_session=self.http_session,
+                                response_cache=response_cache)
+        self.http_session.get.side_effect = [_ok('<n>a</n>'), _ok('<n>b</n>')]
+        arguments = {'taskId': 'checkUserPrivileges', 'privilegeTypes': '1'}
+        self.assertEqual(self.client.request(dict(arguments)).find('n').string, 'a')
+        self.assertEqual(other_client.request(dict(arguments)).find('n').string, 'b')
+        self.assertEqual(self.client.request(dict(arguments)).find('n').string, 'a')
+        self.assertEqual(self.http_session.get.call_count, 2)
+
+    def test_metrics(self):
+        self.client.metrics = RequestMetrics()
+        self.http_session.get.side_effect = [
+            requests.exceptions.ConnectionError('reset'),
+            _error('Job 12. Number of jobs has exceeded maximum for project Test (10)'),
+            _ok('<n>x</n>'),
+            _error('Bad things'),
+        ]
+        self.client.request({'taskId': 'reportExecute'})
+        with self.assertRaises(MstrClientException):
+            self.client.request({'taskID': 'folderBrowse'})
+        metrics = self.client.metrics
+        self.assertEqual(metrics.get_counter('requests', task_id='reportExecute'), 2)
+        self.assertEqual(metrics.get_counter('retries', task_id='reportExecute', reason='connection'), 1)
+        self.assertEqual(metrics.get_counter('retries', task_id='reportExecute', reason='governor'), 1)
+        self.assertEqual(metrics.get_counter('errors', task_id='folderBrowse'), 1)
+        self.assertEqual(metrics.get_histogram('response_bytes', task_id='reportExecute')['count'], 2)
+        self.assertEqual(metrics.get_histogram('parse_seconds', task_id='folderBrowse')['count'], 1)
+
+    def test_metrics_relogin(self):
+        self.client.metrics = RequestMetrics()
+        self.client.username = 'user'
+        self.client.logout = mock.Mock()
+        self.client.login = mock.Mock(side_effect=lambda: setattr(self.client, '_session', 'new_session'))
+        self.http_session.get.side_effect = [_error('You have been automatically logged out'), _ok('<n>x</n>')]
+        response = self.client.request({'taskId': 'folderBrowse', 'sessionState': self.client._session})
+        self.assertEqual(response.find('n').string, 'x')
+        sent_sessions = [urllib.parse.parse_qs(urllib.parse.urlsplit(call[0][0]).query)['sessionState']
+                         for call in self.http_session.get.call_args_list]
+        self.assertEqual(sent_sessions, [['test_session'], ['new_session']])
+        metrics = self.client.metrics
+        self.assertEqual(metrics.get_counter('retries', task_id='folderBrowse', reason='logged_out'), 1)
+        self.assertEqual(metrics.get_counter('relogins', task_id='folderBrowse'), 1)
+
+    def test_crawl_relogin_once(self):
+        root_guid = 'R' * 32
+        listings = {
+            root_guid: '<obj><id>F1</id><n>One</n><d/><t>8</t><st>2048</st></obj>'
+                       '<obj><id>F2</id><n>Two</n><d/><t>8</t><st>2048</st></obj>',
+            'F1': '<obj><id>A1</id><n>Alpha</n><d/><t>3</t><st>768</st></obj>',
+            'F2': '<obj><id>B1</id><n>Beta</n><d/><t>3</t><st>768</st></obj>',
+        }
+        server = {'session': 'test_session'}
+        # Both sub folder requests fail with the expired session before either worker logs back in
+        expired_barrier = threading.Barrier(2)
+
+        def get(url, **kwargs):
+            arguments = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+            if arguments['sessionState'] != server['session']:
+                expired_barrier.wait(timeout=5)
+                return _error('You have been automatically logged out')
+            folder_guid = arguments['folderID']
+            if folder_guid == root_guid:
+                server['session'] = None
+            return _ok('<folders name="x"><path/>{}</folders>'.format(listings[folder_guid]))
+
+        def login():
+            server['session'] = self.client._session = 'new_session'
+
+        self.client.username = 'user'
+        self.client.logout = mock.Mock()
+        self.client.login = mock.Mock(side_effect=login)
+        self.http_session.get.side_effect = get
+        contents = self.client.get_folder_contents(root_guid, max_workers=2)
+        self.assertCountEqual([obj.guid for obj in contents], ['F1', 'F2', 'A1', 'B1'])
+        self.assertEqual(self.client.login.call_count, 1)
+
+    def test_no_retry_other_error(self):
+        self.http_session.get.side_effect = [_error('Bad things'), _ok()]
+        with self.assertRaises(MstrClientException):
+            self.client.request({'taskId': 'test'})
+        self.assertEqual(self.http_session.get.call_count, 1)
+
+    def test_response_cache(self):
+        self.client.response_cache = ResponseCache({'folderBrowse': 60})
+        self.http_session.get.side_effect = [_ok('<n>x</n>'), _ok('<n>y</n>'), _ok('<n>z</n>')]
+        response = self.client.request({'taskId': 'folderBrowse', 'folderID': 'F1', 'sessionState': 'S1'})
+        self.assertEqual(response.find('n').string, 'x')
+        # Cached regardless of the session state and the taskId argument name
+        response = self.client.request({'sessionState': 'S2', 'folderID': 'F1', 'taskID': 'folderBrowse'})
+        self.assertEqual(response.find('n').string, 'x')
+        self.assertEqual(self.http_session.get.call_count, 1)
+        # Other arguments and tasks that are not cached call the server
+        self.client.request({'taskId': 'folderBrowse', 'folderID': 'F2'})
+        self.client.request({'taskId': 'reportExecute', 'objectID': 'R1'})
+        self.assertEqual(self.http_session.get.call_count, 3)
+        self.assertEqual(self.client.response_cache.statistics, {'entries': 2, 'hits': 1, 'misses': 2})
+
+
+FOLDER_XML = """
+<folders name="Sales" id="F1">
+<path><folder>Public Objects</folder><folder>Reports</folder></path>
+<obj><id>A1</id><n>Alpha</n><d>first</d><t>3</t><st>768</st></obj>
+<obj><id>B2</id><n>Beta</n><d></d><t>8</t><st>2048</st></obj>
+</folders>
+"""
+
+REPORT_XML = """
+<objects>
+<attribute rfd="0" id="AT1" name="Region"><form id="FM1" name="DESC"/><form id="FM2" name="ID"/></attribute>
+<metric rfd="1" id="ME1" name="Revenue"/>
+</objects>
+<headers><oi rfd="0"/><oi rfd="1"/></headers>
+<rows><r><v>East</v><v>1</v><v>100.5</v></r><r><v>West</v><v>2</v><v></v></r></rows>
+"""
+
+
+class TestParserBackends(unittest.TestCase):
+
+    def _client(self, parser_backend, body):
+        http_session = mock.Mock(spec=requests.Session)
+        http_session.cookies = requests.cookies.RequestsCookieJar()
+        http_session.get.side_effect = lambda *args, **kwargs: _ok(body)
+        return TaskProc(BASE_URL,
+                        session_state='test_session',
+                        http_session=http_session,
+                        parser_backend=parser_backend,
+                        )
+
+    def test_folder_contents(self):
+        results = []
+        for parser_backend in ParserBackend:
+            client = self._client(parser_backend, FOLDER_XML)
+            contents = client.get_folder_contents_by_guid('F1', name_patterns_to_exclude=['b*'])
+            results.append([(obj.guid, obj.name, obj.path, obj.description, obj.object_type) for obj in contents])
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], [('A1', 'Alpha', ['Public Objects', 'Reports', 'Sales'], 'first', ObjectType.ReportDefinition)])
+
+    def test_report_rows(self):
+        results = []
+        for parser_backend in ParserBackend:
+            report = Report(self._client(parser_backend, REPORT_XML), guid='R1')
+            report.execute()
+            results.append([[(str(value.header), value.value) for value in row] for row in report.get_values()])
+            self.assertEqual(len(report.get_headers()), 3)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][1][0][1], 'West')
+        self.assertIsNone(results[0][1][2][1])
+
+    def test_report_alternative_client(self):
+        default_client = self._client(ParserBackend.LxmlStream, '')
+        other_client = self._client(ParserBackend.LxmlStream, REPORT_XML)
+        report = Report(default_client, guid='R1')
+        report.execute(task_api_client=other_client)
+        self.assertEqual(len(report.get_values()), 2)
+        default_client._http_session.get.assert_not_called()
+        self.assertIs(report._task_api_client, default_client)
+
+    def test_report_columnar(self):
+        for parser_backend in ParserBackend:
+            report = Report(self._client(parser_backend, REPORT_XML), guid='R1')
+            report.execute(columnar=True)
+            columns = report.get_columns()
+            self.assertEqual(len(columns), 2)
+            self.assertEqual(columns.column_names(), ['Region@DESC', 'Region@ID', 'Revenue'])
+            self.assertEqual(columns.columns[0].values, ['East', 'West'])
+            rows = report.get_values()
+            self.assertEqual([[value.value for value in row] for row in rows],
+                             [['East', '1', 100.5], ['West', '2', None]])
+            self.assertIs(rows[-1][2].header, report.get_metrics()[0])
+
+    def test_iter_rows(self):
+        windows = {
+            '0': '<r><v>East</v><v>1</v><v>1</v></r><r><v>West</v><v>2</v><v>2</v></r>',
+            '2': '<r><v>North</v><v>3</v><v>3</v></r>',
+        }
+        objects = REPORT_XML.split('<rows>')[0]
+
+        def get(url, **kwargs):
+            arguments = dict(urllib.parse.parse_qsl(url.split('?', 1)[1]))
+            if 'maxWait' in arguments:
+                return _ok('<msg><id>M1</id><st>-1</st><status>1</status></msg>')
+            self.assertEqual(arguments['msgID'], 'M1')
+            self.assertEqual(arguments['maxRows'], '2')
+            return _ok(objects + '<rows>' + windows[arguments['startRow']] + '</rows>')
+
+        for parser_backend in ParserBackend:
+            for prefetch in [True, False]:
+                client = self._client(parser_backend, '')
+                client._http_session.get.side_effect = get
+                report = Report(client, guid='R1')
+                rows = list(report.iter_rows(window_size=2, prefetch=prefetch))
+                self.assertEqual([row[0].value for row in rows], ['East', 'West', 'North'])
+
+    def test_recursive_folder_contents(self):
+        def folder_xml(name, objects):
+            obj_xml = ''.join(
+                '<obj><id>{0}</id><n>{0}</n><d/><t>{1}</t><st>{2}</st></obj>'.format(obj_name, *types)
+                for obj_name, types in objects
+            )
+            return '<folders name="{}"><path/>{}</folders>'.format(name, obj_xml)
+
+        folder = ('8', '2048')
+        report = ('3', '768')
+        tree = {
+            'ROOT': [('F1', folder), ('R0', report), ('F2', folder)],
+            'F1': [('F11', folder), ('R1', report)],
+            'F11': [('R11', report)],
+            'F2': [('R2', report)],
+        }
+
+        def get(url, **kwargs):
+            arguments = dict(urllib.parse.parse_qsl(url.split('?', 1)[1]))
+            folder_id = arguments['folderID']
+            return _ok(folder_xml(folder_id, tree[folder_id]))
+
+        client = self._client(ParserBackend.BeautifulSoup, '')
+        client._http_session.get.side_effect = get
+        root_guid = 'ROOT'.ljust(32, '0')
+        tree[root_guid] = tree.pop('ROOT')
+
+        contents = client.get_folder_contents(root_guid, type_restriction={ObjectSubType.ReportGrid})
+        self.assertEqual([obj.name for obj in contents], ['R0', 'R1', 'R11', 'R2'])
+
+        contents = client.get_folder_contents(root_guid, flatten_structure=False)
+        self.assertEqual([obj.name for obj in contents], ['F1', 'R0', 'F2'])
+        self.assertEqual([obj.name for obj in contents[0].contents], ['F11', 'R1'])
+        self.assertEqual([obj.name for obj in contents[0].contents[0].contents], ['R11'])
+
+    def test_metadata_cache(self):
+        listings = {
+            'system': '<folders name="Public Objects"><path/><obj><id>RP</id><n>Reports</n><d/><t>8</t><st>2048</st></obj></folders>',
+            'RP': '<folders name="Reports"><path/><obj><id>S1</id><n>Sales</n><d/><t>8</t><st>2048</st></obj></folders>',
+            'S1': '<folders name="Sales"><path/><obj><id>A1</id><n>Alpha</n><d/><t>3</t><st>768</st></obj></folders>',
+        }
+        browsed = []
+
+        def get(url, **kwargs):
+            arguments = dict(urllib.parse.parse_qsl(url.split('?', 1)[1]))
+            folder_id = arguments.get('folderID', 'system')
+            browsed.append(folder_id)
+            return _ok(listings[folder_id])
+
+        client = self._client(ParserBackend.BeautifulSoup, '')
+        client._http_session.get.side_effect = get
+        client.metadata_cache = MetadataCache()
+        for _ in range(2):
+            contents = client.get_folder_contents_by_name('\\Public Objects\\Reports\\Sales')
+            self.assertEqual([obj.name for obj in contents], ['Alpha'])
+        # The second lookup resumes from the cached guid of Sales and its cached listing
+        self.assertEqual(browsed, ['system', 'RP', 'S1'])
+
+        client.metadata_cache.invalidate_folder('S1')
+        client.get_folder_contents_by_name('\\Public Objects\\Reports\\Sales')
+        self.assertEqual(browsed, ['system', 'RP', 'S1', 'S1'])
+
+    def test_metadata_and_response_cache(self):
+        signatures = ['<obj><id>A1</id><n>Alpha</n><d/><t>3</t><st>768</st></obj>']
+        browsed = []
+        signature_requests = []
+
+        def get(url, **kwargs):
+            arguments = dict(urllib.parse.parse_qsl(url.split('?', 1)[1]))
+            if arguments.get('blockCount') == '1':
+                signature_requests.append(arguments['folderID'])
+                return _ok('<folders name="Sales"><path/>{}</folders>'.format(signatures[-1]))
+            browsed.append(arguments['folderID'])
+            return _ok('<folders name="Sales"><path/>{}</folders>'.format(''.join(signatures)))
+
+        client = self._client(ParserBackend.BeautifulSoup, '')
+        client._http_session.get.side_effect = get
+        client.metadata_cache = MetadataCache(validate_modification_time=True)
+        client.response_cache = ResponseCache()
+        folder_guid = 'S1'.ljust(32, '0')
+        self.assertEqual([obj.name for obj in client.get_folder_contents_by_guid(folder_guid)], ['Alpha'])
+        # A cache miss only browses the folder
+        self.assertEqual((len(browsed), len(signature_requests)), (1, 0))
+        self.assertEqual([obj.name for obj in client.get_folder_contents_by_guid(folder_guid)], ['Alpha'])
+        self.assertEqual((len(browsed), len(signature_requests)), (1, 1))
+        # A new object changes the signature, which must not be answered from the response cache
+        signatures.append('<obj><id>B2</id><n>Beta</n><d/><t>3</t><st>768</st></obj>')
+        contents = client.get_folder_contents_by_guid(folder_guid)
+        self.assertEqual([obj.name for obj in contents], ['Alpha', 'Beta'])
+        self.assertEqual((len(browsed), len(signature_requests)), (2, 2))
+
+    def test_matching_objects_list(self):
+        folder = ('8', '2048')
+        report = ('3', '768')
+        tree = {
+            'system': [('Reports', 'RP', folder)],
+            'RP': [('Sales', 'S1', folder), ('Total', 'R0', report)],
+            'S1': [('Alpha', 'A1', report), ('Beta', 'B1', report), ('Archive', 'S11', folder)],
+            'S11': [('Alpha Old', 'A2', report)],
+        }
+        browsed = []
+
+        def get(url, **kwargs):
+            arguments = dict(urllib.parse.parse_qsl(url.split('?', 1)[1]))
+            folder_id = arguments.get('folderID', 'system')
+            browsed.append(folder_id)
+            obj_xml = ''.join(
+                '<obj><id>{}</id><n>{}</n><d/><t>{}</t><st>{}</st></obj>'.format(guid, name, *types)
+                for name, guid, types in tree[folder_id]
+            )
+            return _ok('<folders name="{}"><path/>{}</folders>'.format(folder_id, obj_xml))
+
+        client = self._client(ParserBackend.BeautifulSoup, '')
+        client._http_session.get.side_effect = get
+        errors = []
+        contents = client.get_matching_objects_list(
+            [
+                '\\Public Objects\\Reports\\Sales\\A*',
+                '\\Public Objects\\Reports\\Sales\\Beta',
+                '\\Public Objects\\Reports\\Alpha*[r]',
+                '\\Public Objects\\Reports\\Missing\\Alpha',
+            ],
+            type_restriction={ObjectSubType.ReportGrid},
+            error_list=errors,
+        )
+        self.assertEqual([obj.guid for obj in contents], ['A1', 'B1', 'A1', 'A2'])
+        self.assertEqual(sorted(browsed), ['RP', 'S1', 'S11', 'system'])
+        self.assertEqual(len(errors), 1)
+        self.assertIn('Missing', errors[0])
+
+    def test_stream_error(self):
+        client = self._client(ParserBackend.LxmlStream, '')
+        client._http_session.get.side_effect = lambda *args, **kwargs: _error('Bad things')
+        with self.assertRaises(MstrClientException):
+            list(client.request_iter({'taskId': 'test'}, tags={'r'}))
+
+    def test_stream_invalid_xml(self):
+        client = self._client(ParserBackend.LxmlStream, '')
+        client.retry_delay = 0
+        client._http_session.get.side_effect = [_response('<taskResponse statusCode="200"><r>1'), _ok('<r>1</r>')]
+        with mock.patch('microstrategy_api.task_proc.task_proc.time.sleep'):
+            rows = [row.text for row in client.request_iter({'taskId': 'test'}, tags={'r'})]
+        self.assertEqual(rows, ['1'])
+        self.assertEqual(client._http_session.get.call_count, 2)
+
+    def test_stream_limiter(self):
+        client = self._client(ParserBackend.LxmlStream, '<r>1</r>')
+        client.limiter = AdaptiveConcurrencyLimiter(initial_limit=4, cooldown_seconds=0)
+        client.retry_delay = 0
+        client._http_session.get.side_effect = [_error('Maximum number of executing jobs exceeded (4)'),
+                                                _ok('<r>1</r>')]
+        with mock.patch('microstrategy_api.task_proc.task_proc.time.sleep'):
+            rows = list(client.request_iter({'taskId': 'reportExecute'}, tags={'r'}))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(client.limiter.statistics,
+                         {'limit': 2, 'in_flight': 0, 'successes': 1, 'overloads': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
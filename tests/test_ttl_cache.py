@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from microstrategy_api.ttl_cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.statistics, {'entries': 2, 'hits': 3, 'misses': 1})
+
+    def test_expiry(self):
+        cache = TTLCache(ttl_seconds=10)
+        with mock.patch('microstrategy_api.ttl_cache.time.time', return_value=1000):
+            cache.set('a', 1)
+            cache.set('b', 2, ttl_seconds=None)
+        with mock.patch('microstrategy_api.ttl_cache.time.time', return_value=1011):
+            self.assertNotIn('a', cache)
+            self.assertEqual(cache.get('b'), 2)
+
+    def test_delete_where(self):
+        cache = TTLCache()
+        cache.set(('x', 1), 1)
+        cache.set(('x', 2), 2)
+        cache.set(('y', 1), 3)
+        self.assertEqual(cache.delete_where(lambda key: key[0] == 'x'), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache')
+            cache = TTLCache(path=path)
+            cache.set(('folder', 'F1'), ['a', 'b'])
+            cache.close()
+
+            cache = TTLCache(path=path)
+            self.assertEqual(cache.get(('folder', 'F1')), ['a', 'b'])
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()